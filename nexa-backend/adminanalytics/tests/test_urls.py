@@ -9,6 +9,7 @@ from adminanalytics import views
     ("admin-provider-performance", views.AdminProviderPerformanceOverviewView),
     ("financial-overview", views.FinancialCenterOverviewView),
     ("execute-sql", views.FullAccessQueryRunnerView),
+    ("task-metrics", views.TaskMetricsView),
 ])
 def test_url_resolves_to_correct_view(url_name, view_class):
     path = reverse(url_name)
@@ -24,6 +25,7 @@ def test_all_urls_accessible(api_client):
         "admin-user-stats",
         "admin-provider-performance",
         "financial-overview",
+        "task-metrics",
     ]
     for name in endpoints:
         response = api_client.get(reverse(name))
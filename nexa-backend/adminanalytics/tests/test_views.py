@@ -177,3 +177,32 @@ def test_full_access_query_runner_sql_error(api_client):
     assert response.status_code == 400
     data = response.json()
     assert "error" in data
+
+
+@pytest.mark.django_db
+def test_task_metrics_view(api_client, sample_user, settings):
+    from django.core.cache import cache
+    from bookings.tasks import expire_booking
+    cache.clear()
+    url = reverse("task-metrics")
+    api_client.force_authenticate(sample_user)
+    assert api_client.get(url).status_code == 403
+
+    admin = User.objects.create_user(username="ops", email="ops@example.com", password="testpass123",
+                                     user_type="admin")
+    api_client.force_authenticate(admin)
+    # Without a shared cache the counters would be per process: metrics are only logged
+    settings.TASK_METRICS_CACHE = ""
+    expire_booking.apply((str(uuid.uuid4()),))
+    assert api_client.get(url).status_code == 503
+
+    settings.TASK_METRICS_CACHE = "default"  # stands in for a shared Redis cache
+    expire_booking.apply((str(uuid.uuid4()),))
+    expire_booking.apply(("not-a-uuid",))
+    response = api_client.get(url)
+    assert response.status_code == 200
+    metrics = response.json()["bookings.tasks.expire_booking"]
+    assert metrics["queue"] == "inventory"
+    assert (metrics["success"], metrics["retry"], metrics["failure"]) == (1, 0, 1)
+    assert metrics["runtime"]["count"] == 2
+    assert metrics["runtime"]["buckets"]["+Inf"] == 2
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import AdminDashboardView,AdminUserListView,AdminProviderPerformanceOverviewView,FinancialCenterOverviewView,FullAccessQueryRunnerView
+from .views import AdminDashboardView,AdminUserListView,AdminProviderPerformanceOverviewView,FinancialCenterOverviewView,FullAccessQueryRunnerView,TaskMetricsView
 
 urlpatterns = [
     path('dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
@@ -7,4 +7,5 @@ urlpatterns = [
     path('provider-performance/', AdminProviderPerformanceOverviewView.as_view(), name='admin-provider-performance'),
     path('financial-overview/', FinancialCenterOverviewView.as_view(), name='financial-overview'),
     path('execute-sql/', FullAccessQueryRunnerView.as_view(), name='execute-sql'),
+    path('task-metrics/', TaskMetricsView.as_view(), name='task-metrics'),
 ]
@@ -11,6 +11,9 @@ from bookings.models import Booking
 from payments.models import Transaction
 from user_management.models import ServiceProvider,Customer
 from authapi.models import User
+from bookings.permissions import IsAdmin
+from backend.celery import app as celery_app
+from backend.task_metrics import task_metrics
 
 
 class AdminDashboardView(APIView):
@@ -462,3 +465,41 @@ class FullAccessQueryRunnerView(APIView):
                 "error": str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
+
+
+class TaskMetricsView(APIView):
+    """
+    Celery task metrics: runtime and queue wait histograms plus
+    success / retry / failure counts per task (see backend.task_metrics).
+    """
+    permission_classes = [IsAdmin]
+
+    @swagger_auto_schema(
+        operation_summary="Celery task runtime, queue wait and outcome metrics",
+        responses={
+            200: openapi.Response(
+                description="Metrics for every task that ran",
+                examples={
+                    "application/json": {
+                        "bookings.tasks.expire_booking": {
+                            "queue": "inventory",
+                            "runtime": {"count": 120, "sum": 3.6, "mean": 0.03, "p95_bucket": "0.05",
+                                        "buckets": {"0.01": 20, "0.05": 118, "+Inf": 120}},
+                            "queue_wait": {"count": 120, "sum": 12.0, "mean": 0.1, "p95_bucket": "0.25",
+                                           "buckets": {"0.1": 90, "0.25": 119, "+Inf": 120}},
+                            "success": 120, "retry": 0, "failure": 0
+                        }
+                    }
+                },
+            )
+        },
+    )
+    def get(self, request):
+        task_names = sorted(name for name in celery_app.tasks if not name.startswith('celery.'))
+        metrics = task_metrics(task_names)
+        if metrics is None:
+            return Response(
+                {"detail": "No shared TASK_METRICS_CACHE is configured; task metrics are only logged."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(metrics)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AuthapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authapi'
+
+    def ready(self):
+        from django.db.models.signals import post_save, pre_delete
+        from .models import User
+        from .session_cache import forget_user_sessions
+        # Cached sessions carry the user's fields; pre_delete runs before the sessions cascade away
+        post_save.connect(forget_user_sessions, sender=User, dispatch_uid='authapi.forget_user_sessions')
+        pre_delete.connect(forget_user_sessions, sender=User, dispatch_uid='authapi.forget_user_sessions')
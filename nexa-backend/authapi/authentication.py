@@ -3,12 +3,14 @@
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils import timezone
-from .models import Session
+from .models import Session, hash_token
+from .session_cache import cached_session, revoke_sessions
 
 
 class CustomTokenAuthentication(BaseAuthentication):
     """
     Custom authentication using session tokens stored in the database.
+    Validated sessions are cached briefly (see ``authapi.session_cache``).
 
     Expected header format:
         Authorization: Token <your_session_token>
@@ -35,21 +37,17 @@ class CustomTokenAuthentication(BaseAuthentication):
         if not token:
             raise AuthenticationFailed('Missing authentication token.')
 
-        # Try to fetch the active session
-        try:
-            session = Session.objects.select_related('user').get(
-                session_token=token,
-                is_active=True
-            )
-        except Session.DoesNotExist:
+        # Fetch the active session and its user (usually from the session cache, not the database)
+        entry = cached_session(token)
+        if entry is None:
             raise AuthenticationFailed('Invalid or expired token.')
+        user, expires_at = entry
 
         # Check if the session has expired
-        if session.expires_at <= timezone.now():
+        if expires_at <= timezone.now():
             # Auto-deactivate expired sessions
-            session.is_active = False
-            session.save(update_fields=['is_active'])
+            revoke_sessions(Session.objects.filter(token_hash=hash_token(token)))
             raise AuthenticationFailed('Session has expired. Please log in again.')
 
         # Everything is valid — return the user and token
-        return (session.user, token)
+        return (user, token)
@@ -0,0 +1,63 @@
+"""
+Purging of dead rows from the auth tables.
+
+``clean_expired_sessions`` only deactivates sessions, and OTPs are only ever
+marked used, so both tables would otherwise grow forever. A row is dead once
+it expired more than the retention period ago, or was ended (logout, used
+OTP) and created more than the retention period ago. Dead rows are deleted
+in batches of ``AUTH_PURGE_BATCH_SIZE`` primary keys, each batch its own
+short statement, so the purge never holds long locks. Both conditions use
+the indexed ``expires_at`` / ``created_at`` columns.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OTPVerification, Session
+
+logger = logging.getLogger(__name__)
+
+
+def purge_in_batches(queryset, batch_size):
+    """Delete ``queryset``'s rows ``batch_size`` at a time. Returns (rows, batches)."""
+    model = queryset.model
+    rows = batches = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return rows, batches
+        _, deleted = model.objects.filter(pk__in=pks).delete()
+        rows += deleted.get(model._meta.label, 0)  # not the cascaded OTP emails
+        batches += 1
+
+
+def dead_sessions(now):
+    cutoff = now - timedelta(days=getattr(settings, 'AUTH_SESSION_RETENTION_DAYS', 7))
+    return Session.objects.filter(Q(expires_at__lt=cutoff) | Q(is_active=False, created_at__lt=cutoff))
+
+
+def dead_otps(now):
+    cutoff = now - timedelta(hours=getattr(settings, 'AUTH_OTP_RETENTION_HOURS', 24))
+    return OTPVerification.objects.filter(Q(expires_at__lt=cutoff) | Q(is_used=True, created_at__lt=cutoff))
+
+
+def purge_auth_tables(batch_size=None, now=None):
+    """Delete dead sessions and OTPs. Returns rows deleted per table, batches, seconds and rows/s."""
+    batch_size = batch_size or getattr(settings, 'AUTH_PURGE_BATCH_SIZE', 5000)
+    now = now or timezone.now()
+    started = time.perf_counter()
+    stats = {'batches': 0}
+    for name, queryset in (('sessions', dead_sessions(now)), ('otps', dead_otps(now))):
+        table_started = time.perf_counter()
+        stats[name], batches = purge_in_batches(queryset, batch_size)
+        stats['batches'] += batches
+        elapsed = time.perf_counter() - table_started
+        logger.info("Purged %d dead %s in %d batches (%.0f rows/s)",
+                    stats[name], name, batches, stats[name] / elapsed if elapsed else 0.0)
+    stats['elapsed'] = time.perf_counter() - started
+    stats['rows_per_sec'] = (stats['sessions'] + stats['otps']) / stats['elapsed'] if stats['elapsed'] else 0.0
+    return stats
@@ -0,0 +1,111 @@
+# authapi/management/commands/benchmark_otp_login.py
+import asyncio
+import socket
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from authapi.models import OTPEmail, User
+from authapi.otp_outbox import dispatch_otp_emails
+from .smtp_stub import SMTPStub
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def start_stub(delay):
+    """Run an SMTPStub on a free local port in a daemon thread; returns (stub, port)."""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    stub, ready = SMTPStub(delay), threading.Event()
+
+    async def serve():
+        server = await asyncio.start_server(stub.handle, '127.0.0.1', port)
+        ready.set()
+        async with server:
+            await server.serve_forever()
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    ready.wait(5)
+    return stub, port
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time admin logins (which email a 2FA OTP) with the OTP sent inside the request and "
+        "through the outbox, against a local SMTP stub. Nothing is kept in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Logins per mode.")
+        parser.add_argument('--smtp-delay', type=float, default=0.3, help="Seconds the stub takes per message.")
+
+    def login_times(self, client, users):
+        samples = []
+        for user in users:
+            started = time.perf_counter()
+            response = client.post(reverse('login'), {"email": user.email, "password": PASSWORD},
+                                   content_type="application/json")
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"login returned {response.status_code}: {response.content[:200]!r}")
+        return samples
+
+    def report(self, name, samples):
+        p50, p95 = statistics.median(samples), percentile(samples, 95)
+        self.stdout.write(f"{name}: {len(samples)} logins, p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+        return p95
+
+    def handle(self, *args, **options):
+        stub, port = start_stub(options['smtp_delay'])
+        smtp = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=port, EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+        )
+        client = Client(HTTP_HOST='localhost')
+        count = options['requests']
+        try:
+            with smtp, transaction.atomic():
+                password = make_password(PASSWORD)
+                run = uuid.uuid4().hex[:8]
+                users = User.objects.bulk_create([
+                    User(username=f"bench-{run}-{i}", email=f"bench-{run}-{i}@example.com", password=password,
+                         user_type='admin', is_verified=True)
+                    for i in range(2 * count)
+                ])
+
+                with override_settings(OTP_EMAIL_ASYNC=False):
+                    inline = self.report('inline send', self.login_times(client, users[:count]))
+                with override_settings(OTP_EMAIL_ASYNC=True, OTP_EMAIL_KICK=False):
+                    outbox = self.report('outbox', self.login_times(client, users[count:]))
+
+                    started = time.perf_counter()
+                    sent, retrying, failed = dispatch_otp_emails()
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"dispatcher: {sent} sent, {retrying} retrying, {failed} failed in {elapsed:.2f}s "
+                    f"({sent / elapsed if elapsed else 0:.1f} emails/s over one connection)"
+                )
+                pending = OTPEmail.objects.filter(otp__user__in=users, status='Pending').count()
+                if pending:
+                    self.stdout.write(self.style.WARNING(f"{pending} OTP emails left pending"))
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(f"SMTP stub received {stub.received} messages")
+        self.stdout.write(self.style.SUCCESS(f"Login p95: {inline * 1000:.0f} ms -> {outbox * 1000:.0f} ms"))
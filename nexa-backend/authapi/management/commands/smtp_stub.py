@@ -0,0 +1,77 @@
+# authapi/management/commands/smtp_stub.py
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+
+class SMTPStub:
+    """
+    Minimal SMTP server that accepts and discards every message. ``delay``
+    seconds are slept before each reply to DATA, like a remote relay.
+    """
+
+    def __init__(self, delay=0.0, on_message=None):
+        self.delay = delay
+        self.on_message = on_message
+        self.received = 0
+
+    async def handle(self, reader, writer):
+        async def reply(line):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 nexa-smtp-stub ready")
+        while line := await reader.readline():
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                await reply("250-nexa-smtp-stub\r\n250-AUTH PLAIN\r\n250 8BITMIME")
+            elif command.startswith("AUTH"):
+                await reply("235 2.7.0 Authentication successful")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                await reply("250 OK")
+            elif command == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                    pass
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                self.received += 1
+                if self.on_message:
+                    self.on_message(self.received)
+                await reply("250 OK: queued")
+            elif command == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local SMTP server that discards mail, for load tests. Point Django at it with "
+        "EMAIL_HOST=127.0.0.1 EMAIL_PORT=<port> EMAIL_USE_TLS=False."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--delay', type=float, default=0.3,
+                            help="Seconds to wait before accepting each message (Gmail is ~0.3-1s).")
+
+    def handle(self, *args, **options):
+        stub = SMTPStub(options['delay'], on_message=self.report)
+        self.stdout.write(f"SMTP stub on {options['host']}:{options['port']}, {options['delay']}s per message")
+
+        async def serve():
+            server = await asyncio.start_server(stub.handle, options['host'], options['port'])
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            self.stdout.write(f"Received {stub.received} messages.")
+
+    def report(self, received):
+        if received % 100 == 0:
+            self.stdout.write(f"{received} messages received")
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:09
+
+import hashlib
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def hash_existing_tokens(apps, schema_editor):
+    Session = apps.get_model('authapi', 'Session')
+    batch = []
+    for session in Session.objects.only('pk', 'session_token').iterator(chunk_size=BATCH_SIZE):
+        session.token_hash = hashlib.sha256(session.session_token.encode()).hexdigest()
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            Session.objects.bulk_update(batch, ['token_hash'])
+            batch = []
+    if batch:
+        Session.objects.bulk_update(batch, ['token_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0002_session_device'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='token_hash',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0003_session_token_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otpverification',
+            index=models.Index(fields=['expires_at'], name='otp_expires_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otpverification',
+            index=models.Index(fields=['created_at'], name='otp_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['expires_at'], name='session_expires_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['created_at'], name='session_created_at_idx'),
+        ),
+    ]
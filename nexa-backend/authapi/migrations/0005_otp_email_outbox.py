@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0004_auth_expiry_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OTPEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('otp_type', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Sent', 'Sent'), ('Failed', 'Failed')], default='Pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('otp', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='authapi.otpverification')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='authapi_otp_status_08ae50_idx')],
+            },
+        ),
+    ]
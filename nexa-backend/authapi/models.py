@@ -1,4 +1,6 @@
+import hashlib
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 import uuid
 # ---------- Custom User Manager ----------
@@ -59,6 +61,35 @@ class OTPVerification(models.Model):
     is_used = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # authapi.maintenance purges by these
+            models.Index(fields=['expires_at'], name='otp_expires_at_idx'),
+            models.Index(fields=['created_at'], name='otp_created_at_idx'),
+        ]
+
+
+# ---------- OTP Email Outbox ----------
+class OTPEmail(models.Model):
+    """
+    Outbox row for an OTP email, written next to the ``OTPVerification``.
+    ``authapi.otp_outbox.dispatch_otp_emails`` sends pending rows from a
+    worker, so the request never waits for SMTP.
+    """
+    STATUS_CHOICES = [('Pending', 'Pending'), ('Sent', 'Sent'), ('Failed', 'Failed')]
+    otp = models.ForeignKey(OTPVerification, on_delete=models.CASCADE, related_name='emails')
+    email = models.EmailField()
+    otp_type = models.CharField(max_length=20)  # picks the subject, see authapi.utlis.otp_message
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'available_at'])]
+
 
 # ---------- Password Reset Token ----------
 class PasswordResetToken(models.Model):
@@ -70,11 +101,30 @@ class PasswordResetToken(models.Model):
 
 
 # ---------- Session ----------
+def hash_token(token):
+    """SHA-256 hex digest of a session token; sessions are looked up by it."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 class Session(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     session_token = models.CharField(max_length=100)
+    token_hash = models.CharField(max_length=64, db_index=True, editable=False, default='')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     expires_at = models.DateTimeField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    device =  models.CharField(max_length=1000, blank=True, null=True)
\ No newline at end of file
+    device =  models.CharField(max_length=1000, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # expiry sweeps and authapi.maintenance purges
+            models.Index(fields=['expires_at'], name='session_expires_at_idx'),
+            models.Index(fields=['created_at'], name='session_created_at_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .session_cache import forget_sessions
+        self.token_hash = hash_token(self.session_token)
+        super().save(*args, **kwargs)
+        forget_sessions([self.token_hash])
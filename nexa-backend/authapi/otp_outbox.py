@@ -0,0 +1,130 @@
+"""
+Outbox for OTP emails.
+
+Register, login 2FA, resend, forgot-password and email-change requests only
+write the ``OTPVerification`` and an ``OTPEmail`` row (``queue_otp_email``)
+and return. Once the request's transaction commits a dispatch is queued on
+the ``otp`` queue, which has its own worker so OTPs never wait behind
+ticket emails; ``dispatch_otp_emails`` then sends every due row
+over one SMTP connection. A failed send is retried with exponential backoff
+until ``OTP_EMAIL_MAX_ATTEMPTS``; an OTP that expired or was used meanwhile
+is not sent at all.
+
+With ``OTP_EMAIL_ASYNC = False`` the row is sent inside the request instead,
+as before the outbox.
+"""
+import logging
+import time
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OTPEmail
+from .utlis import otp_message
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed row stays invisible to other dispatchers
+CLAIM_SECONDS = 120
+# "status" the OTP endpoints report once the email is queued
+OTP_QUEUED = "OTP email queued for delivery"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def queue_otp_email(otp, email, otp_type):
+    """Record the email for ``otp`` and have a worker send it."""
+    outgoing = OTPEmail.objects.create(otp=otp, email=email, otp_type=otp_type)
+    if not _setting('OTP_EMAIL_ASYNC', True):
+        deliver([outgoing])
+    else:
+        transaction.on_commit(_kick_dispatcher)
+    return outgoing
+
+
+def _kick_dispatcher():
+    """Queue a dispatch right away; the periodic run covers it if the broker is down."""
+    if not _setting('OTP_EMAIL_KICK', True):
+        return
+    from .tasks import dispatch_otp_email_outbox
+    try:
+        dispatch_otp_email_outbox.apply_async(retry=False)
+    except Exception:
+        logger.warning("Could not queue OTP email dispatch; leaving it to the periodic run.", exc_info=True)
+
+
+def claim_otp_emails(limit):
+    """Lease up to ``limit`` due rows to this dispatcher and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OTPEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', available_at__lte=now)
+            .order_by('available_at')
+            .values_list('pk', flat=True)[:limit]
+        )
+        OTPEmail.objects.filter(pk__in=ids).update(available_at=now + timedelta(seconds=CLAIM_SECONDS))
+    return list(OTPEmail.objects.select_related('otp').filter(pk__in=ids).order_by('created_at'))
+
+
+def deliver(rows):
+    """Send ``rows`` over one SMTP connection and record the outcome. Returns (sent, retrying, failed)."""
+    max_attempts = _setting('OTP_EMAIL_MAX_ATTEMPTS', 5)
+    retry_seconds = _setting('OTP_EMAIL_RETRY_SECONDS', 10)
+    now = timezone.now()
+    sent = retrying = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        for row in rows:
+            row.attempts += 1
+            if row.otp.is_used or row.otp.expires_at <= now:
+                row.status, row.last_error = 'Failed', 'OTP expired or used before delivery'
+                failed += 1
+                continue
+            try:
+                connection.open()  # no-op while the connection is up
+                otp_message(row.email, row.otp.otp_code, row.otp_type, connection=connection).send()
+            except SMTPRecipientsRefused as exc:
+                row.status, row.last_error = 'Failed', f"Invalid recipient: {exc}"
+                failed += 1
+            except Exception as exc:
+                logger.warning("OTP email %s to %s failed (attempt %d)", row.pk, row.email, row.attempts,
+                               exc_info=True)
+                connection.close()  # the next row reconnects
+                row.last_error = str(exc)
+                if row.attempts >= max_attempts:
+                    row.status = 'Failed'
+                    failed += 1
+                else:
+                    row.available_at = now + timedelta(seconds=retry_seconds * 2 ** (row.attempts - 1))
+                    retrying += 1
+            else:
+                row.status, row.sent_at, row.last_error = 'Sent', timezone.now(), ''
+                sent += 1
+    finally:
+        connection.close()
+    OTPEmail.objects.bulk_update(rows, ['status', 'attempts', 'last_error', 'available_at', 'sent_at'])
+    return sent, retrying, failed
+
+
+def dispatch_otp_emails(limit=None):
+    """Send due OTP emails, batch after batch, until none are due. Returns (sent, retrying, failed)."""
+    limit = limit or _setting('OTP_EMAIL_BATCH_SIZE', 100)
+    totals = [0, 0, 0]
+    started = time.perf_counter()
+    while True:
+        rows = claim_otp_emails(limit)
+        if not rows:
+            break
+        for i, count in enumerate(deliver(rows)):
+            totals[i] += count
+    if any(totals):
+        logger.info("OTP emails: %d sent, %d retrying, %d failed in %.2fs",
+                    *totals, time.perf_counter() - started)
+    return tuple(totals)
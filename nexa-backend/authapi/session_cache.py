@@ -0,0 +1,157 @@
+"""
+Cache of validated sessions for ``CustomTokenAuthentication``.
+
+A validated token is remembered, by its SHA-256 hash, as the session's
+``(user fields, expires_at)``, where the user fields are the account's
+columns except the password hash (``USER_FIELDS``). Each request gets a
+fresh ``User`` built from them, so an authenticated request that hits the
+cache runs no query at all; the password is loaded only if touched. There
+are two levels:
+
+* a small in-process LRU (``AUTH_SESSION_LOCAL_SIZE`` entries, kept for
+  ``AUTH_SESSION_LOCAL_SECONDS``, a few seconds), so repeat requests on a
+  worker skip the lookup;
+* the ``AUTH_SESSION_CACHE`` Django cache (``AUTH_SESSION_CACHE_SECONDS``).
+  It must be shared by all workers (Redis), since logout only evicts
+  entries there and in its own process; with no alias configured (the
+  default without ``REDIS_CACHE_URL``) only the local level is used.
+
+Neither level outlives the session itself. Views that end sessions go
+through ``revoke_sessions`` / ``forget_sessions``, and saving or deleting a
+user drops all of that user's sessions (``forget_user_sessions``, connected
+in ``AuthapiConfig.ready``). Both drop the shared entries and this process'
+local ones; other processes drop theirs when the local TTL runs out, so a
+revoked token or a changed account is seen within seconds. Bulk
+``User.objects.update()`` calls send no signal and are seen once the
+shared TTL runs out.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import Session, User, hash_token
+
+PREFIX = 'authsession'
+# Everything a request may read from ``request.user``, in model field order
+USER_FIELDS = tuple(f.attname for f in User._meta.concrete_fields if f.attname != 'password')
+
+
+class LocalSessionCache:
+    """Thread-safe LRU of ``token hash → (user fields, expires_at)`` with a per-entry deadline."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            deadline, value = entry
+            if deadline <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + min(ttl, self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_sessions = LocalSessionCache(
+    max_size=getattr(settings, 'AUTH_SESSION_LOCAL_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_SESSION_LOCAL_SECONDS', 5),
+)
+
+
+def _shared():
+    """The shared session cache, or None when only the local one is used."""
+    alias = getattr(settings, 'AUTH_SESSION_CACHE', '')
+    return caches[alias] if alias else None
+
+
+def _key(token_hash):
+    return f"{PREFIX}:{token_hash}"
+
+
+def cached_session(token):
+    """``(user, expires_at)`` for an active session token, or None if it is unknown or inactive."""
+    token_hash = hash_token(token)
+    entry = local_sessions.get(token_hash)
+    if entry is None:
+        entry = _load_session(token_hash)
+        if entry is None:
+            return None
+    user_values, expires_at = entry
+    return User.from_db(Session.objects.db, USER_FIELDS, user_values), expires_at
+
+
+def _load_session(token_hash):
+    """The session's cache entry from the shared cache or the database, cached locally."""
+    shared = _shared()
+    entry = shared.get(_key(token_hash)) if shared is not None else None
+    if entry is None:
+        row = (
+            Session.objects.filter(token_hash=token_hash, is_active=True)
+            .values_list('expires_at', *(f'user__{name}' for name in USER_FIELDS))
+            .first()
+        )
+        if row is None:
+            return None
+        entry = (row[1:], row[0])
+        remaining = (entry[1] - timezone.now()).total_seconds()
+        if remaining <= 0:
+            return entry  # expired: let the caller deactivate it, don't cache
+        if shared is not None:
+            shared.set(_key(token_hash), entry,
+                       timeout=max(1, int(min(getattr(settings, 'AUTH_SESSION_CACHE_SECONDS', 60), remaining))))
+
+    remaining = (entry[1] - timezone.now()).total_seconds()
+    if remaining > 0:
+        local_sessions.set(token_hash, entry, remaining)
+    return entry
+
+
+def forget_sessions(token_hashes):
+    """Drop sessions from the shared cache and this process' local cache."""
+    token_hashes = [h for h in token_hashes if h]
+    if not token_hashes:
+        return
+    local_sessions.delete_many(token_hashes)
+    shared = _shared()
+    if shared is not None:
+        shared.delete_many([_key(h) for h in token_hashes])
+
+
+def revoke_sessions(sessions):
+    """Deactivate the active sessions in queryset ``sessions`` and evict them. Returns how many."""
+    sessions = sessions.filter(is_active=True)
+    token_hashes = list(sessions.values_list('token_hash', flat=True))
+    count = sessions.update(is_active=False)
+    forget_sessions(token_hashes)
+    return count
+
+
+def forget_user_sessions(sender, instance, **kwargs):
+    """Drop ``instance``'s cached sessions; connected to the user's post_save and pre_delete."""
+    forget_sessions(Session.objects.filter(user_id=instance.pk).values_list('token_hash', flat=True))
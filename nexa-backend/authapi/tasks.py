@@ -1,18 +1,37 @@
+import logging
+
 from celery import shared_task
 from django.utils import timezone
+from .maintenance import purge_auth_tables
+from .otp_outbox import dispatch_otp_emails
 from .models import Session
 
+logger = logging.getLogger(__name__)
+
 @shared_task
 def clean_expired_sessions():
-    """Deactivate or delete sessions that have expired."""
+    """Mark expired sessions inactive; purge_dead_auth_rows deletes them later."""
     now = timezone.now()
-    expired_sessions = Session.objects.filter(expires_at__lt=now, is_active=True)
+    # One UPDATE on the expires_at index; its row count is the number cleaned
+    count = Session.objects.filter(expires_at__lt=now, is_active=True).update(is_active=False)
 
-    count = expired_sessions.count()
-    # Option 1: Mark them inactive (recommended if you want logs)
-    expired_sessions.update(is_active=False)
+    return f"Cleaned {count} expired sessions."
 
-    # Option 2 (optional): Delete them entirely
-    # expired_sessions.delete()
 
-    return f"Cleaned {count} expired sessions."
+@shared_task
+def purge_dead_auth_rows():
+    """Delete long-expired or ended sessions and used/expired OTPs in batches."""
+    stats = purge_auth_tables()
+    logger.info("Auth purge: %d sessions and %d OTPs in %d batches, %.2fs (%.0f rows/s)",
+                stats['sessions'], stats['otps'], stats['batches'], stats['elapsed'], stats['rows_per_sec'])
+    return (
+        f"Purged {stats['sessions']} sessions and {stats['otps']} OTPs "
+        f"in {stats['batches']} batches ({stats['rows_per_sec']:.0f} rows/s)."
+    )
+
+
+@shared_task
+def dispatch_otp_email_outbox():
+    """Send queued OTP emails (see authapi.otp_outbox)."""
+    sent, retrying, failed = dispatch_otp_emails()
+    return f"Sent {sent} OTP emails ({retrying} retrying, {failed} failed)."
@@ -62,3 +62,11 @@ def auth_client(api_client, active_session):
 def celery_eager_settings(settings):
     settings.CELERY_TASK_ALWAYS_EAGER = True
     settings.CELERY_TASK_EAGER_PROPAGATES = True
+
+@pytest.fixture(autouse=True)
+def empty_local_session_cache():
+    """Tests reuse tokens; a session cached by an earlier test belongs to a rolled-back user."""
+    from authapi.session_cache import local_sessions
+    local_sessions.clear()
+    yield
+    local_sessions.clear()
@@ -1,6 +1,8 @@
 import pytest
 from rest_framework.exceptions import AuthenticationFailed
+from django.urls import reverse
 from authapi.authentication import CustomTokenAuthentication
+from authapi.session_cache import LocalSessionCache, local_sessions
 
 @pytest.mark.django_db
 def test_invalid_auth_header_format():
@@ -30,3 +32,73 @@ def test_expired_token_authentication(expired_session):
 def test_missing_token_header():
     request = type("obj", (), {"headers": {}})
     assert CustomTokenAuthentication().authenticate(request) is None
+
+@pytest.mark.django_db
+def test_cached_token_skips_the_database(active_session, django_assert_num_queries, settings):
+    settings.AUTH_SESSION_CACHE = "default"  # stands in for a shared Redis cache
+    request = type("obj", (), {"headers": {"Authorization": f"Token {active_session.session_token}"}})
+    with django_assert_num_queries(1):  # session and user in one lookup
+        CustomTokenAuthentication().authenticate(request)
+    with django_assert_num_queries(0):
+        user, _ = CustomTokenAuthentication().authenticate(request)
+    assert user == active_session.user
+    assert user.user_type == active_session.user.user_type and user.email == active_session.user.email
+
+    local_sessions.clear()  # another worker: served from the shared cache
+    with django_assert_num_queries(0):
+        CustomTokenAuthentication().authenticate(request)
+
+@pytest.mark.django_db
+def test_cached_session_holds_user_fields_not_instances(active_session):
+    request = type("obj", (), {"headers": {"Authorization": f"Token {active_session.session_token}"}})
+    first, _ = CustomTokenAuthentication().authenticate(request)
+    user_values, expires_at = local_sessions.get(active_session.token_hash)
+    assert expires_at == active_session.expires_at
+    assert active_session.user_id in user_values
+    assert active_session.user.password not in user_values
+
+    second, _ = CustomTokenAuthentication().authenticate(request)
+    assert second is not first
+    assert second.check_password("password123") == active_session.user.check_password("password123")
+
+@pytest.mark.django_db
+def test_saving_the_user_evicts_its_cached_sessions(active_session, settings):
+    settings.AUTH_SESSION_CACHE = "default"
+    request = type("obj", (), {"headers": {"Authorization": f"Token {active_session.session_token}"}})
+    CustomTokenAuthentication().authenticate(request)
+
+    account = type(active_session.user).objects.get(pk=active_session.user_id)
+    account.user_type = "admin"
+    account.save()
+    user, _ = CustomTokenAuthentication().authenticate(request)
+    assert user.user_type == "admin"
+
+    account.delete()
+    with pytest.raises(AuthenticationFailed):
+        CustomTokenAuthentication().authenticate(request)
+
+@pytest.mark.django_db
+def test_without_shared_cache_only_the_local_cache_is_used(active_session, settings):
+    from django.core.cache import cache
+    settings.AUTH_SESSION_CACHE = ""
+    cache.clear()
+    request = type("obj", (), {"headers": {"Authorization": f"Token {active_session.session_token}"}})
+    CustomTokenAuthentication().authenticate(request)
+    assert not cache.get(f"authsession:{active_session.token_hash}")
+
+@pytest.mark.django_db
+def test_logout_evicts_cached_token(api_client, active_session):
+    request = type("obj", (), {"headers": {"Authorization": f"Token {active_session.session_token}"}})
+    CustomTokenAuthentication().authenticate(request)
+    assert api_client.post(reverse("logout"), {"token": active_session.session_token}).status_code == 200
+    with pytest.raises(AuthenticationFailed):
+        CustomTokenAuthentication().authenticate(request)
+
+@pytest.mark.django_db
+def test_local_session_cache_is_bounded():
+    cache = LocalSessionCache(max_size=2, ttl=60)
+    for key in "abc":
+        cache.set(key, key, ttl=60)
+    assert cache.get("a") is None and cache.get("c") == "c"
+    cache.set("d", "d", ttl=0)
+    assert cache.get("d") is None
@@ -0,0 +1,33 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from authapi.maintenance import purge_auth_tables
+from authapi.models import OTPVerification, Session
+from authapi.tasks import purge_dead_auth_rows
+
+@pytest.mark.django_db
+def test_purge_deletes_dead_sessions_and_otps_in_batches(user_customer):
+    now = timezone.now()
+    for i in range(5):
+        Session.objects.create(user=user_customer, session_token=f"old{i}", expires_at=now - timedelta(days=8))
+    ended = Session.objects.create(user=user_customer, session_token="ended", is_active=False,
+                                   expires_at=now + timedelta(days=1))
+    Session.objects.filter(pk=ended.pk).update(created_at=now - timedelta(days=8))
+    recent = Session.objects.create(user=user_customer, session_token="recent", expires_at=now - timedelta(days=1))
+    OTPVerification.objects.create(user=user_customer, otp_code="111111", otp_type="login",
+                                   expires_at=now - timedelta(days=2))
+    used = OTPVerification.objects.create(user=user_customer, otp_code="222222", otp_type="login",
+                                          is_used=True, expires_at=now + timedelta(minutes=10))
+    OTPVerification.objects.filter(pk=used.pk).update(created_at=now - timedelta(days=2))
+    live = OTPVerification.objects.create(user=user_customer, otp_code="333333", otp_type="login",
+                                          expires_at=now + timedelta(minutes=10))
+
+    stats = purge_auth_tables(batch_size=2)
+    assert (stats["sessions"], stats["otps"], stats["batches"]) == (6, 2, 4)
+    assert list(Session.objects.values_list("pk", flat=True)) == [recent.pk]
+    assert list(OTPVerification.objects.values_list("pk", flat=True)) == [live.pk]
+
+@pytest.mark.django_db
+def test_purge_task_reports_rows(user_customer):
+    Session.objects.create(user=user_customer, session_token="old", expires_at=timezone.now() - timedelta(days=30))
+    assert purge_dead_auth_rows().startswith("Purged 1 sessions and 0 OTPs in 1 batches")
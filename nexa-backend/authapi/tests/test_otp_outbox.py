@@ -0,0 +1,71 @@
+import pytest
+from datetime import timedelta
+from django.core import mail
+from django.urls import reverse
+from django.utils import timezone
+from authapi import otp_outbox
+from authapi.models import OTPEmail, OTPVerification, User
+from authapi.otp_outbox import dispatch_otp_emails
+
+@pytest.fixture(autouse=True)
+def no_dispatch_kick(settings):
+    settings.OTP_EMAIL_KICK = False
+
+@pytest.mark.django_db
+def test_register_queues_otp_and_worker_sends_it(api_client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client.post(reverse("register"), {"username": "q", "email": "q@x.com", "password": "password123"})
+    assert response.status_code == 200
+    assert response.data["status"] == otp_outbox.OTP_QUEUED
+    assert len(mail.outbox) == 0
+    queued = OTPEmail.objects.get()
+    assert (queued.email, queued.status) == ("q@x.com", "Pending")
+
+    assert dispatch_otp_emails() == (1, 0, 0)
+    otp = OTPVerification.objects.get(user__email="q@x.com")
+    assert mail.outbox[0].to == ["q@x.com"] and otp.otp_code in mail.outbox[0].body
+    assert OTPEmail.objects.get().status == "Sent"
+    assert dispatch_otp_emails() == (0, 0, 0)
+
+@pytest.mark.django_db
+def test_failed_send_is_retried_with_backoff(user_customer, monkeypatch):
+    otp = OTPVerification.objects.create(user=user_customer, otp_code="123456", otp_type="password_reset",
+                                         expires_at=timezone.now() + timedelta(minutes=10))
+    otp_outbox.queue_otp_email(otp, user_customer.email, "password_reset")
+    real = otp_outbox.otp_message
+
+    def broken(*args, **kwargs):
+        raise ConnectionError("smtp down")
+    monkeypatch.setattr(otp_outbox, "otp_message", broken)
+    assert dispatch_otp_emails() == (0, 1, 0)
+    row = OTPEmail.objects.get()
+    assert (row.attempts, row.status) == (1, "Pending") and row.available_at > timezone.now()
+
+    monkeypatch.setattr(otp_outbox, "otp_message", real)
+    OTPEmail.objects.update(available_at=timezone.now())
+    assert dispatch_otp_emails() == (1, 0, 0)
+    assert mail.outbox[0].subject == "Password Reset OTP"
+
+@pytest.mark.django_db
+def test_stale_otps_are_not_sent(user_customer):
+    otp = OTPVerification.objects.create(user=user_customer, otp_code="123456", otp_type="login_2fa",
+                                         expires_at=timezone.now() + timedelta(minutes=10))
+    otp_outbox.queue_otp_email(otp, user_customer.email, "login_2fa")
+    OTPVerification.objects.update(is_used=True)  # superseded by a newer OTP
+    assert dispatch_otp_emails() == (0, 0, 1)
+    assert len(mail.outbox) == 0
+
+@pytest.mark.django_db
+def test_inline_mode_sends_in_the_request(api_client, settings):
+    settings.OTP_EMAIL_ASYNC = False
+    User.objects.create_user(username="adm", email="adm@x.com", password="password123", user_type="admin",
+                             is_verified=True)
+    assert api_client.post(reverse("login"), {"email": "adm@x.com", "password": "password123"}).status_code == 200
+    assert mail.outbox[0].to == ["adm@x.com"]
+    assert OTPEmail.objects.get().status == "Sent"
+
+
+def test_otp_dispatch_has_its_own_queue():
+    from backend.task_metrics import task_queue
+    assert task_queue("authapi.tasks.dispatch_otp_email_outbox") == "otp"
+    assert task_queue("bookings.tasks.mail_recent_bookings_to_customers_with_pdf") != "otp"
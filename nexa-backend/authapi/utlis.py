@@ -12,19 +12,13 @@ from smtplib import SMTPRecipientsRefused, SMTPAuthenticationError  # <- add thi
 # from django.conf import settings
 # from smtplib import SMTPRecipientsRefused, SMTPAuthenticationError
 
-def send_otp_email(email, otp, otp_type="registration"):
+def otp_message(email, otp, otp_type="registration", connection=None):
     """
-    Validate email and send OTP. Returns status message string.
+    The OTP email for ``email``, unsent. Used by ``send_otp_email`` and the
+    OTP outbox (authapi.otp_outbox), which passes one open ``connection``
+    for a whole batch.
     """
-
-    # 1) Validate format
-    try:
-        validate_email(email)
-    except ValidationError:
-        print(f"❌ Invalid email format: {email}")
-        return f"Invalid email format: {email}"
-
-    # 2) Subject selection
+    # Subject selection
     subject_map = {
         "registration": "Verify your email - OTP Code",
         "password_reset": "Password Reset OTP",
@@ -32,7 +26,7 @@ def send_otp_email(email, otp, otp_type="registration"):
     }
     subject = subject_map.get(otp_type, "Your OTP Code")
 
-    # 3) Body
+    # Body
     text_content = f"Your OTP code is {otp}. It will expire in 10 minutes."
     html_content = f"""
     <div style="font-family:Arial,sans-serif;">
@@ -45,16 +39,33 @@ def send_otp_email(email, otp, otp_type="registration"):
     </div>
     """
 
-    # 4) Prepare message and send
     msg = EmailMultiAlternatives(
         subject=subject,
         body=text_content,
         from_email=getattr(settings, "DEFAULT_FROM_EMAIL", settings.EMAIL_HOST_USER),
         to=[email],
+        connection=connection,
     )
     msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def send_otp_email(email, otp, otp_type="registration"):
+    """
+    Validate email and send OTP. Returns status message string.
+    """
+
+    # 1) Validate format
+    try:
+        validate_email(email)
+    except ValidationError:
+        print(f"❌ Invalid email format: {email}")
+        return f"Invalid email format: {email}"
+
+    # 2) Prepare message
+    msg = otp_message(email, otp, otp_type)
 
-    # 5) Send email with error handling
+    # 3) Send email with error handling
     try:
         msg.send()
         print(f"✅ OTP email successfully sent to {email}")
@@ -6,10 +6,13 @@ from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 import random, string, datetime
-from .models import OTPVerification, Session
+from .models import OTPVerification, Session, hash_token
+from .session_cache import revoke_sessions
 from django.contrib.auth.hashers import make_password
 import requests 
-from .utlis import send_otp_email
+from .otp_outbox import queue_otp_email, OTP_QUEUED
+from django.core.validators import validate_email
+from django.core.exceptions import ValidationError
 from django.conf import settings
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
@@ -35,8 +38,8 @@ def generate_token(length=40):
 def get_user_from_token(token):
     """Helper to get user from session token"""
     try:
-        session = Session.objects.get(
-            session_token=token, 
+        session = Session.objects.select_related('user').get(
+            token_hash=hash_token(token),
             is_active=True,
             expires_at__gt=timezone.now()
         )
@@ -204,13 +207,14 @@ def register(request):
     )
     
     otp = generate_otp()
-    OTPVerification.objects.create(
+    otp_row = OTPVerification.objects.create(
         user=user,
         otp_code=otp,
         otp_type='registration',
         expires_at=timezone.now() + datetime.timedelta(minutes=10)
     )
-    sent = send_otp_email(email, otp, otp_type="registration")
+    queue_otp_email(otp_row, email, "registration")
+    sent = OTP_QUEUED
     # if not sent:
     #     return Response({"error": "Failed to send OTP email. Please check the email address."}, status=400)
     print(f"OTP for {email}: {otp}")
@@ -305,13 +309,14 @@ def resend_otp(request):
         
         # Generate new OTP
         otp = generate_otp()
-        OTPVerification.objects.create(
+        otp_row = OTPVerification.objects.create(
             user=user,
             otp_code=otp,
             otp_type=otp_type,
             expires_at=timezone.now() + datetime.timedelta(minutes=10)
         )
-        sent = send_otp_email(email, otp, otp_type="registration")
+        queue_otp_email(otp_row, email, "registration")
+        sent = OTP_QUEUED
         # if not sent:
         #     return Response({"error": "Failed to send OTP email. Please check the email address."}, status=400)
         # print(f"New OTP for {email}: {otp}")
@@ -350,13 +355,13 @@ def login_user(request):
             is_used=False
         ).update(is_used=True)
         otp = generate_otp()
-        OTPVerification.objects.create(
+        otp_row = OTPVerification.objects.create(
             user=user,
             otp_code=otp,
             otp_type='login_2fa',
             expires_at=timezone.now() + datetime.timedelta(minutes=10)
         )
-        sent = send_otp_email(email, otp, otp_type="login_2fa")
+        queue_otp_email(otp_row, email, "login_2fa")
         print(f"Login 2FA OTP for {email}: {otp}")
         return Response({"message": "2FA OTP sent to email. Please verify to complete login."})
     token = generate_token()
@@ -392,13 +397,9 @@ def logout_user(request):
     if not token:
         return Response({"error": "Token is required"}, status=400)
     
-    try:
-        session = Session.objects.get(session_token=token, is_active=True)
-        session.is_active = False
-        session.save()
+    if revoke_sessions(Session.objects.filter(token_hash=hash_token(token))):
         return Response({"message": "Logged out successfully"})
-    except Session.DoesNotExist:
-        return Response({"error": "Invalid session"}, status=400)
+    return Response({"error": "Invalid session"}, status=400)
 
 
 # ---------- Logout All Sessions ----------
@@ -417,7 +418,7 @@ def logout_all_sessions(request):
         return Response({"error": "Invalid or expired token"}, status=401)
     
     # Deactivate all sessions for this user
-    count = Session.objects.filter(user=user, is_active=True).update(is_active=False)
+    count = revoke_sessions(Session.objects.filter(user=user))
     
     return Response({
         "message": "All sessions logged out successfully",
@@ -447,7 +448,7 @@ def forgot_password(request):
         
         # Generate new OTP
         otp = generate_otp()
-        OTPVerification.objects.create(
+        otp_row = OTPVerification.objects.create(
             user=user,
             otp_code=otp,
             otp_type='password_reset',
@@ -455,7 +456,8 @@ def forgot_password(request):
         )
         
         print(f"Password Reset OTP for {email}: {otp}")
-        sent = send_otp_email(email, otp, otp_type="password_reset")
+        queue_otp_email(otp_row, email, "password_reset")
+        sent = OTP_QUEUED
         # Note: for security we still return generic message even if email invalid
         # if not sent:
         #     # you can still return generic success to avoid revealing existing emails:
@@ -502,7 +504,7 @@ def reset_password(request):
         user.save()
         
         # Invalidate all existing sessions for security
-        Session.objects.filter(user=user, is_active=True).update(is_active=False)
+        revoke_sessions(Session.objects.filter(user=user))
         
         return Response({"message": "Password reset successfully. Please login again."})
     except User.DoesNotExist:
@@ -541,7 +543,7 @@ def change_password(request):
     user.save()
     
     # Invalidate all other sessions except current one
-    Session.objects.filter(user=user, is_active=True).exclude(session_token=token).update(is_active=False)
+    revoke_sessions(Session.objects.filter(user=user).exclude(token_hash=hash_token(token)))
     
     return Response({"message": "Password changed successfully"})
 
@@ -651,17 +653,9 @@ def delete_session(request):
     if not user:
         return Response({"error": "Invalid or expired token"}, status=401)
     
-    try:
-        session = Session.objects.get(
-            user=user,
-            session_token=session_token,
-            is_active=True
-        )
-        session.is_active = False
-        session.save()
+    if revoke_sessions(Session.objects.filter(user=user, token_hash=hash_token(session_token))):
         return Response({"message": "Session deleted successfully"})
-    except Session.DoesNotExist:
-        return Response({"error": "Session not found"}, status=404)
+    return Response({"error": "Session not found"}, status=404)
 
 
 # ---------- Get User Profile ----------
@@ -721,20 +715,22 @@ def update_profile(request):
     if email and email != user.email:
         if User.objects.filter(email=email).exists():
             return Response({"error": "Email already exists"}, status=400)
+        try:
+            validate_email(email)
+        except ValidationError:
+            return Response({"error": "Invalid or unreachable new email address."}, status=status.HTTP_400_BAD_REQUEST)
         user.email = email
         user.is_verified = False  # Require re-verification
         
         # Send verification OTP
         otp = generate_otp()
-        OTPVerification.objects.create(
+        otp_row = OTPVerification.objects.create(
             user=user,
             otp_code=otp,
             otp_type='registration',
             expires_at=timezone.now() + datetime.timedelta(minutes=10)
         )
-        sent = send_otp_email(email, otp, otp_type="email_change")
-        if not sent:
-            return Response({"error": "Invalid or unreachable new email address."}, status=status.HTTP_400_BAD_REQUEST)
+        queue_otp_email(otp_row, email, "email_change")
         print(f"Email Change OTP for {email}: {otp}")
     user.save()
     
@@ -982,6 +978,7 @@ def delete_user(request):
         # Deleting the user object. Django's ORM will handle cascading
         # deletions for related models like Session and OTPVerification,
         # provided the foreign keys are set up with `on_delete=models.CASCADE`.
+        revoke_sessions(Session.objects.filter(user=user))
         user.delete()
         
         return Response(
@@ -13,21 +13,67 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Discover tasks in installed apps
 app.autodiscover_tasks()
 
+# Runtime / queue wait / outcome metrics for every task
+from . import task_metrics  # noqa: E402,F401
+
 # Schedule the cleanup task
 app.conf.beat_schedule = {
-    'delete-old-pending-bookings-every-5-minutes': {
+    'expire-pending-bookings-sweep-every-30-minutes': {
         'task': 'bookings.tasks.delete_unconfirmed_bookings',
-        'schedule': 300.0,  # every 5 minutes
+        'schedule': 1800.0,  # safety net; each booking schedules its own expiry
     },
     'clean-expired-sessions-every-10-minutes': {
         'task': 'authapi.tasks.clean_expired_sessions',
         'schedule': 600.0,  # every 10 minutes
     },
+    'dispatch-otp-emails-every-30-seconds': {
+        'task': 'authapi.tasks.dispatch_otp_email_outbox',
+        'schedule': 30.0,  # catches emails whose immediate dispatch was missed
+    },
+    'purge-dead-auth-rows-every-hour': {
+        'task': 'authapi.tasks.purge_dead_auth_rows',
+        'schedule': 3600.0,  # small, frequent batches keep the auth tables steady
+    },
+    'dispatch-payment-events-every-30-seconds': {
+        'task': 'payments.tasks.dispatch_payment_events',
+        'schedule': 30.0,  # catches events whose immediate dispatch was missed
+    },
+    'credit-loyalty-points-every-minute': {
+        'task': 'payments.tasks.credit_loyalty_points',
+        'schedule': 60.0,  # entries the outbox didn't credit yet (e.g. refund reversals)
+    },
+    'process-pending-refunds-every-5-minutes': {
+        'task': 'payments.tasks.process_refunds',
+        'schedule': 300.0,  # every 5 minutes
+    },
     'mail-recent-bookings-with-pdf-every-5-minutes': {
         'task': 'bookings.tasks.mail_recent_bookings_to_customers_with_pdf',
         'schedule': 300.0,  # every 5 minutes
     },
-    
+    'train-demand-curves-nightly': {
+        'task': 'provideranalytics.tasks.train_demand_curves',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'refresh-demand-forecasts-every-hour': {
+        'task': 'provideranalytics.tasks.refresh_demand_forecasts',
+        'schedule': 3600.0,  # every hour
+    },
+    'rollup-provider-finances-nightly': {
+        'task': 'payments.tasks.rollup_daily_finances',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'verify-provider-ledgers-nightly': {
+        'task': 'payments.tasks.verify_provider_ledgers',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'flush-fare-history-every-minute': {
+        'task': 'services.tasks.flush_fare_history_points',
+        'schedule': 60.0,  # points buffered in worker processes (repricing)
+    },
+    'generate-scheduled-services-nightly': {
+        'task': 'services.tasks.generate_scheduled_services',
+        'schedule': crontab(hour=1, minute=0),
+    },
 }
 
 app.conf.timezone = 'Asia/Kolkata'
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Celery task metrics, collected through Celery signals.
+
+For every task name we keep:
+
+* ``runtime``: histogram of prerun → postrun seconds;
+* ``queue_wait``: histogram of seconds between publishing (or the task's
+  ETA, when it has one) and a worker starting it;
+* ``success`` / ``retry`` / ``failure`` counters.
+
+Every finished task is logged on this module's logger with its queue wait
+and runtime. When ``TASK_METRICS_CACHE`` names a cache, the numbers are
+also counters in it, which every worker adds to; it has to be a cache the
+workers and the web processes share (Redis, Memcached), which is why it is
+empty, and metrics are only logged, unless ``REDIS_CACHE_URL`` is set.
+``task_metrics()`` reads the totals back for ``/adminanalytics/task-metrics/``.
+"""
+import logging
+import time
+from datetime import datetime
+
+from celery.signals import before_task_publish, task_prerun, task_postrun
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'taskmetrics'
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+HISTOGRAMS = ('runtime', 'queue_wait')
+COUNTERS = ('success', 'retry', 'failure')
+
+# task_id → (perf_counter() at prerun, queue wait seconds); per worker process
+_started = {}
+
+
+def metrics_cache():
+    """The shared cache metrics are counted in, or None when they are only logged."""
+    alias = getattr(settings, 'TASK_METRICS_CACHE', '')
+    return caches[alias] if alias else None
+
+
+def _incr(key, delta=1):
+    cache = metrics_cache()
+    if cache is None:
+        return
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, delta, timeout=None)
+
+
+def _bucket(seconds):
+    return next((str(bound) for bound in BUCKETS if seconds <= bound), '+Inf')
+
+
+def observe(task_name, histogram, seconds):
+    """Add one observation to a task's histogram."""
+    _incr(f"{PREFIX}:{task_name}:{histogram}:{_bucket(seconds)}")
+    _incr(f"{PREFIX}:{task_name}:{histogram}:count")
+    _incr(f"{PREFIX}:{task_name}:{histogram}:sum_ms", int(seconds * 1000))
+
+
+def task_queue(task_name):
+    route = getattr(settings, 'CELERY_TASK_ROUTES', {}).get(task_name) or {}
+    return route.get('queue', 'celery')
+
+
+def _ready_at(request):
+    """When the task could first have started: its ETA, else its publish time."""
+    published = getattr(request, 'published_at', None)
+    eta = request.eta
+    if isinstance(eta, str):
+        eta = datetime.fromisoformat(eta)
+    if eta is not None:
+        return max(published or 0.0, eta.timestamp())
+    return published
+
+
+@before_task_publish.connect
+def stamp_published(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
+@task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    ready = _ready_at(task.request)
+    wait = max(0.0, time.time() - ready) if ready else None
+    if wait is not None:
+        observe(task.name, 'queue_wait', wait)
+    _started[task_id] = (time.perf_counter(), wait)
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started, wait = _started.pop(task_id, (None, None))
+    if started is None:
+        return
+    runtime = time.perf_counter() - started
+    observe(task.name, 'runtime', runtime)
+    outcome = {'SUCCESS': 'success', 'RETRY': 'retry'}.get(state, 'failure')
+    _incr(f"{PREFIX}:{task.name}:{outcome}")
+    logger.info("task=%s id=%s queue=%s state=%s runtime=%.3fs queue_wait=%s",
+                task.name, task_id, task_queue(task.name), state, runtime,
+                f"{wait:.3f}s" if wait is not None else "-")
+
+
+def _histogram(values, task_name, name):
+    count = values.get(f"{PREFIX}:{task_name}:{name}:count", 0)
+    buckets, cumulative, p95 = {}, 0, None
+    for bound in [str(b) for b in BUCKETS] + ['+Inf']:
+        cumulative += values.get(f"{PREFIX}:{task_name}:{name}:{bound}", 0)
+        buckets[bound] = cumulative
+        if p95 is None and count and cumulative >= 0.95 * count:
+            p95 = bound
+    total = values.get(f"{PREFIX}:{task_name}:{name}:sum_ms", 0) / 1000
+    return {
+        'count': count,
+        'sum': round(total, 3),
+        'mean': round(total / count, 3) if count else None,
+        'p95_bucket': p95,  # upper bound of the bucket holding the 95th percentile
+        'buckets': buckets,  # cumulative, like Prometheus "le" buckets
+    }
+
+
+def task_metrics(task_names):
+    """
+    {task name: {'queue', 'runtime', 'queue_wait', 'success', 'retry', 'failure'}} for tasks that ran,
+    or None when no metrics cache is configured.
+    """
+    cache = metrics_cache()
+    if cache is None:
+        return None
+    keys = [
+        f"{PREFIX}:{name}:{histogram}:{suffix}"
+        for name in task_names for histogram in HISTOGRAMS
+        for suffix in [str(b) for b in BUCKETS] + ['+Inf', 'count', 'sum_ms']
+    ] + [f"{PREFIX}:{name}:{counter}" for name in task_names for counter in COUNTERS]
+    values = cache.get_many(keys)
+
+    metrics = {}
+    for name in task_names:
+        counters = {counter: values.get(f"{PREFIX}:{name}:{counter}", 0) for counter in COUNTERS}
+        runtime = _histogram(values, name, 'runtime')
+        if not runtime['count'] and not any(counters.values()):
+            continue
+        metrics[name] = {
+            'queue': task_queue(name),
+            'runtime': runtime,
+            'queue_wait': _histogram(values, name, 'queue_wait'),
+            **counters,
+        }
+    return metrics
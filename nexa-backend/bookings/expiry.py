@@ -0,0 +1,297 @@
+"""
+Expiry of unpaid bookings.
+
+A ``Pending`` booking holds its seats (and, for trains, its segment counts)
+until it is paid. ``expire_pending_bookings`` releases the holds that are
+older than ``BOOKING_HOLD_MINUTES``, chunk by chunk. Each chunk runs in its
+own transaction:
+
+1. claim up to ``chunk_size`` expired bookings with ``SELECT ... FOR UPDATE
+   SKIP LOCKED``, so concurrent workers never expire the same booking;
+2. free bus and flight seats with one UPDATE per seat table and give the
+   services their ``booked_seats`` back with one grouped UPDATE per model;
+3. clear the bookings' segments from train seat masks and add the
+   passengers back to the segment counters, one UPDATE per class;
+4. write the ``Expired`` status logs in bulk and mark the bookings
+   ``Expired``. The bookings and their history are kept, not deleted.
+
+Every new booking also schedules its own expiry (``schedule_expiry``): a
+Celery task with an ETA at the end of its hold, so the seats go back on sale
+as soon as the hold lapses. A task that fires before the hold has lapsed
+(clock skew between hosts) queues itself again for the time remaining
+(``reschedule_early_expiry``), so a hold is never cut short. Payment
+revokes that task (``cancel_scheduled_expiry``); a task that still runs
+finds the booking paid and does nothing. The periodic sweep only catches
+bookings whose task was lost.
+"""
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Count
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from services.models import (
+    BusService, BusSeat, FlightService, FlightSeat, TrainService, TrainSeat, TrainServiceSegment, RouteStop,
+)
+from .models import Booking, BookingPassenger, BookingStatus
+
+logger = logging.getLogger(__name__)
+
+TRAIN_CLASS_FIELDS = {'Sleeper': 'sleeper', 'SecondAC': 'second_ac', 'ThirdAC': 'third_ac'}
+# service model → seat model, seat → service field
+SEAT_MODELS = {
+    BusService: (BusSeat, 'bus_service'),
+    FlightService: (FlightSeat, 'flight_service'),
+}
+
+
+def hold_minutes():
+    return getattr(settings, 'BOOKING_HOLD_MINUTES', 15)
+
+
+def expiry_task_id(booking_id):
+    """Fixed Celery task id of a booking's expiry, so payment can revoke it."""
+    return f"expire-booking-{booking_id}"
+
+
+def schedule_expiry(booking):
+    """Queue the expiry of ``booking``'s hold; the periodic sweep covers it if the broker is down."""
+    if not getattr(settings, 'BOOKING_EXPIRY_SCHEDULE', True):
+        return
+    from .tasks import expire_booking
+    try:
+        expire_booking.apply_async(
+            (str(booking.booking_id),),
+            eta=booking.booking_date + timedelta(minutes=hold_minutes()),
+            task_id=expiry_task_id(booking.booking_id),
+            retry=False,
+        )
+    except Exception:
+        logger.warning("Could not schedule expiry of booking %s; leaving it to the sweep.",
+                       booking.booking_id, exc_info=True)
+
+
+def reschedule_early_expiry(booking_id, now=None):
+    """
+    Queue the expiry of a still unpaid booking again if its hold has not
+    lapsed yet. Returns the countdown in seconds, or None if nothing was queued.
+    """
+    booking_date = (
+        Booking.objects.filter(pk=booking_id, status='Pending').values_list('booking_date', flat=True).first()
+    )
+    if booking_date is None:
+        return None
+    remaining = (booking_date + timedelta(minutes=hold_minutes()) - (now or timezone.now())).total_seconds()
+    if remaining < 0:
+        return None  # lapsed: another worker holds it, or the sweep will
+    from .tasks import expire_booking
+    countdown = max(1, math.ceil(remaining))
+    try:
+        expire_booking.apply_async((str(booking_id),), countdown=countdown,
+                                   task_id=expiry_task_id(booking_id), retry=False)
+    except Exception:
+        logger.warning("Could not reschedule expiry of booking %s; leaving it to the sweep.",
+                       booking_id, exc_info=True)
+        return None
+    return countdown
+
+
+def cancel_scheduled_expiry(booking_id):
+    """Revoke the booking's expiry task (best effort: the task re-checks the booking anyway)."""
+    if not getattr(settings, 'BOOKING_EXPIRY_SCHEDULE', True):
+        return
+    from celery import current_app
+    try:
+        current_app.control.revoke(expiry_task_id(booking_id))
+    except Exception:
+        logger.warning("Could not revoke expiry of booking %s.", booking_id, exc_info=True)
+
+
+def claim_expired_bookings(threshold, chunk_size):
+    """Lock the next ``chunk_size`` pending bookings made before ``threshold``; call inside a transaction."""
+    return list(
+        Booking.objects.select_for_update(skip_locked=True)
+        .filter(status='Pending', booking_date__lt=threshold)
+        .order_by('booking_date')
+        .values('booking_id', 'content_type', 'object_id', 'source_id', 'destination_id', 'class_type')[:chunk_size]
+    )
+
+
+def _release_seated(model, bookings, seats_by_booking, now):
+    """Free bus/flight seats and give the services their booked seat counts back."""
+    seat_model, _ = SEAT_MODELS[model]
+    booking_ids = [b['booking_id'] for b in bookings]
+    released = seat_model.objects.filter(booking_passenger__booking_id__in=booking_ids).update(
+        is_booked=False, booking_passenger=None,
+    )
+    held = defaultdict(int)
+    for b in bookings:
+        held[b['object_id']] += len(seats_by_booking[b['booking_id']])
+    held = {pk: n for pk, n in held.items() if n}
+    if held:
+        model.objects.filter(pk__in=held).update(
+            booked_seats=Greatest(
+                Case(*[When(pk=pk, then=F('booked_seats') - n) for pk, n in held.items()]), 0
+            ),
+            updated_at=now,
+        )
+    return released
+
+
+def _train_segments(bookings):
+    """{booking_id: (segment indices, total segments)} for train bookings; three queries."""
+    services = dict(TrainService.objects.filter(pk__in={b['object_id'] for b in bookings}).values_list('pk', 'route_id'))
+    totals = dict(
+        TrainServiceSegment.objects.filter(train_service__in=services).order_by()
+        .values('train_service').annotate(n=Count('segment_id')).values_list('train_service', 'n')
+    )
+    stations = {b['source_id'] for b in bookings} | {b['destination_id'] for b in bookings}
+    orders = {
+        (route_id, station_id): order
+        for route_id, station_id, order in RouteStop.objects.filter(
+            route__in=set(services.values()), station__in=stations,
+        ).values_list('route_id', 'station_id', 'stop_order')
+    }
+
+    segments = {}
+    for b in bookings:
+        route_id = services.get(b['object_id'])
+        start = orders.get((route_id, b['source_id']))
+        end = orders.get((route_id, b['destination_id']))
+        if start is None or end is None or start >= end:
+            logger.warning("Expiring train booking %s: no valid segment range; seats left as they are.", b['booking_id'])
+            continue
+        segments[b['booking_id']] = (range(start, end), totals.get(b['object_id'], 0))
+    return segments
+
+
+def _release_train(bookings, seats_by_booking):
+    """Clear the bookings' segments from seat masks and return them to the segment counters."""
+    segments = _train_segments(bookings)
+    freed = defaultdict(set)                         # (service, seat number) → segment indices
+    counts = defaultdict(lambda: defaultdict(int))   # class field → (service, segment index) → seats
+    for b in bookings:
+        if b['booking_id'] not in segments:
+            continue
+        indices, _ = segments[b['booking_id']]
+        seat_numbers = seats_by_booking[b['booking_id']]
+        for seat_no in seat_numbers:
+            freed[(b['object_id'], seat_no)].update(indices)
+        field = TRAIN_CLASS_FIELDS.get(b['class_type'])
+        if field:
+            for index in indices:
+                counts[field][(b['object_id'], index)] += len(seat_numbers)
+
+    totals = {b['object_id']: segments[b['booking_id']][1] for b in bookings if b['booking_id'] in segments}
+    seat_filter = Q()
+    for service_id, seat_no in freed:
+        seat_filter |= Q(train_service_id=service_id, seat_number=seat_no)
+    seats = list(TrainSeat.objects.select_for_update().filter(seat_filter)) if freed else []
+    for seat in seats:
+        total = totals[seat.train_service_id]
+        mask = seat.availability_mask if len(seat.availability_mask or '') == total else '0' * total
+        bits = list(mask)
+        for index in freed[(seat.train_service_id, seat.seat_number)]:
+            if index < total:
+                bits[index] = '0'
+        seat.availability_mask = "".join(bits)
+    TrainSeat.objects.bulk_update(seats, ['availability_mask'], batch_size=1000)
+
+    released_segments = 0
+    for field, by_segment in counts.items():
+        when = [
+            When(train_service_id=service_id, segment_index=index, then=F(f'available_count_{field}') + n)
+            for (service_id, index), n in by_segment.items()
+        ]
+        segment_filter = Q()
+        for service_id, index in by_segment:
+            segment_filter |= Q(train_service_id=service_id, segment_index=index)
+        released_segments += TrainServiceSegment.objects.filter(segment_filter).update(
+            **{f'available_count_{field}': Case(*when)}
+        )
+    return len(seats), released_segments
+
+
+def expire_chunk(bookings, now=None):
+    """Release the holds of claimed ``bookings`` and mark them expired. Returns chunk totals."""
+    now = now or timezone.now()
+    seats_by_booking = defaultdict(list)
+    for booking_id, seat_no in BookingPassenger.objects.filter(
+            booking_id__in=[b['booking_id'] for b in bookings]).values_list('booking_id', 'seat_no'):
+        if seat_no:
+            seats_by_booking[booking_id].append(seat_no)
+
+    by_model = defaultdict(list)
+    for b in bookings:
+        if b['content_type'] and b['object_id']:
+            by_model[ContentType.objects.get_for_id(b['content_type']).model_class()].append(b)
+
+    seats = segments = 0
+    for model, group in by_model.items():
+        if model in SEAT_MODELS:
+            seats += _release_seated(model, group, seats_by_booking, now)
+        elif model is TrainService:
+            train_seats, train_segments = _release_train(group, seats_by_booking)
+            seats += train_seats
+            segments += train_segments
+
+    minutes = hold_minutes()
+    BookingStatus.objects.bulk_create([
+        BookingStatus(booking_id=b['booking_id'], status='Expired',
+                      remarks=f'Booking expired after {minutes} minutes without payment; seats released.')
+        for b in bookings
+    ], batch_size=1000)
+    Booking.objects.filter(pk__in=[b['booking_id'] for b in bookings]).update(status='Expired', updated_at=now)
+    return {'expired': len(bookings), 'seats': seats, 'segments': segments}
+
+
+def expire_bookings(booking_ids, now=None):
+    """
+    Expire the given bookings if they are still unpaid and their hold has
+    lapsed. Bookings locked by another worker are skipped. Returns chunk totals.
+    """
+    threshold = (now or timezone.now()) - timedelta(minutes=hold_minutes())
+    with transaction.atomic():
+        bookings = list(
+            Booking.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=booking_ids, status='Pending', booking_date__lt=threshold)
+            .values('booking_id', 'content_type', 'object_id', 'source_id', 'destination_id', 'class_type')
+        )
+        if not bookings:
+            return {'expired': 0, 'seats': 0, 'segments': 0}
+        return expire_chunk(bookings)
+
+
+def expire_pending_bookings(chunk_size=500, max_chunks=None, now=None):
+    """
+    Expire unpaid bookings chunk by chunk until none are left (or
+    ``max_chunks`` ran). Safe to run from several workers at once. Returns
+    totals for the run and logs progress after every chunk.
+    """
+    threshold = (now or timezone.now()) - timedelta(minutes=hold_minutes())
+    stats = {'chunks': 0, 'expired': 0, 'seats': 0, 'segments': 0}
+    started = time.perf_counter()
+    while max_chunks is None or stats['chunks'] < max_chunks:
+        with transaction.atomic():
+            bookings = claim_expired_bookings(threshold, chunk_size)
+            if not bookings:
+                break
+            chunk = expire_chunk(bookings)
+        stats['chunks'] += 1
+        for key in ('expired', 'seats', 'segments'):
+            stats[key] += chunk[key]
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Expiry batch %d: %d bookings (%.1f/s), %d seats and %d train segments released",
+            stats['chunks'], stats['expired'], stats['expired'] / elapsed if elapsed else 0.0,
+            stats['seats'], stats['segments'],
+        )
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,72 @@
+# bookings/management/commands/benchmark_task_queues.py
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.celery import app
+from backend.task_metrics import task_queue
+from bookings.tasks import expire_booking
+
+FLOOD_TASK = 'bookings.tasks.mail_recent_bookings_to_customers_with_pdf'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure expire_booking latency before and while the notifications queue is flooded. "
+        "Needs the broker, the result backend and a worker per queue running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--probes', type=int, default=50, help="expire_booking calls per phase.")
+        parser.add_argument('--flood', type=int, default=500, help="Tasks pushed onto the flooded queue.")
+        parser.add_argument('--flood-task', default=FLOOD_TASK)
+        parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for one probe.")
+        parser.add_argument('--max-slowdown', type=float, default=2.0,
+                            help="Fail when the flooded p95 exceeds the baseline p95 by this factor.")
+
+    def probe(self, count, timeout):
+        """Round-trip seconds of ``count`` expire_booking calls on unknown bookings (a no-op)."""
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            expire_booking.apply_async((str(uuid.uuid4()),)).get(timeout=timeout)
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    def report(self, name, samples):
+        p50, p95 = statistics.median(samples), percentile(samples, 95)
+        self.stdout.write(f"{name}: {len(samples)} probes, p50 {p50 * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
+        return p95
+
+    def handle(self, *args, **options):
+        probe_queue = task_queue(expire_booking.name)
+        flood_queue = task_queue(options['flood_task'])
+        if probe_queue == flood_queue:
+            self.stdout.write(self.style.WARNING(
+                f"{expire_booking.name} and {options['flood_task']} share the '{probe_queue}' queue."
+            ))
+        try:
+            baseline = self.report('baseline', self.probe(options['probes'], options['timeout']))
+            started = time.perf_counter()
+            for _ in range(options['flood']):
+                app.send_task(options['flood_task'])
+            self.stdout.write(
+                f"queued {options['flood']} x {options['flood_task']} on '{flood_queue}' "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+            flooded = self.report('flooded', self.probe(options['probes'], options['timeout']))
+        except Exception as exc:
+            raise CommandError(f"Benchmark failed ({exc}); are the broker and a '{probe_queue}' worker running?")
+
+        slowdown = flooded / baseline if baseline else 0.0
+        message = f"expire_booking p95 under flood: {slowdown:.2f}x baseline"
+        if slowdown > options['max_slowdown']:
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
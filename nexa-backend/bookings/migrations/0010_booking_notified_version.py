@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_notified(apps, schema_editor):
+    # Bookings that already exist were handled by the old time-window poller
+    Booking = apps.get_model('bookings', 'Booking')
+    Booking.objects.update(notified_version=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_alter_booking_email'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('services', '0016_route_stop_sequence_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='notified_version',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='booking_updated_at_idx'),
+        ),
+        migrations.RunPython(mark_existing_notified, migrations.RunPython.noop),
+    ]
@@ -11,7 +11,8 @@ class Booking(models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('Confirmed', 'Confirmed'),
-        ('Cancelled', 'Cancelled')
+        ('Cancelled', 'Cancelled'),
+        ('Expired', 'Expired'),  # unpaid hold released by bookings.expiry
     ]
     PAYMENT_STATUS_CHOICES = [
         ('Pending', 'Pending'),
@@ -51,6 +52,12 @@ class Booking(models.Model):
     class_type=  models.CharField(max_length=50, blank=True, null=True)
     email  =  models.EmailField(max_length=254, blank=True, null=True)
     phone_number  =  models.CharField(max_length=20, blank=True, null=True)
+    # Last version (updated_at) the customer was emailed about, and when
+    notified_version = models.DateTimeField(null=True, blank=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['updated_at'], name='booking_updated_at_idx')]
 
     def __str__(self):
         # The service_object might be None if the related object is deleted
@@ -0,0 +1,145 @@
+"""
+Booking PDFs, rendered at most once per booking version.
+
+A booking's PDF only changes when the booking does, so rendered PDFs are
+kept in the ``BOOKING_PDF_CACHE`` cache (``pdfs``: Redis or a directory,
+shared by the web processes and the mail workers) under the booking id and
+its ``updated_at``. A changed booking gets a new key, and the old entry
+expires on its own. The same version string is the download endpoint's ETag.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+
+from payments.pdf_service import render_pdf, render_pdfs
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_cache():
+    return caches[getattr(settings, 'BOOKING_PDF_CACHE', 'pdfs')]
+
+
+def pdf_version(booking):
+    """Identifies what the booking looked like when its PDF was rendered."""
+    return f"{booking.booking_id}-{int(booking.updated_at.timestamp() * 1_000_000)}"
+
+
+def pdf_etag(booking):
+    return f'"{pdf_version(booking)}"'
+
+
+def _cache_key(booking):
+    return f"booking-pdf:{pdf_version(booking)}"
+
+
+def _ticket_of(booking):
+    try:
+        return booking.ticket
+    except ObjectDoesNotExist:
+        return None
+
+
+def build_booking_data(b):
+    """The plain dict ``generate_booking_pdf`` renders for booking ``b``."""
+    return {
+        "booking_id": str(b.booking_id),
+        "customer": str(b.customer) if b.customer else "Guest",
+        "mobile_number": b.phone_number,
+        "email_address": b.email,
+        "service_details": {
+            "type": b.service_object.__class__.__name__ if b.service_object else "UnknownService",
+            "service_id": str(getattr(b.service_object, "id", "N/A")),
+            "source": getattr(b.source_id, "name", "N/A"),
+            "destination": getattr(b.destination_id, "name", "N/A"),
+            "departure_time": getattr(b.service_object, "departure_time", timezone.now()).isoformat() if getattr(b.service_object, "departure_time", None) else timezone.now().isoformat(),
+            "arrival_time": getattr(b.service_object, "arrival_time", timezone.now()).isoformat() if getattr(b.service_object, "arrival_time", None) else timezone.now().isoformat(),
+            "status": b.status,
+            # Service-specific fields
+            "flight_number": getattr(b.service_object, "flight_number", "N/A") if b.service_object.__class__.__name__ == "FlightService" else None,
+            "airline_name": getattr(b.service_object, "airline_name", getattr(b.service_object, "provider_name", "N/A")) if b.service_object.__class__.__name__ == "FlightService" else None,
+            "train_name": getattr(b.service_object, "train_name", "N/A") if b.service_object.__class__.__name__ == "TrainService" else None,
+            "train_number": getattr(b.service_object, "train_number", "N/A") if b.service_object.__class__.__name__ == "TrainService" else None,
+            "travels_name": getattr(b.service_object, "travels_name", getattr(b.service_object, "operator_name", "N/A")) if b.service_object.__class__.__name__ == "BusService" else None,
+            "bus_number": getattr(b.service_object, "bus_number", "N/A") if b.service_object.__class__.__name__ == "BusService" else None
+        },
+        "total_amount": str(b.total_amount),
+        "status": b.status,
+        "payment_status": b.payment_status,
+        "booking_date": b.booking_date.isoformat() if b.booking_date else timezone.now().isoformat(),
+        "passengers": [
+            {
+                "name": getattr(p, "name", "N/A"),
+                "age": getattr(p, "age", "N/A"),
+                "gender": getattr(p, "gender", "N/A"),
+                "seat_no": getattr(p, "seat_number", "N/A"),
+                "document_id": getattr(p, "document_id", "N/A")
+            } for p in b.passengers.all()
+        ] if hasattr(b, 'passengers') and b.passengers.exists() else [],
+        "ticket": {
+            "ticket_no": getattr(b, "ticket_number", f"NEXA-{str(b.booking_id)[:8].upper()}"),
+            "issued_at": b.updated_at.isoformat() if b.updated_at else timezone.now().isoformat(),
+            # module matrix encoded when the ticket was issued
+            "qr_code": getattr(_ticket_of(b), "qr_code", None)
+        },
+        "status_logs": [
+            {
+                "status": log.status,
+                "timestamp": log.timestamp.isoformat(),
+                "remarks": log.remarks
+            } for log in b.status_logs.all()  # newest first; prefetched for batches
+        ],
+        "class_type": (getattr(b, "class_type", None) or "economy").lower(),
+        "policy": {
+            "cancellation_window": getattr(b.service_object, "cancellation_window", 48),
+            "cancellation_fee": getattr(b.service_object, "cancellation_fee", 0),
+            "reschedule_allowed": getattr(b.service_object, "reschedule_allowed", True),
+            "reschedule_fee": getattr(b.service_object, "reschedule_fee", 0),
+            "no_show_penalty": getattr(b.service_object, "no_show_penalty", 0),
+            "terms_conditions": getattr(b.service_object, "terms_conditions", "Standard return policy.")
+        }
+    }
+
+
+def booking_pdf(booking):
+    """The booking's PDF bytes, from the cache or rendered (and cached) now."""
+    cache = pdf_cache()
+    key = _cache_key(booking)
+    pdf = cache.get(key)
+    if pdf is None:
+        pdf = render_pdf(build_booking_data(booking))
+        cache.set(key, pdf, getattr(settings, 'BOOKING_PDF_CACHE_SECONDS', 86400))
+    return pdf
+
+
+def booking_pdfs(bookings, workers=None):
+    """
+    PDFs for many bookings, in order (``None`` for a booking that failed).
+    Cache misses are rendered together by ``render_pdfs``. Returns
+    ``(pdfs, stats)``: the render stats plus ``cached``, the number of hits.
+    """
+    cache = pdf_cache()
+    keys = [_cache_key(b) for b in bookings]
+    cached = cache.get_many(keys)
+    hits = sum(key in cached for key in keys)
+
+    missing, dicts = [], []
+    for booking, key in zip(bookings, keys):
+        if key in cached:
+            continue
+        try:
+            dicts.append(build_booking_data(booking))
+            missing.append(key)
+        except Exception:
+            logger.exception("Could not build PDF data for booking %s", booking.booking_id)
+
+    rendered, stats = render_pdfs(dicts, workers=workers)
+    fresh = {key: pdf for key, pdf in zip(missing, rendered) if pdf is not None}
+    if fresh:
+        cache.set_many(fresh, getattr(settings, 'BOOKING_PDF_CACHE_SECONDS', 86400))
+    cached.update(fresh)
+    stats['cached'] = hits
+    return [cached.get(key) for key in keys], stats
@@ -2,6 +2,7 @@
 from rest_framework import serializers
 from .models import Booking, BookingPassenger, Ticket, BookingStatus
 from services.models import BusService, TrainService, FlightService,BusSeat,FlightSeat, Station,Policy
+from services.seating import class_capacity, composed_seats
 from services.serializers import RouteNestedSerializer
 from user_management.models import Customer,ServiceProvider
 import uuid
@@ -196,14 +197,14 @@ class BusServiceSeatAvailabilitySerializer(serializers.ModelSerializer):
         # ❗️ WARNING: This logic is still simple. 
         # It ignores source_id/destination_id because the BusSeat model
         # only has 'is_booked', not an availability_mask.
-        available = obj.seats.filter(is_booked=False)
+        available = [seat for seat in composed_seats(obj) if not seat.is_booked]
         
         # We pass the full seat data
         return BusSeatSerializer(available, many=True).data
 
     def get_total_available(self, obj):
         # This is correct for the simple model
-        return obj.seats.filter(is_booked=False).count()
+        return sum(1 for seat in composed_seats(obj) if not seat.is_booked)
     def get_rating(self, obj):
         """
         Placeholder static rating — you can connect to reviews later.
@@ -386,7 +387,7 @@ class TrainSearchResultSerializer(serializers.ModelSerializer):
         Return total available seats for a given class_type.
         """
         class_type = self.context.get("class_type", "Sleeper")
-        total = obj.train_seats.filter(class_type=class_type).count()
+        total = class_capacity(obj, class_type)
         booked = sum(seg.available_count_sleeper for seg in obj.segments.all()) if obj.segments.exists() else 0
         available = total if total > 0 else 0
         return available
@@ -433,7 +434,7 @@ class FlightServiceSeatAvailabilitySerializer(serializers.ModelSerializer):
 
     def get_available_seats(self, obj):
         # ✅ Only return seats that are not booked
-        seats = obj.flight_seats.filter(is_booked=False)
+        seats = [seat for seat in composed_seats(obj) if not seat.is_booked]
         return FlightSeatSerializer(seats, many=True).data
     
 class BookingPassengerCreateSerializer(serializers.Serializer):
@@ -595,6 +596,8 @@ class BookingCancelSerializer(serializers.Serializer):
             raise serializers.ValidationError("Booking not provided in context.")
         if booking.status == "Cancelled":
             raise serializers.ValidationError("Booking is already cancelled.")
+        if booking.status == "Expired":
+            raise serializers.ValidationError("Booking has expired; its seats were already released.")
         return attrs
 
     def perform_cancellation(self):
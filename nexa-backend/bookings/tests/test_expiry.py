@@ -0,0 +1,143 @@
+import pytest
+from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.expiry import expire_pending_bookings
+from bookings.models import Booking, BookingPassenger, BookingStatus
+from bookings.tasks import delete_unconfirmed_bookings
+from services.models import BusService, BusSeat, TrainService, TrainSeat, TrainServiceSegment, Station, RouteStop
+
+pytestmark = pytest.mark.django_db
+
+
+def hold(customer, service, seats, minutes_ago, **fields):
+    booking = Booking.objects.create(
+        customer=customer, total_amount=100, content_type=ContentType.objects.get_for_model(service),
+        object_id=service.service_id, **fields,
+    )
+    Booking.objects.filter(pk=booking.pk).update(booking_date=timezone.now() - timedelta(minutes=minutes_ago))
+    return booking, [BookingPassenger.objects.create(booking=booking, name="P", seat_no=s) for s in seats]
+
+
+@pytest.fixture
+def bus(user_provider, vehicle, policy, stations_and_route):
+    return BusService.objects.create(
+        provider_user_id=user_provider, route=stations_and_route["route"], vehicle=vehicle, policy=policy,
+        departure_time=timezone.now() + timedelta(days=1), arrival_time=timezone.now() + timedelta(days=1, hours=2),
+        base_price=100, sleeper_price=100, non_sleeper_price=80, total_capacity=4, booked_seats=3,
+    )
+
+
+@pytest.fixture
+def auth_api(user_customer):
+    client = APIClient()
+    client.force_authenticate(user_customer)
+    return client
+
+
+def test_expired_bus_holds_release_seats_and_keep_history(user_customer, bus):
+    stale, stale_passengers = hold(user_customer, bus, ["A1", "A2"], minutes_ago=20)
+    fresh, fresh_passengers = hold(user_customer, bus, ["A3"], minutes_ago=5)
+    for passenger in stale_passengers + fresh_passengers:
+        BusSeat.objects.create(bus_service=bus, seat_number=passenger.seat_no, seat_type="Sleeper",
+                               is_booked=True, price=50, booking_passenger=passenger)
+
+    assert delete_unconfirmed_bookings() == \
+        "Expired 1 pending bookings in 1 chunks (2 seats, 0 train segments released)."
+
+    stale.refresh_from_db()
+    assert stale.status == "Expired"
+    assert BookingStatus.objects.filter(booking=stale, status="Expired").count() == 1
+    assert Booking.objects.get(pk=fresh.pk).status == "Pending"
+    assert set(BusSeat.objects.filter(is_booked=True).values_list("seat_number", flat=True)) == {"A3"}
+    bus.refresh_from_db()
+    assert bus.booked_seats == 1
+
+
+def test_expired_train_holds_return_segments(user_customer, user_provider, vehicle, policy, stations_and_route):
+    route, src, dst = stations_and_route["route"], stations_and_route["src"], stations_and_route["dst"]
+    far = Station.objects.create(name="FARCITY", code="FAR", city="FAR")
+    RouteStop.objects.create(route=route, station=far, stop_order=2, price_to_destination=0.0)
+    train = TrainService.objects.create(
+        provider_user_id=user_provider, route=route, vehicle=vehicle, policy=policy, train_name="Express",
+        train_number="101", base_price=500, departure_time=timezone.now() + timedelta(days=2),
+        arrival_time=timezone.now() + timedelta(days=2, hours=8),
+    )
+    TrainServiceSegment.objects.filter(train_service=train).delete()
+    for index, (a, b) in enumerate([(src, dst), (dst, far)]):
+        TrainServiceSegment.objects.create(train_service=train, from_station=a, to_station=b,
+                                           segment_index=index, available_count_sleeper=9)
+    TrainSeat.objects.create(train_service=train, bogie_number=1, seat_number="S1", seat_type="Lower",
+                             class_type="sleeper", availability_mask="11")
+    hold(user_customer, train, ["S1"], minutes_ago=30, source_id=src, destination_id=dst, class_type="Sleeper")
+
+    stats = expire_pending_bookings(chunk_size=10)
+    assert (stats["expired"], stats["seats"], stats["segments"]) == (1, 1, 1)
+    assert TrainSeat.objects.get(train_service=train, seat_number="S1").availability_mask == "01"
+    counts = dict(TrainServiceSegment.objects.filter(train_service=train)
+                  .values_list("segment_index", "available_count_sleeper"))
+    assert counts == {0: 10, 1: 9}
+
+
+def test_expiry_runs_in_chunks_and_blocks_payment(user_customer, bus, auth_api):
+    bookings = [hold(user_customer, bus, [], minutes_ago=60)[0] for _ in range(5)]
+
+    stats = expire_pending_bookings(chunk_size=2)
+    assert (stats["chunks"], stats["expired"]) == (3, 5)
+    assert expire_pending_bookings()["expired"] == 0
+
+    resp = auth_api.post("/payments/confirm/", {"booking_id": str(bookings[0].booking_id)})
+    assert resp.status_code == 400
+
+
+def test_each_booking_schedules_and_runs_its_own_expiry(user_customer, bus, monkeypatch):
+    from bookings import expiry, tasks
+    scheduled = []
+    monkeypatch.setattr(tasks.expire_booking, "apply_async", lambda args, **kw: scheduled.append((args, kw)))
+
+    booking, passengers = hold(user_customer, bus, ["A1"], minutes_ago=14)
+    BusSeat.objects.create(bus_service=bus, seat_number="A1", seat_type="Sleeper", is_booked=True, price=50,
+                           booking_passenger=passengers[0])
+    booking.refresh_from_db()
+    expiry.schedule_expiry(booking)
+    (args, options), = scheduled
+    assert args == (str(booking.booking_id),)
+    assert options["eta"] == booking.booking_date + timedelta(minutes=15)
+    assert options["task_id"] == expiry.expiry_task_id(booking.booking_id)
+
+    assert tasks.expire_booking(str(booking.booking_id)) == 0  # a minute early: still held
+    (args, options) = scheduled[-1]  # ...so it is queued again for the rest of the hold
+    assert args == (str(booking.booking_id),) and options["task_id"] == expiry.expiry_task_id(booking.booking_id)
+    assert 50 <= options["countdown"] <= 61
+    assert BusSeat.objects.get(seat_number="A1").is_booked
+
+    Booking.objects.filter(pk=booking.pk).update(booking_date=timezone.now() - timedelta(minutes=15))
+    assert tasks.expire_booking(str(booking.booking_id)) == 1
+    assert not BusSeat.objects.get(seat_number="A1").is_booked
+    assert tasks.expire_booking(str(booking.booking_id)) == 0
+    assert len(scheduled) == 2  # expired bookings are not queued again
+
+
+def test_expiry_never_cuts_a_hold_short(user_customer, bus):
+    from bookings import expiry
+    booking, _ = hold(user_customer, bus, [], minutes_ago=0)
+    booking.refresh_from_db()
+    lapses = booking.booking_date + timedelta(minutes=15)
+    assert expiry.expire_bookings([booking.booking_id], now=lapses - timedelta(seconds=3))["expired"] == 0
+    assert expiry.expire_bookings([booking.booking_id], now=lapses + timedelta(seconds=1))["expired"] == 1
+
+
+def test_payment_revokes_the_expiry(user_customer, bus, auth_api, monkeypatch, settings,
+                                    django_capture_on_commit_callbacks):
+    from celery import current_app
+    settings.PAYMENT_OUTBOX_KICK = False
+    revoked = []
+    monkeypatch.setattr(current_app.control, "revoke", revoked.append)
+    booking, _ = hold(user_customer, bus, [], minutes_ago=1)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = auth_api.post("/payments/confirm/", {"booking_id": str(booking.booking_id)})
+    assert resp.status_code == 200
+    assert revoked == [f"expire-booking-{booking.booking_id}"]
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.exports import export_rows
+from bookings.models import Booking
+from payments.models import Transaction
+
+
+def body(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.fixture
+def provider_api(user_provider):
+    client = APIClient()
+    client.force_authenticate(user_provider)
+    return client
+
+
+@pytest.mark.django_db
+def test_booking_export_streams_csv_within_date_range(provider_api, user_provider, user_customer):
+    for days_ago in (0, 1, 10):
+        booking = Booking.objects.create(customer=user_customer, provider=user_provider, total_amount=100 + days_ago)
+        Booking.objects.filter(pk=booking.pk).update(booking_date=timezone.now() - timedelta(days=days_ago))
+    Booking.objects.create(customer=user_customer, total_amount=999)  # another provider's
+
+    since = (timezone.localdate() - timedelta(days=2)).isoformat()
+    response = provider_api.get(f"/bookings/bookings-list/export/?from={since}")
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv"
+
+    rows = list(csv.DictReader(io.StringIO(body(response))))
+    assert [row["total_amount"] for row in rows] == ["100.00", "101.00"]
+    assert rows[0]["customer"] == "cust"
+
+
+@pytest.mark.django_db
+def test_transaction_export_as_ndjson(provider_api, user_provider, user_customer):
+    booking = Booking.objects.create(customer=user_customer, provider=user_provider, total_amount=250)
+    Transaction.objects.create(booking=booking, customer_user=user_customer, provider_user=user_provider,
+                               amount=250, method="UPI", status="Success")
+
+    response = provider_api.get("/payments/transactions/export/?export_format=ndjson")
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in body(response).splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["amount"] == "250.00" and lines[0]["booking_id"] == str(booking.booking_id)
+
+    assert provider_api.get("/payments/transactions/export/?export_format=xml").status_code == 400
+    assert provider_api.get("/payments/transactions/export/?from=yesterday").status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_rows_are_read_inside_a_transaction(user_customer):
+    Booking.objects.create(customer=user_customer, total_amount=100)
+    depth = len(connection.atomic_blocks)  # the test's own transaction
+    rows = export_rows(Booking.objects.all(), ["total_amount"])
+    assert next(rows) == (100,)
+    assert len(connection.atomic_blocks) == depth + 1  # a server-side cursor survives transaction pooling
+    assert list(rows) == []
+    assert len(connection.atomic_blocks) == depth
@@ -0,0 +1,73 @@
+import pytest
+from rest_framework.test import APIClient
+
+from bookings import pdfs
+from bookings.models import Booking
+
+
+@pytest.fixture
+def customer_api(user_customer):
+    client = APIClient()
+    client.force_authenticate(user_customer)
+    return client
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Count the bookings actually rendered."""
+    pdfs.pdf_cache().clear()
+    calls = []
+    real = pdfs.render_pdf
+
+    def counting(data):
+        calls.append(data["booking_id"])
+        return real(data)
+    monkeypatch.setattr(pdfs, "render_pdf", counting)
+    return calls
+
+
+@pytest.mark.django_db
+def test_pdf_download_is_rendered_once_per_version(customer_api, user_customer, renders):
+    booking = Booking.objects.create(customer=user_customer, total_amount=250)
+    url = f"/bookings/bookings/{booking.pk}/pdf/"
+
+    first = customer_api.get(url)
+    assert first.status_code == 200
+    assert first["Content-Type"] == "application/pdf"
+    assert first.content.startswith(b"%PDF")
+    etag = first["ETag"]
+
+    assert customer_api.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert customer_api.get(url).content == first.content
+    assert len(renders) == 1
+
+    booking.status = "Cancelled"
+    booking.save()
+    changed = customer_api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200 and changed["ETag"] != etag
+    assert len(renders) == 2
+
+
+@pytest.mark.django_db
+def test_other_customers_cannot_download(user_provider, user_customer):
+    booking = Booking.objects.create(customer=user_customer, total_amount=250)
+    client = APIClient()
+    client.force_authenticate(user_provider)
+    assert client.get(f"/bookings/bookings/{booking.pk}/pdf/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_booking_pdfs_renders_only_cache_misses(user_customer):
+    pdfs.pdf_cache().clear()
+    first, second = (Booking.objects.create(customer=user_customer, total_amount=a) for a in (100, 200))
+    cached_pdf = pdfs.booking_pdf(first)
+
+    result, stats = pdfs.booking_pdfs([first, second], workers=1)
+    assert result[0] == cached_pdf and result[1].startswith(b"%PDF")
+    assert (stats["cached"], stats["count"]) == (1, 1)
+
+
+def test_pdf_cache_is_shared_between_processes(settings):
+    # Per-process memory would make the mail workers re-render what the web processes cached
+    backend = settings.CACHES[settings.BOOKING_PDF_CACHE]["BACKEND"]
+    assert not backend.endswith("LocMemCache")
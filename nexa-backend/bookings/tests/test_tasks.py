@@ -0,0 +1,119 @@
+import pytest
+from django.core import mail
+
+from bookings import pdfs, tasks
+from bookings.models import Booking
+from payments.models import PaymentEvent
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_pdf_cache():
+    pdfs.pdf_cache().clear()
+
+
+def mail_updates():
+    return tasks.mail_recent_bookings_to_customers_with_pdf()
+
+
+def test_each_booking_version_is_mailed_once(user_customer):
+    booking = Booking.objects.create(customer=user_customer, total_amount=300, email="trip@example.com")
+    Booking.objects.create(customer=None, total_amount=10)  # no address anywhere
+
+    result = mail_updates()
+    assert (result["total_found"], result["sent"], result["skipped_no_email"]) == (2, 1, 1)
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == ["trip@example.com"]
+    assert mail.outbox[0].attachments[0][0] == f"Booking_{booking.booking_id}.pdf"
+
+    assert mail_updates() == "no_updates"
+
+    booking.status = "Cancelled"
+    booking.save()
+    assert mail_updates()["sent"] == 1
+    assert len(mail.outbox) == 2
+    booking.refresh_from_db()
+    assert booking.notified_version == booking.updated_at
+
+
+def test_failed_send_is_retried_next_run(user_customer, monkeypatch):
+    Booking.objects.create(customer=user_customer, total_amount=300, email="trip@example.com")
+    real = tasks.booking_email
+
+    def broken(*args, **kwargs):
+        raise ConnectionError("smtp down")
+    monkeypatch.setattr(tasks, "booking_email", broken)
+    assert mail_updates()["errors"] == 1
+
+    monkeypatch.setattr(tasks, "booking_email", real)
+    assert mail_updates()["sent"] == 1
+    assert len(mail.outbox) == 1
+
+
+def test_smtp_connection_failure_leaves_batch_due(user_customer, monkeypatch):
+    booking = Booking.objects.create(customer=user_customer, total_amount=300, email="trip@example.com")
+
+    class Unreachable:
+        def __enter__(self):
+            raise ConnectionRefusedError("smtp unreachable")
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(tasks, "get_connection", lambda **kwargs: Unreachable())
+    with pytest.raises(ConnectionRefusedError):
+        tasks.mail_recent_bookings_to_customers_with_pdf.run()
+    booking.refresh_from_db()
+    assert booking.notified_version is None
+
+    monkeypatch.undo()
+    assert mail_updates()["sent"] == 1
+    assert len(mail.outbox) == 1
+
+
+def test_outbox_confirmations_are_left_to_the_outbox(user_customer):
+    booking = Booking.objects.create(customer=user_customer, total_amount=300, email="trip@example.com")
+    event = PaymentEvent.objects.create(booking=booking)
+    assert mail_updates() == "no_updates"
+
+    assert tasks.send_booking_email(booking)
+    PaymentEvent.objects.filter(pk=event.pk).update(status="Done")
+    assert mail_updates() == "no_updates"
+    assert len(mail.outbox) == 1
+
+
+def test_claimed_batch_builds_pdf_data_in_constant_queries(user_customer, django_assert_num_queries):
+    from datetime import timedelta
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+
+    from bookings.models import BookingPassenger, BookingStatus
+
+    def add_booking():
+        booking = Booking.objects.create(customer=user_customer, total_amount=300, email="trip@example.com")
+        BookingPassenger.objects.create(booking=booking, name="A", age=30, gender="F")
+        BookingStatus.objects.create(booking=booking, status="Pending")
+        BookingStatus.objects.create(booking=booking, status="Confirmed")
+        BookingStatus.objects.filter(booking=booking, status="Pending").update(
+            timestamp=timezone.now() - timedelta(minutes=5)
+        )
+        return booking
+
+    def claim_and_build():
+        data = [pdfs.build_booking_data(b) for b in tasks.claim_updated_bookings(100)]
+        assert all(len(d["status_logs"]) == 2 and len(d["passengers"]) == 1 for d in data)
+        return data
+
+    add_booking()
+    with CaptureQueriesContext(connection) as one:
+        assert len(claim_and_build()) == 1
+
+    for _ in range(5):
+        add_booking()
+    with django_assert_num_queries(len(one)):
+        data = claim_and_build()
+    assert len(data) == 5
+    assert [log["status"] for log in data[0]["status_logs"]] == ["Confirmed", "Pending"]
@@ -13,6 +13,7 @@ from services.models import (
     Station,
 )
 from datetime import datetime, timedelta
+from decimal import Decimal
 import pytz
 from unittest.mock import patch, MagicMock
 from rest_framework.permissions import AllowAny
@@ -136,6 +137,37 @@ def test_bus_booking_create_with_requested_seat(mock_select, mock_handle, user_c
     assert resp.status_code == 201, resp.data
 
 
+@pytest.mark.django_db
+def test_bus_and_flight_bookings_record_quoted_fares(user_customer, user_provider, policy, vehicle, stations_and_route,
+                                                    django_capture_on_commit_callbacks):
+    """Seat prices of a booking are recorded as fare history, once per class."""
+    from services import fare_history
+
+    route = stations_and_route["route"]
+    common = dict(provider_user_id=user_provider, route=route, vehicle=vehicle, policy=policy, status="Scheduled",
+                  departure_time=datetime.now(pytz.utc) + timedelta(days=1),
+                  arrival_time=datetime.now(pytz.utc) + timedelta(days=1, hours=2))
+    bus = BusService.objects.create(base_price=100, sleeper_price=100, non_sleeper_price=80, total_capacity=4, **common)
+    BusSeat.objects.create(bus_service=bus, seat_number="A1", seat_type="Sleeper", is_booked=False, price=110)
+    BusSeat.objects.create(bus_service=bus, seat_number="A2", seat_type="Sleeper", is_booked=False, price=110)
+    flight = FlightService.objects.create(base_price=200, economy_price=150, total_capacity=4, **common)
+    FlightSeat.objects.create(flight_service=flight, seat_number="F1", seat_class="Economy", is_booked=False, price=165)
+
+    fare_history._buffer.clear()
+    viewset = BookingViewSet()
+    with django_capture_on_commit_callbacks(execute=True):
+        viewset._handle_bus_booking(Booking.objects.create(customer=user_customer, total_amount=0), bus,
+                                    [{"name": "P1", "gender": "F", "seat_no": "A1"}, {"name": "P2", "gender": "M", "seat_no": "A2"}],
+                                    "Sleeper", False, False)
+        viewset._handle_flight_booking(Booking.objects.create(customer=user_customer, total_amount=0), flight,
+                                       [{"name": "P3", "gender": "F"}], "Economy")
+    # Written by a due flush on the way or by this one
+    fare_history.flush_fare_history()
+
+    assert [p for _, p in fare_history.get_fare_series(bus, "Sleeper")] == [Decimal("110.00")]
+    assert [p for _, p in fare_history.get_fare_series(flight, "Economy")] == [Decimal("165.00")]
+
+
 @pytest.mark.django_db
 @patch("bookings.views.BookingViewSet._handle_flight_booking", return_value={"total_amount": 150, "assigned_seats": ["F1"]})
 @patch("bookings.views.FlightService.objects.select_for_update")
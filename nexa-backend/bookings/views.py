@@ -2,6 +2,8 @@
 from datetime import datetime, timezone
 from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from rest_framework import viewsets, status,exceptions
 from django.db.models import F,Value,JSONField,IntegerField,OuterRef,Subquery
 from decimal import Decimal
@@ -37,6 +39,11 @@ from services.models import (
     Station,RouteStop,Route
 )
 from services.serializers import TrainServiceSerializer
+from services.fare_history import record_fare
+from services.seating import materialize_seats, untouched_seat_numbers
+from .exports import streaming_export
+from .pdfs import booking_pdf, pdf_etag
+from .expiry import schedule_expiry
 from payments.models import Transaction, Refund, LoyaltyWallet
 from user_management.models import ServiceProvider
 
@@ -53,6 +60,13 @@ SERVICE_MODEL_MAP = {
     'flight': FlightService,
 }
 
+
+def _record_seat_fares(service, seats, class_field):
+    """Record the fare quoted for each seat class in a booking, once per class."""
+    fares = {getattr(seat, class_field): seat.price for seat in seats}
+    for class_type, price in fares.items():
+        record_fare(service, class_type, price)
+
 class BookingViewSet(viewsets.ModelViewSet):
     """
     Booking endpoints for creating and managing bookings.
@@ -218,6 +232,8 @@ class BookingViewSet(viewsets.ModelViewSet):
             status="Pending", 
             remarks="Booking created; awaiting payment."
         )
+        # Release the hold as soon as it lapses unless paid by then
+        transaction.on_commit(lambda: schedule_expiry(booking))
 
         # 9. Prepare the response
         response_data = {
@@ -253,6 +269,8 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         # 1. Process requested seats
         if passenger_map:
+            # Layout services only have rows for seats booked before
+            materialize_seats(service, passenger_map.keys())
             requested_seats = list(
                 BusSeat.objects.select_for_update().filter(
                     bus_service=service, 
@@ -283,7 +301,10 @@ class BookingViewSet(viewsets.ModelViewSet):
                 filter_q &= Q(seat_type=class_type)
             else:
                 raise ValueError("class_type is required for auto-assigning bus seats.")
-            
+            materialize_seats(service, untouched_seat_numbers(
+                service, class_type, len(passengers_auto_assign), exclude=passenger_map.keys()
+            ))
+
             available_seats = list(
                 BusSeat.objects.select_for_update()
                 .filter(filter_q)
@@ -327,6 +348,7 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         # 5. Save all seat updates at once
         BusSeat.objects.bulk_update(seats_to_update, ['is_booked', 'booking_passenger'])
+        _record_seat_fares(service, seats_to_update, 'seat_type')
 
         return {
             'total_amount': total_amount * price_markup_multiplier,
@@ -348,6 +370,7 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         # 1. Process requested seats
         if passenger_map:
+            materialize_seats(service, passenger_map.keys())
             requested_seats = list(
                 FlightSeat.objects.select_for_update().filter(
                     flight_service=service, 
@@ -375,7 +398,10 @@ class BookingViewSet(viewsets.ModelViewSet):
         if passengers_auto_assign:
             if not class_type:
                 raise ValueError("class_type is required for auto-assigning flight seats.")
-                
+            materialize_seats(service, untouched_seat_numbers(
+                service, class_type, len(passengers_auto_assign), exclude=passenger_map.keys()
+            ))
+
             available_seats = list(
                 FlightSeat.objects.select_for_update()
                 .filter(flight_service=service, is_booked=False, seat_class=class_type)
@@ -419,6 +445,7 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         # 5. Bulk update seats
         FlightSeat.objects.bulk_update(seats_to_update, ['is_booked', 'booking_passenger'])
+        _record_seat_fares(service, seats_to_update, 'seat_class')
 
         return {
             'total_amount': total_amount, # No markup for flights in this logic
@@ -446,7 +473,7 @@ class BookingViewSet(viewsets.ModelViewSet):
             raise exceptions.ValidationError("This train service has not been configured correctly (no segments found).")
 
         # 2. Calculate Price
-        price_per_passenger = service.get_price_for_journey(from_station, to_station, class_type)
+        price_per_passenger = service.get_price_for_journey(from_station, to_station, class_type, record=True)
         if price_per_passenger is None:
             raise ValueError("Could not calculate price for this journey.")
         total_amount = price_per_passenger * num_passengers
@@ -477,6 +504,7 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         # 4a. Process requested seats
         if passenger_map:
+            materialize_seats(service, passenger_map.keys())
             requested_seats = list(
                 TrainSeat.objects.select_for_update().filter(
                     train_service=service, 
@@ -522,6 +550,16 @@ class BookingViewSet(viewsets.ModelViewSet):
                 if (current_mask_int & booking_mask_int) == 0:
                     available_seats.append(seat)
                     if len(available_seats) == needed: break
+
+            # Layout seats without a row yet are free on every segment
+            if len(available_seats) < needed:
+                fresh = untouched_seat_numbers(
+                    service, class_field_map[class_type], needed - len(available_seats), exclude=passenger_map.keys()
+                )
+                materialize_seats(service, fresh)
+                available_seats += list(
+                    TrainSeat.objects.select_for_update().filter(train_service=service, seat_number__in=fresh)
+                )
             
             if len(available_seats) < needed:
                 raise exceptions.PermissionDenied("Could not find enough contiguous seats.")
@@ -696,6 +734,24 @@ class BookingViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Ticket not found for this booking. It may not be issued yet."}, status=status.HTTP_404_NOT_FOUND)
             
         return Response(TicketSerializer(ticket).data)
+
+    @action(detail=True, methods=["get"], url_path="pdf")
+    def pdf(self, request, pk=None):
+        """
+            Download the booking confirmation PDF. Rendered once per booking
+            version; sends 304 Not Modified when If-None-Match has the ETag.
+        """
+        booking = self.get_object()
+        etag = pdf_etag(booking)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = HttpResponse(booking_pdf(booking), content_type="application/pdf")
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        response["Content-Disposition"] = f'attachment; filename="Booking_{booking.booking_id}.pdf"'
+        return response
 # # ---------- Helper ----------
 def _parse_date(date_str):
     """Parse date string safely."""
@@ -1071,6 +1127,43 @@ class BookingListViewSet(viewsets.ReadOnlyModelViewSet):
         bookings = self.get_queryset()
         serializer = self.get_serializer(bookings, many=True)
         return Response(serializer.data)
+
+    EXPORT_COLUMNS = [
+        ('booking_id', 'booking_id'),
+        ('status', 'status'),
+        ('payment_status', 'payment_status'),
+        ('service_type', 'content_type__model'),
+        ('service_id', 'object_id'),
+        ('class_type', 'class_type'),
+        ('source', 'source_id__name'),
+        ('destination', 'destination_id__name'),
+        ('customer', 'customer__username'),
+        ('email', 'email'),
+        ('phone_number', 'phone_number'),
+        ('total_amount', 'total_amount'),
+        ('booking_date', 'booking_date'),
+    ]
+
+    @swagger_auto_schema(
+        operation_summary="Export bookings",
+        operation_description=(
+            "Streams the provider's bookings (every booking for admins) as CSV or NDJSON, "
+            "newest first, in constant memory."
+        ),
+        manual_parameters=[
+            openapi.Parameter('export_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['csv', 'ndjson'], default='csv'),
+            openapi.Parameter('from', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='First day (inclusive)'),
+            openapi.Parameter('to', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='Last day (inclusive)'),
+        ],
+    )
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[IsAuthenticated])
+    def export(self, request):
+        user = request.user
+        queryset = Booking.objects.all() if user.user_type == 'admin' else Booking.objects.filter(provider=user)
+        return streaming_export(
+            request, queryset.order_by('-booking_date'), self.EXPORT_COLUMNS,
+            date_field='booking_date', filename='bookings',
+        )
 from .serializers import CheapestFareSerializer
 
 class CheapestFaresFromView(APIView):
@@ -0,0 +1,213 @@
+"""
+Provider financial summaries.
+
+Revenue by service type comes from one conditional aggregation over
+``Transaction`` (``Sum(filter=...)`` per booking content type) instead of
+walking every transaction in Python. With ``FINANCE_DASHBOARD_USE_ROLLUP``
+on, whole days come from ``ProviderFinanceDaily`` and only transactions
+outside the rolled-up days (after the latest one, or before the earliest
+one when history was never backfilled) are aggregated live, so the cost no
+longer grows with the provider's history. Refunds, payouts and the ledger
+figures all come from the provider's ``ProviderBalance`` row.
+
+A refund turns a transaction from Success to Refunded, possibly long after
+its day was rolled up; ``refresh_rollup_days`` rebuilds those days so the
+rolled-up revenue drops it too.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Sum, Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Transaction, ProviderFinanceDaily
+from .ledger import balance_for
+
+ZERO = Decimal('0.00')
+MODES = ('bus', 'train', 'flight')
+
+
+def _mode_content_types():
+    from services.models import BusService, TrainService, FlightService
+    by_model = ContentType.objects.get_for_models(BusService, TrainService, FlightService)
+    return {
+        'bus': by_model[BusService],
+        'train': by_model[TrainService],
+        'flight': by_model[FlightService],
+    }
+
+
+def revenue_aggregates():
+    """Aggregate kwargs: total revenue, revenue per mode, transaction count."""
+    content_types = _mode_content_types()
+    aggregates = {'total': Sum('amount'), 'count': Count('txn_id')}
+    for mode in MODES:
+        aggregates[mode] = Sum('amount', filter=Q(booking__content_type=content_types[mode]))
+    return aggregates
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def provider_revenue(user, use_rollup=None):
+    """Return {'total', 'bus', 'train', 'flight', 'misc'} revenue of successful transactions."""
+    if use_rollup is None:
+        use_rollup = getattr(settings, 'FINANCE_DASHBOARD_USE_ROLLUP', False)
+
+    totals = dict.fromkeys(('total',) + MODES, ZERO)
+    live = Transaction.objects.filter(provider_user=user, status='Success')
+
+    if use_rollup:
+        rolled = ProviderFinanceDaily.objects.filter(provider=user).aggregate(
+            first_day=Min('day'), last_day=Max('day'), total=Sum('total_revenue'),
+            bus=Sum('bus_revenue'), train=Sum('train_revenue'), flight=Sum('flight_revenue'),
+        )
+        if rolled['last_day']:
+            for key in totals:
+                totals[key] += rolled[key] or ZERO
+            live = live.filter(
+                Q(transaction_date__lt=_day_start(rolled['first_day']))
+                | Q(transaction_date__gte=_day_start(rolled['last_day'] + timedelta(days=1)))
+            )
+
+    current = live.aggregate(**revenue_aggregates())
+    for key in totals:
+        totals[key] += current.get(key) or ZERO
+    totals['misc'] = totals['total'] - sum(totals[mode] for mode in MODES)
+    return totals
+
+
+def provider_financial_summary(user, use_rollup=None):
+    """
+    Summary and revenue breakdown served by ``FinancialDashboardView``.
+    ``pending_settlement`` deducts payouts once their settlement is created,
+    when the ledger records them.
+    """
+    revenue = provider_revenue(user, use_rollup)
+    total_earnings = revenue['total']
+    ledger = balance_for(user)
+
+    platform_fees = (total_earnings * Decimal('0.00')).quantize(Decimal('0.01'))
+
+    labels = {"Bus": 'bus', "Train": 'train', "Flight": 'flight', "Miscellaneous": 'misc'}
+    total_revenue = total_earnings or Decimal('1.0')
+    breakdown = [
+        {
+            "label": label,
+            "value": revenue[key],
+            "percentage": round((revenue[key] / total_revenue) * 100, 2)
+        }
+        for label, key in labels.items()
+    ]
+
+    return {
+        "summary": {
+            "total_earnings": total_earnings,
+            "pending_settlement": total_earnings - ledger.total_payouts,
+            "refunds_issued": ledger.total_refunds,
+            "platform_fees": platform_fees,
+        },
+        "revenue_breakdown": breakdown,
+        "ledger": {
+            "balance": ledger.balance,
+            "total_sales": ledger.total_sales,
+            "total_refunds": ledger.total_refunds,
+            "total_fees": ledger.total_fees,
+            "total_payouts": ledger.total_payouts,
+        },
+    }
+
+
+def _first_rollup_day(days, today, full):
+    """
+    The trailing ``days`` window, stretched back to the day after the last
+    rolled-up one if runs were missed. The first run, or ``full``, covers
+    the whole transaction history.
+    """
+    first_day = today - timedelta(days=days)
+    last_rolled = None if full else ProviderFinanceDaily.objects.aggregate(last=Max('day'))['last']
+    if last_rolled:
+        return min(first_day, last_rolled + timedelta(days=1))
+    earliest = (
+        Transaction.objects.filter(status='Success', provider_user__isnull=False)
+        .aggregate(first=Min('transaction_date'))['first']
+    )
+    return min(first_day, timezone.localdate(earliest)) if earliest else first_day
+
+
+def _daily_rollups(transactions):
+    """Unsaved ``ProviderFinanceDaily`` rows for ``transactions``, per provider and day."""
+    rows = (
+        transactions.filter(status='Success', provider_user__isnull=False)
+        .annotate(day=TruncDate('transaction_date'))
+        .order_by()
+        .values('provider_user', 'day')
+        .annotate(**revenue_aggregates())
+    )
+    return [
+        ProviderFinanceDaily(
+            provider_id=row['provider_user'], day=row['day'],
+            total_revenue=row['total'] or ZERO, transaction_count=row['count'],
+            bus_revenue=row['bus'] or ZERO, train_revenue=row['train'] or ZERO, flight_revenue=row['flight'] or ZERO,
+        )
+        for row in rows
+    ]
+
+
+@transaction.atomic
+def rollup_provider_finances(days=None, today=None, full=False):
+    """
+    Rebuild ``ProviderFinanceDaily`` for the ``days`` full days before
+    ``today``, plus any days not rolled up yet (see ``_first_rollup_day``).
+    Returns the number of rows written.
+    """
+    days = days or getattr(settings, 'FINANCE_ROLLUP_DAYS', 7)
+    today = today or timezone.localdate()
+    first_day = _first_rollup_day(days, today, full)
+
+    rollups = _daily_rollups(Transaction.objects.filter(
+        transaction_date__gte=_day_start(first_day), transaction_date__lt=_day_start(today),
+    ))
+    ProviderFinanceDaily.objects.filter(day__gte=first_day, day__lt=today).delete()
+    ProviderFinanceDaily.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+@transaction.atomic
+def refresh_rollup_days(transactions):
+    """
+    Rebuild the already rolled-up (provider, day) rows of ``transactions``,
+    e.g. after they were refunded. Days not rolled up yet are left to the
+    next rollup run. A day with nothing left keeps a zero row, so the
+    rolled-up range stays the same. Returns the number of rows rebuilt.
+    """
+    pairs = {
+        (txn.provider_user_id, timezone.localdate(txn.transaction_date))
+        for txn in transactions if txn.provider_user_id
+    }
+    if not pairs:
+        return 0
+    lookup = Q()
+    for provider_id, day in pairs:
+        lookup |= Q(provider_id=provider_id, day=day)
+    stale = ProviderFinanceDaily.objects.select_for_update().filter(lookup)
+    rolled = set(stale.values_list('provider_id', 'day'))
+    if not rolled:
+        return 0
+
+    txn_lookup = Q()
+    for provider_id, day in rolled:
+        txn_lookup |= Q(provider_user_id=provider_id, transaction_date__gte=_day_start(day),
+                        transaction_date__lt=_day_start(day + timedelta(days=1)))
+    rollups = {(r.provider_id, r.day): r for r in _daily_rollups(Transaction.objects.filter(txn_lookup))}
+    for provider_id, day in rolled - rollups.keys():
+        rollups[(provider_id, day)] = ProviderFinanceDaily(provider_id=provider_id, day=day, total_revenue=ZERO,
+                                                           transaction_count=0)
+    ProviderFinanceDaily.objects.filter(lookup).delete()
+    ProviderFinanceDaily.objects.bulk_create(rollups.values(), batch_size=1000)
+    return len(rollups)
@@ -0,0 +1,212 @@
+"""
+Append-only provider balance ledger.
+
+Money movements are posted as ``ProviderLedgerEntry`` rows:
+
+* ``Sale``: a confirmed payment (+amount);
+* ``Refund``: a completed refund (-amount);
+* ``Fee`` and ``Payout``: a settlement's platform fee and provider payout
+  (-amount each).
+
+The provider's ``ProviderBalance`` row is locked and updated in the same
+transaction, and every entry keeps the running balance and running totals
+right after it. A balance is therefore one row read, and a period total is
+the difference between two entries. ``verify_ledgers`` recomputes the totals
+from transactions, refunds and settlements and reports any drift.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum, Count
+from django.utils import timezone
+
+from .models import Transaction, Refund, Settlement, ProviderBalance, ProviderLedgerEntry
+
+ZERO = Decimal('0.00')
+# entry type → running total it adds to
+TOTAL_FIELDS = {'Sale': 'sales', 'Refund': 'refunds', 'Fee': 'fees', 'Payout': 'payouts'}
+TOTALS = tuple(TOTAL_FIELDS.values())
+
+
+def ledger_entry(provider_id, entry_type, amount, **fields):
+    """Unsaved entry for ``amount`` (a positive magnitude; the sign follows ``entry_type``)."""
+    amount = Decimal(amount)
+    return ProviderLedgerEntry(
+        provider_id=provider_id,
+        entry_type=entry_type,
+        amount=amount if entry_type == 'Sale' else -amount,
+        **fields,
+    )
+
+
+@transaction.atomic
+def post_entries(entries):
+    """
+    Append ``entries`` (in order) and update the providers' balances. The
+    balance rows stay locked until the surrounding transaction commits.
+    """
+    entries = [e for e in entries if e.amount]
+    if not entries:
+        return []
+    # Balance rows are created and locked in provider id order, so concurrent
+    # multi-provider postings (settlements, refund chunks) cannot deadlock
+    provider_ids = sorted({e.provider_id for e in entries})
+    ProviderBalance.objects.bulk_create(
+        [ProviderBalance(provider_id=pk) for pk in provider_ids], ignore_conflicts=True
+    )
+    balances = {
+        b.provider_id: b
+        for b in ProviderBalance.objects.select_for_update()
+        .filter(provider_id__in=provider_ids).order_by('provider_id')
+    }
+
+    now = timezone.now()
+    for entry in entries:
+        balance = balances[entry.provider_id]
+        total = f"total_{TOTAL_FIELDS[entry.entry_type]}"
+        setattr(balance, total, getattr(balance, total) + abs(entry.amount))
+        balance.balance += entry.amount
+        balance.entry_count += 1
+        balance.updated_at = now
+
+        entry.sequence = balance.entry_count
+        entry.balance_after = balance.balance
+        for name in TOTALS:
+            setattr(entry, f"{name}_to_date", getattr(balance, f"total_{name}"))
+
+    ProviderLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+    ProviderBalance.objects.bulk_update(
+        balances.values(),
+        ['balance', *[f"total_{name}" for name in TOTALS], 'entry_count', 'updated_at'],
+        batch_size=1000,
+    )
+    return entries
+
+
+def record_sale(txn):
+    if txn.provider_user_id:
+        post_entries([ledger_entry(txn.provider_user_id, 'Sale', txn.amount, transaction=txn)])
+
+
+def record_refund(refund):
+    provider_id = refund.transaction.provider_user_id
+    if provider_id:
+        post_entries([ledger_entry(provider_id, 'Refund', refund.amount, refund=refund, transaction=refund.transaction)])
+
+
+def settlement_entries(settlement, gross):
+    return [
+        ledger_entry(settlement.provider_user_id, 'Fee', gross - settlement.amount, settlement=settlement),
+        ledger_entry(settlement.provider_user_id, 'Payout', settlement.amount, settlement=settlement),
+    ]
+
+
+def record_settlements(settlements):
+    """Post fee and payout entries for settlements created by ``settle_period``."""
+    post_entries([e for s in settlements for e in settlement_entries(s, s.gross_amount)])
+
+
+def balance_for(provider):
+    """The provider's ``ProviderBalance`` (unsaved and empty when nothing was posted yet)."""
+    return ProviderBalance.objects.filter(provider=provider).first() or ProviderBalance(provider=provider)
+
+
+def _totals_before(provider, moment):
+    entry = (
+        ProviderLedgerEntry.objects.filter(provider=provider, created_at__lt=moment)
+        .order_by('-created_at', '-sequence')
+        .values('balance_after', *[f"{name}_to_date" for name in TOTALS])
+        .first()
+    )
+    if entry is None:
+        return dict.fromkeys(TOTALS + ('balance',), ZERO)
+    totals = {name: entry[f"{name}_to_date"] for name in TOTALS}
+    totals['balance'] = entry['balance_after']
+    return totals
+
+
+def period_totals(provider, start, end):
+    """Sales, refunds, fees, payouts and net balance change in ``[start, end)``; two row reads."""
+    before, after = _totals_before(provider, start), _totals_before(provider, end)
+    totals = {name: after[name] - before[name] for name in TOTALS}
+    totals['net'] = after['balance'] - before['balance']
+    return totals
+
+
+def source_totals():
+    """{provider_id: {'sales', 'refunds', 'fees', 'payouts'}} recomputed from the source tables."""
+    totals = {}
+
+    def add(rows, key, name):
+        for row in rows:
+            totals.setdefault(row[key], dict.fromkeys(TOTALS, ZERO))[name] += row['total'] or ZERO
+
+    add(Transaction.objects.filter(provider_user__isnull=False, status__in=['Success', 'Refunded'])
+        .order_by().values('provider_user').annotate(total=Sum('amount')), 'provider_user', 'sales')
+    add(Refund.objects.filter(status='Completed', transaction__provider_user__isnull=False)
+        .order_by().values('transaction__provider_user').annotate(total=Sum('amount')),
+        'transaction__provider_user', 'refunds')
+    # Fee = gross of the settled transactions - payout (none for settlements made before linking)
+    for row in Settlement.objects.order_by().values('settlement_id', 'provider_user', 'amount').annotate(
+            gross=Sum('transactions__amount')):
+        values = totals.setdefault(row['provider_user'], dict.fromkeys(TOTALS, ZERO))
+        values['payouts'] += row['amount']
+        values['fees'] += (row['gross'] or row['amount']) - row['amount']
+    return totals
+
+
+def verify_ledgers():
+    """
+    Compare every provider's ledger with the source tables. Returns a list
+    of ``{'provider_id', 'field', 'ledger', 'expected'}`` drift records.
+    """
+    expected = source_totals()
+    balances = {b.provider_id: b for b in ProviderBalance.objects.all()}
+    entry_counts = dict(
+        ProviderLedgerEntry.objects.order_by().values('provider').annotate(n=Count('entry_id')).values_list('provider', 'n')
+    )
+
+    drift = []
+    for provider_id in set(expected) | set(balances):
+        balance = balances.get(provider_id) or ProviderBalance(provider_id=provider_id)
+        source = expected.get(provider_id, dict.fromkeys(TOTALS, ZERO))
+        checks = [(f"total_{name}", getattr(balance, f"total_{name}"), source[name]) for name in TOTALS]
+        checks.append((
+            'balance', balance.balance,
+            source['sales'] - source['refunds'] - source['fees'] - source['payouts'],
+        ))
+        checks.append(('entry_count', balance.entry_count, entry_counts.get(provider_id, 0)))
+        for field, ledger_value, expected_value in checks:
+            if ledger_value != expected_value:
+                drift.append({
+                    'provider_id': provider_id, 'field': field,
+                    'ledger': ledger_value, 'expected': expected_value,
+                })
+    return drift
+
+
+def backfill_ledgers():
+    """
+    Replay the history of providers that have no ledger yet, in time order
+    and with the original timestamps. Returns the number of entries posted.
+    """
+    known = ProviderBalance.objects.values_list('provider_id', flat=True)
+    history = []
+    for txn in (Transaction.objects.filter(provider_user__isnull=False, status__in=['Success', 'Refunded'])
+                .exclude(provider_user__in=known)):
+        history.append(ledger_entry(txn.provider_user_id, 'Sale', txn.amount, transaction=txn,
+                                    created_at=txn.transaction_date))
+    for refund in (Refund.objects.select_related('transaction')
+                   .filter(status='Completed', transaction__provider_user__isnull=False)
+                   .exclude(transaction__provider_user__in=known)):
+        history.append(ledger_entry(refund.transaction.provider_user_id, 'Refund', refund.amount, refund=refund,
+                                    transaction=refund.transaction,
+                                    created_at=refund.completed_at or refund.initiated_at))
+    settlements = Settlement.objects.exclude(provider_user__in=known).annotate(gross=Sum('transactions__amount'))
+    for settlement in settlements:
+        for entry in settlement_entries(settlement, settlement.gross or settlement.amount):
+            entry.created_at = settlement.period_end
+            history.append(entry)
+
+    history.sort(key=lambda e: e.created_at)
+    return len(post_entries(history))
@@ -0,0 +1,87 @@
+# payments/management/commands/benchmark_pdfs.py
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from payments.pdf_service import render_pdfs, pool_size
+
+CITIES = ["Bengaluru", "Hyderabad", "Chennai", "Mumbai", "Delhi", "Kolkata", "Pune", "Kanpur"]
+SERVICES = {
+    'FlightService': lambda rng, i: {"flight_number": f"NX-{100 + i % 900}", "airline_name": "Nexa Air"},
+    'TrainService': lambda rng, i: {"train_number": str(12000 + i % 1000), "train_name": "Nexa Express"},
+    'BusService': lambda rng, i: {"bus_number": f"KA-01-{1000 + i % 9000}", "travels_name": "Nexa Travels"},
+}
+
+
+def synthetic_booking(i, rng):
+    """A ``generate_booking_pdf`` input dict that looks like a real booking."""
+    service_type = rng.choice(list(SERVICES))
+    source, destination = rng.sample(CITIES, 2)
+    departure = datetime(2025, 12, 1, tzinfo=timezone.utc) + timedelta(hours=rng.randrange(24 * 60))
+    booked = departure - timedelta(days=rng.randrange(1, 30))
+    status = rng.choice(["Confirmed", "Confirmed", "Confirmed", "Pending"])
+    booking_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    passengers = [
+        {"name": f"Passenger {i}-{n}", "age": rng.randrange(5, 80), "gender": rng.choice(["Male", "Female"]),
+         "seat_no": f"{rng.randrange(1, 40)}{rng.choice('ABCD')}", "document_id": f"DOC{i:06d}{n}"}
+        for n in range(rng.randrange(1, 5))
+    ]
+    return {
+        "booking_id": booking_id,
+        "customer": f"Customer {i}",
+        "mobile_number": f"+91 9{rng.randrange(10 ** 8, 10 ** 9)}",
+        "email_address": f"customer{i}@example.com",
+        "service_details": {
+            "type": service_type,
+            "service_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "source": source,
+            "destination": destination,
+            "departure_time": departure.isoformat(),
+            "arrival_time": (departure + timedelta(minutes=rng.randrange(60, 900))).isoformat(),
+            "status": "Scheduled",
+            **SERVICES[service_type](rng, i),
+        },
+        "total_amount": f"{rng.randrange(500, 15000)}.00",
+        "status": status,
+        "payment_status": "Paid" if status == "Confirmed" else "Pending",
+        "booking_date": booked.isoformat(),
+        "passengers": passengers,
+        "ticket": {"ticket_no": f"NEXA-{booking_id[:8].upper()}", "issued_at": booked.isoformat()}
+        if status == "Confirmed" else None,
+        "status_logs": [{"status": status, "timestamp": booked.isoformat(), "remarks": "Synthetic booking"}],
+        "class_type": rng.choice(["economy", "business", "sleeper"]),
+        "policy": {
+            "cancellation_window": 48, "cancellation_fee": 500, "reschedule_allowed": True,
+            "reschedule_fee": 300, "no_show_penalty": 800, "terms_conditions": "Standard return policy.",
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = "Render synthetic booking PDFs and report throughput (PDFs/sec)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU).")
+        parser.add_argument('--compare', action='store_true', help="Also render serially, for the speedup.")
+        parser.add_argument('--seed', type=int, default=455)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        bookings = [synthetic_booking(i, rng) for i in range(options['count'])]
+        runs = [('pool', pool_size(options['workers']))]
+        if options['compare']:
+            runs.insert(0, ('serial', 1))
+
+        rates = {}
+        for name, workers in runs:
+            pdfs, stats = render_pdfs(bookings, workers=workers)
+            rates[name] = stats['pdfs_per_sec']
+            size = sum(len(pdf) for pdf in pdfs if pdf) / max(1, stats['count'] - stats['errors'])
+            self.stdout.write(
+                f"{name}: {stats['count']} PDFs with {stats['workers']} worker(s) in {stats['elapsed']:.2f}s "
+                f"= {stats['pdfs_per_sec']:.1f} PDFs/s (avg {size / 1024:.0f} KiB, {stats['errors']} errors)"
+            )
+        if 'serial' in rates and rates['serial']:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {rates['pool'] / rates['serial']:.2f}x"))
@@ -0,0 +1,23 @@
+# payments/management/commands/process_refunds.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from payments.refunds import process_pending_refunds
+
+
+class Command(BaseCommand):
+    help = (
+        "Complete the pending refunds that need no admin approval in chunks, applying each "
+        "service's cancellation policy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=getattr(settings, 'REFUND_BATCH_SIZE', 500))
+        parser.add_argument('--max-chunks', type=int, default=None, help="Stop after this many chunks.")
+
+    def handle(self, *args, **options):
+        stats = process_pending_refunds(chunk_size=options['chunk_size'], max_chunks=options['max_chunks'])
+        rate = stats['refunds'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['refunds']} refunds in {stats['chunks']} chunks ({rate:.1f}/s): "
+            f"{stats['refunded']} refunded, {stats['fees']} kept in cancellation fees."
+        ))
@@ -1,33 +1,35 @@
 # payments/management/commands/process_settlements.py
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
-from payments.models import Transaction, Settlement
-from django.db.models import Sum
+from payments.settlements import settle_period
+
 
 class Command(BaseCommand):
-    help = "Process provider settlements for the previous day."
+    help = "Process provider settlements for a period (the previous day by default), all providers in one batch."
 
-    def handle(self, *args, **options):
-        end = timezone.now()
-        start = end - timedelta(days=1)
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="ISO datetime; defaults to 24 hours before --end.")
+        parser.add_argument('--end', help="ISO datetime; defaults to now.")
 
-        providers = Transaction.objects.filter(status='Success', transaction_date__gte=start, transaction_date__lte=end).values_list('provider_user', flat=True).distinct()
+    def _parse(self, value, name):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid --{name} datetime: {value}")
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+    def handle(self, *args, **options):
+        end = self._parse(options['end'], 'end') if options['end'] else timezone.now()
+        start = self._parse(options['start'], 'start') if options['start'] else end - timedelta(days=1)
 
-        for p in providers:
-            txns = Transaction.objects.filter(provider_user=p, status='Success', transaction_date__gte=start, transaction_date__lte=end)
-            total = txns.aggregate(total=Sum('amount'))['total'] or 0
-            if float(total) <= 0:
-                continue
-            platform_fee = float(total) * 0.10
-            payout = float(total) - platform_fee
+        settlements = settle_period(start, end)
 
-            settlement = Settlement.objects.create(
-                provider_user_id=p,
-                period_start=start,
-                period_end=end,
-                amount=payout,
-                currency='INR',
-                status='Pending'
-            )
-            self.stdout.write(self.style.SUCCESS(f"Created settlement {settlement.settlement_id} for provider {p} amount {payout}"))
+        for settlement in settlements:
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f"Created settlement {settlement.settlement_id} for provider {settlement.provider_user_id} "
+                    f"amount {settlement.amount} ({settlement.transaction_count} transactions)"
+                )
+        total = sum(s.amount for s in settlements)
+        self.stdout.write(self.style.SUCCESS(f"Created {len(settlements)} settlements, total payout {total}"))
@@ -0,0 +1,19 @@
+# payments/management/commands/rollup_finances.py
+from django.core.management.base import BaseCommand
+
+from payments.finance import rollup_provider_finances
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily provider finance rollup. By default the trailing FINANCE_ROLLUP_DAYS days "
+        "plus any days not rolled up yet; --full rebuilds it from the first transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Trailing days to rebuild (default FINANCE_ROLLUP_DAYS).")
+        parser.add_argument('--full', action='store_true', help="Rebuild the whole transaction history.")
+
+    def handle(self, *args, **options):
+        count = rollup_provider_finances(days=options['days'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} provider finance rows."))
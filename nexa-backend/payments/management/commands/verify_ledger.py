@@ -0,0 +1,26 @@
+# payments/management/commands/verify_ledger.py
+from django.core.management.base import BaseCommand
+from payments.ledger import verify_ledgers, backfill_ledgers
+
+
+class Command(BaseCommand):
+    help = "Recompute provider ledger totals from transactions, refunds and settlements and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help="First replay the history of providers that have no ledger yet.")
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            posted = backfill_ledgers()
+            self.stdout.write(f"Backfilled {posted} ledger entries.")
+
+        drift = verify_ledgers()
+        for item in drift:
+            self.stdout.write(self.style.WARNING(
+                f"Provider {item['provider_id']}: {item['field']} is {item['ledger']}, expected {item['expected']}"
+            ))
+        if drift:
+            self.stdout.write(self.style.ERROR(f"{len(drift)} drifted values."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Provider ledgers match their source rows."))
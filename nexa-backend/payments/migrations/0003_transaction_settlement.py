@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_paymentevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='settlement',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='payments.settlement'),
+        ),
+    ]
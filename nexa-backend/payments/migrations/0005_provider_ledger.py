@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:44
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapi', '0002_session_device'),
+        ('payments', '0004_providerfinancedaily'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderBalance',
+            fields=[
+                ('provider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger_balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_refunds', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_fees', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_payouts', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProviderLedgerEntry',
+            fields=[
+                ('entry_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('entry_type', models.CharField(choices=[('Sale', 'Sale'), ('Refund', 'Refund'), ('Fee', 'Fee'), ('Payout', 'Payout')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('sales_to_date', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('refunds_to_date', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('fees_to_date', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('payouts_to_date', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('sequence', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+                ('refund', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='payments.refund')),
+                ('settlement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='payments.settlement')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='payments.transaction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['provider', 'created_at'], name='payments_pr_provide_fb2db3_idx')],
+                'unique_together': {('provider', 'sequence')},
+            },
+        ),
+    ]
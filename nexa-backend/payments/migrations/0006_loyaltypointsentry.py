@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:45
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_provider_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyPointsEntry',
+            fields=[
+                ('entry_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('points', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reason', models.CharField(choices=[('Earn', 'Earn'), ('Reverse', 'Reverse')], max_length=10)),
+                ('credited', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('credited_at', models.DateTimeField(blank=True, null=True)),
+                ('refund', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_entries', to='payments.refund')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_entries', to='payments.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'credited'], name='payments_lo_user_id_df10b6_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reason', 'Earn')), fields=('transaction',), name='one_loyalty_earn_per_transaction'), models.UniqueConstraint(condition=models.Q(('reason', 'Reverse')), fields=('refund',), name='one_loyalty_reversal_per_refund')],
+            },
+        ),
+    ]
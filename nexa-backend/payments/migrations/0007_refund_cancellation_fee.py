@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_loyaltypointsentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refund',
+            name='cancellation_fee',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
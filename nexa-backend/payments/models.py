@@ -2,6 +2,7 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 from bookings.models import Booking
 
@@ -18,6 +19,8 @@ class Transaction(models.Model):
     method = models.CharField(max_length=50)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Initiated')
     transaction_date = models.DateTimeField(auto_now_add=True)
+    # Set once the transaction has been paid out to the provider
+    settlement = models.ForeignKey('Settlement', on_delete=models.SET_NULL, related_name="transactions", null=True, blank=True)
 
     def __str__(self):
         return f"Txn {self.txn_id} for Booking {self.booking.booking_id}"
@@ -29,6 +32,8 @@ class Refund(models.Model):
     transaction = models.ForeignKey(Transaction, on_delete=models.PROTECT, related_name="refunds")
     processed_by_admin = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Kept back under the service's cancellation policy by the batch refund processor
+    cancellation_fee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     reason = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     initiated_at = models.DateTimeField(auto_now_add=True)
@@ -62,3 +67,138 @@ class LoyaltyWallet(models.Model):
 
     def __str__(self):
         return f"Loyalty {self.user}"
+
+
+class LoyaltyPointsEntry(models.Model):
+    """
+    Append-only loyalty points ledger. Entries are written together with the
+    payment or refund that causes them, without touching the wallet row;
+    ``payments.loyalty.credit_pending_points`` later folds them into
+    ``LoyaltyWallet.balance_points`` with one ``F()`` increment per wallet and
+    marks them ``credited``.
+    """
+    REASON_CHOICES = [('Earn','Earn'),('Reverse','Reverse')]
+    entry_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="loyalty_entries")
+    points = models.DecimalField(max_digits=12, decimal_places=2)
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, related_name="loyalty_entries", null=True, blank=True)
+    refund = models.ForeignKey(Refund, on_delete=models.SET_NULL, related_name="loyalty_entries", null=True, blank=True)
+    credited = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    credited_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'credited'])]
+        constraints = [
+            models.UniqueConstraint(fields=['transaction'], condition=models.Q(reason='Earn'),
+                                    name='one_loyalty_earn_per_transaction'),
+            models.UniqueConstraint(fields=['refund'], condition=models.Q(reason='Reverse'),
+                                    name='one_loyalty_reversal_per_refund'),
+        ]
+
+    def __str__(self):
+        return f"{self.reason} {self.points} points for {self.user}"
+
+
+class ProviderFinanceDaily(models.Model):
+    """
+    Successful transaction revenue per provider per day, by service type.
+    Rebuilt by ``payments.finance.rollup_provider_finances``, and per day by
+    ``refresh_rollup_days`` when a refund changes a rolled-up day; the
+    financial dashboard adds live totals for the days after the latest row.
+    """
+    provider = models.ForeignKey(User, on_delete=models.CASCADE, related_name="finance_rollups")
+    day = models.DateField()
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    bus_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    train_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    flight_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('provider', 'day')
+
+    def __str__(self):
+        return f"Finances {self.provider} {self.day}"
+
+
+class ProviderBalance(models.Model):
+    """
+    Materialized running totals of a provider's ledger, updated in the same
+    transaction as every ``ProviderLedgerEntry``. ``balance`` is what the
+    platform currently owes the provider.
+    """
+    provider = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="ledger_balance")
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_refunds = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_fees = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_payouts = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Balance {self.provider}: {self.balance}"
+
+
+class ProviderLedgerEntry(models.Model):
+    """
+    Append-only provider ledger. ``amount`` is signed (sales are positive;
+    refunds, fees and payouts negative). Each entry also stores the
+    provider's running balance and running totals right after it, so any
+    period total is the difference of two entries.
+    """
+    TYPE_CHOICES = [('Sale','Sale'),('Refund','Refund'),('Fee','Fee'),('Payout','Payout')]
+    entry_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    provider = models.ForeignKey(User, on_delete=models.PROTECT, related_name="ledger_entries")
+    entry_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=14, decimal_places=2)
+    sales_to_date = models.DecimalField(max_digits=14, decimal_places=2)
+    refunds_to_date = models.DecimalField(max_digits=14, decimal_places=2)
+    fees_to_date = models.DecimalField(max_digits=14, decimal_places=2)
+    payouts_to_date = models.DecimalField(max_digits=14, decimal_places=2)
+    sequence = models.PositiveIntegerField()
+    transaction = models.ForeignKey(Transaction, on_delete=models.PROTECT, related_name="ledger_entries", null=True, blank=True)
+    refund = models.ForeignKey(Refund, on_delete=models.PROTECT, related_name="ledger_entries", null=True, blank=True)
+    settlement = models.ForeignKey(Settlement, on_delete=models.PROTECT, related_name="ledger_entries", null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('provider', 'sequence')
+        indexes = [models.Index(fields=['provider', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} for {self.provider}"
+
+
+class PaymentEvent(models.Model):
+    """
+    Outbox row written in the same transaction as a payment confirmation.
+
+    ``payments.outbox.dispatch_payment_events`` picks pending rows up and
+    runs the side effects (loyalty, ticket email, analytics) outside the
+    request. ``handlers_done`` records which handlers already succeeded so a
+    retry only reruns the ones that failed.
+    """
+    STATUS_CHOICES = [('Pending','Pending'),('Done','Done'),('Failed','Failed')]
+    event_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event_type = models.CharField(max_length=50, default='PaymentConfirmed')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="payment_events")
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name="events", null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    handlers_done = models.JSONField(default=list, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'available_at'])]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
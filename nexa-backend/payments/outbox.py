@@ -0,0 +1,190 @@
+"""
+Transactional outbox for payment side effects.
+
+``PaymentViewSet.confirm`` only makes the writes its response needs
+(transaction, booking status, ticket) and records a ``PaymentEvent`` in the
+same database transaction. ``dispatch_pending_events`` later runs the
+handlers below for every pending event:
+
+* ``loyalty``: credit the points entry written at confirmation to the wallet;
+* ``ticket_email``: render the booking PDF and email it;
+* ``analytics``: refresh route and provider analytics, once per dispatch
+  run rather than once per booking.
+
+A handler that raises is retried with exponential backoff. A handler's
+success is written to ``handlers_done`` in the same transaction as its own
+writes, so a dispatcher that crashes mid-batch never runs it again.
+Handlers in ``NON_TRANSACTIONAL_HANDLERS`` make no database writes of their
+own (the ticket email is PDF and SMTP work). They run outside any
+transaction so a slow mail server does not hold one open, and their marker
+is written in a short transaction right after; a crash between the two
+can repeat them. Events still waiting in a batch have their lease renewed
+as the batch goes on, so a slow batch is not picked up by a second
+dispatcher. After ``PAYMENT_OUTBOX_MAX_ATTEMPTS`` attempts the event is
+marked ``Failed``.
+"""
+import logging
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PaymentEvent
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed event stays invisible to other dispatchers
+CLAIM_SECONDS = 300
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def record_payment_confirmed(booking, txn, points):
+    """Write the outbox row for a confirmed payment. Call inside the confirm transaction."""
+    event = PaymentEvent.objects.create(
+        booking=booking,
+        transaction=txn,
+        payload={'points': str(points)},
+    )
+    transaction.on_commit(_kick_dispatcher)
+    return event
+
+
+def _kick_dispatcher():
+    """Queue a dispatch right away; the periodic run covers it if the broker is down."""
+    if not _setting('PAYMENT_OUTBOX_KICK', True):
+        return
+    from .tasks import dispatch_payment_events
+    try:
+        dispatch_payment_events.apply_async(retry=False)
+    except Exception:
+        logger.warning("Could not queue payment outbox dispatch; leaving it to the periodic run.", exc_info=True)
+
+
+def award_loyalty(event):
+    from .loyalty import record_earn, credit_pending_points
+    txn = event.transaction
+    if txn and not txn.loyalty_entries.filter(reason='Earn').exists():
+        # Events recorded before the points ledger only carry the points here
+        points = Decimal(event.payload.get('points') or '0')
+        if points > 0:
+            record_earn(txn, points)
+    credit_pending_points(user_ids=[event.booking.customer_id])
+
+
+def email_ticket(event):
+    from bookings.tasks import send_booking_email
+    if not send_booking_email(event.booking):
+        logger.info("No email for booking %s; ticket not mailed.", event.booking_id)
+
+
+def refresh_analytics(events):
+    from provideranalytics.models import RouteAnalytics, ProviderPerformance
+    RouteAnalytics.update_from_bookings()
+    ProviderPerformance.update_from_bookings()
+
+
+# name → handler(event)
+EVENT_HANDLERS = {
+    'loyalty': award_loyalty,
+    'ticket_email': email_ticket,
+}
+# name → handler(events); run once for the whole batch
+BATCH_HANDLERS = {
+    'analytics': refresh_analytics,
+}
+# Handlers that only talk to the outside world; not worth a transaction
+NON_TRANSACTIONAL_HANDLERS = {'ticket_email'}
+
+
+def claim_events(limit):
+    """Lease up to ``limit`` due events to this dispatcher and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            PaymentEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', available_at__lte=now)
+            .order_by('available_at')[:limit]
+        )
+        PaymentEvent.objects.filter(pk__in=[e.pk for e in events]).update(
+            available_at=now + timedelta(seconds=CLAIM_SECONDS)
+        )
+    ids = [e.pk for e in events]
+    return list(PaymentEvent.objects.select_related('booking__customer').filter(pk__in=ids).order_by('created_at'))
+
+
+def _renew_lease(events):
+    """Push the claim on ``events`` out by another ``CLAIM_SECONDS``."""
+    PaymentEvent.objects.filter(pk__in=[e.pk for e in events], status='Pending').update(
+        available_at=timezone.now() + timedelta(seconds=CLAIM_SECONDS)
+    )
+
+
+def _run(events, name, handler, arg, errors):
+    """Run ``handler(arg)`` once for ``events`` and record it as done on each of them."""
+    outer = nullcontext() if name in NON_TRANSACTIONAL_HANDLERS else transaction.atomic()
+    try:
+        with outer:
+            handler(arg)
+            with transaction.atomic(savepoint=False):
+                for event in events:
+                    PaymentEvent.objects.filter(pk=event.pk).update(handlers_done=event.handlers_done + [name])
+    except Exception as exc:
+        logger.exception("Payment events %s: handler %s failed", [e.event_id for e in events], name)
+        for event in events:
+            errors.setdefault(event.pk, []).append(f"{name}: {exc}")
+    else:
+        for event in events:
+            event.handlers_done.append(name)
+
+
+def dispatch_pending_events(limit=None):
+    """
+    Run the handlers of due events. Returns ``(done, retrying, failed)``
+    event counts for this run.
+    """
+    limit = limit or _setting('PAYMENT_OUTBOX_BATCH_SIZE', 100)
+    max_attempts = _setting('PAYMENT_OUTBOX_MAX_ATTEMPTS', 5)
+    retry_seconds = _setting('PAYMENT_OUTBOX_RETRY_SECONDS', 30)
+
+    events = claim_events(limit)
+    errors = {}
+    leased_at = time.monotonic()
+    for i, event in enumerate(events):
+        if time.monotonic() - leased_at > CLAIM_SECONDS / 2:
+            _renew_lease(events[i:])
+            leased_at = time.monotonic()
+        for name, handler in EVENT_HANDLERS.items():
+            if name not in event.handlers_done:
+                _run([event], name, handler, event, errors)
+
+    for name, handler in BATCH_HANDLERS.items():
+        waiting = [e for e in events if name not in e.handlers_done]
+        if waiting:
+            _run(waiting, name, handler, waiting, errors)
+
+    done = retrying = failed = 0
+    now = timezone.now()
+    for event in events:
+        event.attempts += 1
+        if event.pk not in errors:
+            event.status, event.processed_at, event.last_error = 'Done', now, ''
+            done += 1
+        else:
+            event.last_error = "\n".join(errors[event.pk])
+            if event.attempts >= max_attempts:
+                event.status = 'Failed'
+                failed += 1
+            else:
+                event.available_at = now + timedelta(seconds=retry_seconds * 2 ** (event.attempts - 1))
+                retrying += 1
+    PaymentEvent.objects.bulk_update(
+        events, ['status', 'handlers_done', 'attempts', 'last_error', 'available_at', 'processed_at']
+    )
+    return done, retrying, failed
@@ -0,0 +1,126 @@
+"""
+Booking PDF rendering service.
+
+ReportLab rendering is CPU-bound, so ``render_pdfs`` spreads a batch of
+booking dicts (the ``generate_booking_pdf`` input, plain data only) over a
+pool of worker processes and returns the PDFs as bytes, in input order.
+Every worker builds the fonts and paragraph styles once when it starts
+(``payments.utils.booking_styles``) and reuses them for all the PDFs it
+renders.
+
+Small batches, or ``workers=1``, are rendered in the calling process: for
+those, starting a pool costs more than it saves.
+
+A prefork Celery worker child is daemonic, and ``multiprocessing`` refuses
+to start children from it. There the pool is a ``billiard`` pool (Celery's
+fork of ``multiprocessing``, which allows it), started on the child's first
+large batch and kept until the child exits, so every later task reuses the
+warmed-up renderers. Size ``PDF_RENDER_WORKERS`` for the worker's
+concurrency: each child gets its own pool.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+
+from .utils import generate_booking_pdf, booking_styles
+
+logger = logging.getLogger(__name__)
+
+# Batches smaller than this are rendered without a pool
+MIN_POOL_BATCH = 8
+
+# (billiard pool, size) of this Celery worker child, once started
+_child_pool = None
+
+
+def render_pdf(booking_data):
+    """Render one booking dict to PDF bytes."""
+    buffer = BytesIO()
+    generate_booking_pdf(booking_data, buffer)
+    return buffer.getvalue()
+
+
+def _render_or_none(booking_data):
+    try:
+        return render_pdf(booking_data)
+    except Exception:
+        logger.exception("Could not render PDF for booking %s", booking_data.get('booking_id'))
+        return None
+
+
+def _warm_up():
+    booking_styles(True)
+    booking_styles(False)
+
+
+def pool_size(workers=None):
+    workers = workers or getattr(settings, 'PDF_RENDER_WORKERS', 0) or os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def child_pool(workers):
+    """This daemonic process' billiard pool, started with ``workers`` processes on first use."""
+    global _child_pool
+    if _child_pool is None:
+        from billiard.pool import Pool
+        _child_pool = (Pool(processes=workers, initializer=_warm_up), workers)
+        logger.info("Started a %d-process PDF render pool in worker child %d", workers, os.getpid())
+    return _child_pool
+
+
+@worker_process_shutdown.connect
+def stop_child_pool(**kwargs):
+    global _child_pool
+    if _child_pool is not None:
+        pool, _ = _child_pool
+        _child_pool = None
+        pool.terminate()
+        pool.join()
+
+
+def _chunksize(count, workers):
+    # A few chunks per worker keeps them evenly loaded with little IPC
+    return max(1, count // (workers * 4))
+
+
+def render_pdfs(booking_dicts, workers=None):
+    """
+    Render many bookings to PDF bytes. Returns ``(pdfs, stats)``: ``pdfs``
+    follows the input order, with ``None`` for a booking that failed to
+    render, and ``stats`` holds ``count``, ``errors``, ``workers``,
+    ``elapsed`` (seconds) and ``pdfs_per_sec``.
+    """
+    booking_dicts = list(booking_dicts)
+    workers = min(pool_size(workers), max(1, len(booking_dicts)))
+    started = time.perf_counter()
+
+    if workers == 1 or len(booking_dicts) < MIN_POOL_BATCH:
+        workers = 1
+        pdfs = [_render_or_none(data) for data in booking_dicts]
+    elif multiprocessing.current_process().daemon:
+        pool, workers = child_pool(workers)
+        pdfs = pool.map(_render_or_none, booking_dicts, chunksize=_chunksize(len(booking_dicts), workers))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_warm_up) as pool:
+            pdfs = list(pool.map(_render_or_none, booking_dicts,
+                                 chunksize=_chunksize(len(booking_dicts), workers)))
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'count': len(pdfs),
+        'errors': sum(pdf is None for pdf in pdfs),
+        'workers': workers,
+        'elapsed': elapsed,
+        'pdfs_per_sec': len(pdfs) / elapsed if elapsed else 0.0,
+    }
+    logger.info(
+        "Rendered %d booking PDFs with %d worker(s) in %.2fs (%.1f PDFs/s, %d errors)",
+        stats['count'], workers, elapsed, stats['pdfs_per_sec'], stats['errors'],
+    )
+    return pdfs, stats
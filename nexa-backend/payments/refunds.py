@@ -0,0 +1,212 @@
+"""
+Batch processing of pending refunds.
+
+``process_pending_refunds`` works through the ``Pending`` refunds it may
+complete without an admin (``auto_refunds``) in chunks. Each chunk runs in
+its own transaction:
+
+1. claim up to ``chunk_size`` refunds with ``SELECT ... FOR UPDATE SKIP
+   LOCKED``, so concurrent workers never pick up the same refund;
+2. load booking, departure and ``Policy`` data with one query per service
+   type;
+3. apply the cancellation policy to the whole chunk as NumPy arrays (in
+   paise): the policy's ``cancellation_fee`` is kept back when the booking
+   was cancelled less than ``cancellation_window`` hours before departure,
+   unless the customer paid the no-cancellation-fee markup;
+4. write the results with bulk updates, status logs, provider ledger
+   entries and loyalty reversals, and rebuild the finance rollup days of
+   the refunded transactions.
+
+An admin approving one refund (``RefundViewSet.process``) goes through the
+same ``process_chunk``, so both paths keep back the same fee.
+"""
+import logging
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from bookings.models import Booking, BookingStatus
+from .models import Refund, Transaction, LoyaltyWallet, LoyaltyPointsEntry
+from .finance import refresh_rollup_days
+from .ledger import ledger_entry, post_entries
+from .loyalty import points_for
+
+logger = logging.getLogger(__name__)
+
+
+def _to_paise(amount):
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1")))
+
+
+def _from_paise(paise):
+    return Decimal(int(paise)) / 100
+
+
+def refund_amounts(amount, fee, hours_before, window, waived):
+    """
+    Vectorized policy: return (fee kept, amount refunded) arrays in paise.
+    ``hours_before`` is NaN when the departure is unknown (no fee then).
+    """
+    charged = ~waived & (hours_before < window)
+    kept = np.where(charged, np.minimum(fee, amount), 0)
+    return kept, amount - kept
+
+
+def _service_terms(bookings):
+    """{booking_id: (departure_time, cancellation_window, cancellation_fee)}; one query per service type."""
+    by_type = {}
+    for booking in bookings:
+        if booking['content_type'] and booking['object_id']:
+            by_type.setdefault(booking['content_type'], set()).add(booking['object_id'])
+
+    services = {}
+    for content_type_id, ids in by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        for row in model.objects.filter(pk__in=ids).values(
+                'pk', 'departure_time', 'policy__cancellation_window', 'policy__cancellation_fee'):
+            services[(content_type_id, row['pk'])] = row
+
+    terms = {}
+    for booking in bookings:
+        row = services.get((booking['content_type'], booking['object_id']))
+        if row:
+            terms[booking['booking_id']] = (
+                row['departure_time'], row['policy__cancellation_window'], row['policy__cancellation_fee'],
+            )
+    return terms
+
+
+def auto_refunds():
+    """
+    Pending refunds the batch may complete: already approved by an admin, or
+    a cancelled booking's still paid transaction, refunding no more than was
+    paid and at most ``REFUND_AUTO_APPROVE_LIMIT``. Anything else waits for
+    an admin.
+    """
+    eligible = Q(
+        transaction__status='Success',
+        transaction__booking__status='Cancelled',
+        amount__lte=F('transaction__amount'),
+    ) & Q(amount__lte=getattr(settings, 'REFUND_AUTO_APPROVE_LIMIT', 10000))
+    return Refund.objects.filter(Q(processed_by_admin__isnull=False) | eligible, status='Pending')
+
+
+def claim_refunds(chunk_size):
+    """Lock the next ``chunk_size`` refunds from ``auto_refunds``; call inside a transaction."""
+    return list(
+        auto_refunds().select_for_update(skip_locked=True, of=('self',))
+        .order_by('initiated_at')
+        .values_list('refund_id', flat=True)[:chunk_size]
+    )
+
+
+def process_chunk(refund_ids, now=None, approved_by=None):
+    """
+    Apply the policy to the claimed refunds and complete them, recording
+    ``approved_by`` as the approving admin if given. Returns chunk totals.
+    """
+    now = now or timezone.now()
+    refunds = list(
+        Refund.objects.filter(pk__in=refund_ids)
+        .select_related('transaction')
+        .order_by('initiated_at')
+    )
+    bookings = list(
+        Booking.objects.filter(pk__in={r.transaction.booking_id for r in refunds})
+        .values('booking_id', 'content_type', 'object_id', 'no_cancellation_free_markup')
+    )
+    terms = _service_terms(bookings)
+    waived_bookings = {b['booking_id'] for b in bookings if b['no_cancellation_free_markup']}
+
+    n = len(refunds)
+    amount = np.empty(n, dtype=np.int64)
+    fee = np.zeros(n, dtype=np.int64)
+    window = np.zeros(n, dtype=np.float64)
+    hours_before = np.full(n, np.nan)
+    waived = np.zeros(n, dtype=bool)
+    for i, refund in enumerate(refunds):
+        booking_id = refund.transaction.booking_id
+        amount[i] = _to_paise(refund.amount)
+        waived[i] = booking_id in waived_bookings
+        departure, cancellation_window, cancellation_fee = terms.get(booking_id, (None, None, None))
+        if departure is not None and cancellation_window is not None:
+            hours_before[i] = (departure - refund.initiated_at).total_seconds() / 3600
+            window[i] = cancellation_window
+            fee[i] = _to_paise(cancellation_fee or 0)
+
+    kept, refunded = refund_amounts(amount, fee, hours_before, window, waived)
+
+    rates = dict(
+        LoyaltyWallet.objects.filter(user_id__in={r.transaction.customer_user_id for r in refunds})
+        .values_list('user_id', 'conversion_rate')
+    )
+    default_rate = LoyaltyWallet._meta.get_field('conversion_rate').default
+
+    ledger, reversals, logs = [], [], []
+    for i, refund in enumerate(refunds):
+        refund.cancellation_fee = _from_paise(kept[i])
+        refund.amount = _from_paise(refunded[i])
+        refund.status = 'Completed'
+        refund.completed_at = now
+        if approved_by is not None:
+            refund.processed_by_admin = approved_by
+        txn = refund.transaction
+        if txn.provider_user_id:
+            ledger.append(ledger_entry(txn.provider_user_id, 'Refund', refund.amount, refund=refund, transaction=txn))
+        points = points_for(refund.amount, rates.get(txn.customer_user_id, default_rate))
+        if points:
+            reversals.append(LoyaltyPointsEntry(user_id=txn.customer_user_id, points=-points, reason='Reverse',
+                                                refund=refund, transaction=txn))
+        logs.append(BookingStatus(booking_id=txn.booking_id, status='Refunded',
+                                  remarks=f'Refund completed: {refund.refund_id}'))
+
+    Refund.objects.bulk_update(
+        refunds, ['amount', 'cancellation_fee', 'status', 'completed_at', 'processed_by_admin'], batch_size=1000,
+    )
+    Transaction.objects.filter(pk__in={r.transaction_id for r in refunds}).update(status='Refunded')
+    refresh_rollup_days([r.transaction for r in refunds])
+    Booking.objects.filter(pk__in={r.transaction.booking_id for r in refunds}).update(
+        status='Cancelled', payment_status='Refunded', updated_at=now,
+    )
+    BookingStatus.objects.bulk_create(logs, batch_size=1000)
+    LoyaltyPointsEntry.objects.bulk_create(reversals, batch_size=1000)
+    post_entries(ledger)
+
+    return {
+        'refunds': n,
+        'refunded': _from_paise(refunded.sum()),
+        'fees': _from_paise(kept.sum()),
+    }
+
+
+def process_pending_refunds(chunk_size=500, max_chunks=None):
+    """
+    Complete ``auto_refunds`` chunk by chunk until none are left (or
+    ``max_chunks`` ran). Safe to run from several workers at once. Returns
+    totals for the run and logs progress after every chunk.
+    """
+    stats = {'chunks': 0, 'refunds': 0, 'refunded': Decimal('0.00'), 'fees': Decimal('0.00')}
+    started = time.perf_counter()
+    while max_chunks is None or stats['chunks'] < max_chunks:
+        with transaction.atomic():
+            refund_ids = claim_refunds(chunk_size)
+            if not refund_ids:
+                break
+            chunk = process_chunk(refund_ids)
+        stats['chunks'] += 1
+        for key in ('refunds', 'refunded', 'fees'):
+            stats[key] += chunk[key]
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Refund batch %d: %d refunds (%.1f/s), %s refunded, %s in fees",
+            stats['chunks'], stats['refunds'], stats['refunds'] / elapsed if elapsed else 0.0,
+            stats['refunded'], stats['fees'],
+        )
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,97 @@
+"""
+Batch provider settlements.
+
+One run settles every provider with unsettled successful transactions in a
+period, in a fixed number of set-based statements:
+
+* one ``SELECT DISTINCT`` finds the providers and one ``bulk_create``
+  writes a ``Settlement`` row for each;
+* one ``UPDATE`` links every unsettled transaction to its provider's new
+  settlement. It locks those rows; a concurrent run waits for it and then
+  no longer sees them as unsettled;
+* one ``GROUP BY`` sums the linked transactions per settlement, so the
+  payout covers exactly the transactions that were linked, including any
+  committed between the first and the third statement.
+
+Settlements that end up without a positive total are removed again and
+their transactions unlinked. Linked transactions are never settled again.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import Transaction, Settlement
+from .ledger import record_settlements
+
+PLATFORM_FEE_RATE = Decimal('0.10')
+CENT = Decimal('0.01')
+
+
+def payout_for(total):
+    """Provider payout for a gross ``total``, after the platform fee."""
+    return (total * (1 - PLATFORM_FEE_RATE)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def unsettled_transactions(start, end, provider_ids=None):
+    txns = Transaction.objects.filter(
+        status='Success',
+        settlement__isnull=True,
+        provider_user__isnull=False,
+        transaction_date__gte=start,
+        transaction_date__lte=end,
+    )
+    if provider_ids is not None:
+        txns = txns.filter(provider_user_id__in=provider_ids)
+    return txns
+
+
+@transaction.atomic
+def settle_period(start, end, provider_ids=None):
+    """
+    Create a Pending settlement for each provider (all, or ``provider_ids``)
+    with a positive unsettled total in ``[start, end]``. Returns the new
+    settlements, each with ``transaction_count`` and ``gross_amount`` set.
+    """
+    # Transactions stamped after this point belong to a later run
+    end = min(end, timezone.now())
+    unsettled = unsettled_transactions(start, end, provider_ids)
+    providers = list(unsettled.order_by().values_list('provider_user', flat=True).distinct())
+    if not providers:
+        return []
+
+    settlements = Settlement.objects.bulk_create(
+        [Settlement(provider_user_id=provider_id, period_start=start, period_end=end, amount=0, currency='INR',
+                    status='Pending')
+         for provider_id in providers],
+        batch_size=1000,
+    )
+    by_id = {s.pk: s for s in settlements}
+    unsettled.update(settlement=Subquery(
+        Settlement.objects.filter(pk__in=by_id, provider_user=OuterRef('provider_user')).values('pk')[:1]
+    ))
+
+    totals = (
+        Transaction.objects.filter(settlement__in=by_id)
+        .order_by()
+        .values('settlement')
+        .annotate(total=Sum('amount'), n=Count('pk'))
+    )
+    settled = []
+    for row in totals:
+        settlement = by_id[row['settlement']]
+        if row['total'] <= 0:
+            continue
+        settlement.amount = payout_for(row['total'])
+        settlement.gross_amount = row['total']
+        settlement.transaction_count = row['n']
+        settled.append(settlement)
+
+    empty = by_id.keys() - {s.pk for s in settled}
+    if empty:
+        Transaction.objects.filter(settlement__in=empty).update(settlement=None)
+        Settlement.objects.filter(pk__in=empty).delete()
+    Settlement.objects.bulk_update(settled, ['amount'], batch_size=1000)
+    record_settlements(settled)
+    return settled
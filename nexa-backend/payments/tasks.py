@@ -0,0 +1,51 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from .outbox import dispatch_pending_events
+from .finance import rollup_provider_finances
+from .ledger import verify_ledgers
+from .loyalty import credit_pending_points
+from .refunds import process_pending_refunds
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def dispatch_payment_events():
+    """Run side effects (loyalty, ticket email, analytics) for confirmed payments."""
+    done, retrying, failed = dispatch_pending_events()
+    return f"Dispatched {done} payment events ({retrying} retrying, {failed} failed)."
+
+
+@shared_task
+def rollup_daily_finances():
+    """Rebuild the per-provider daily revenue rollup for the last few days."""
+    count = rollup_provider_finances()
+    return f"Rolled up {count} provider-days of revenue."
+
+
+@shared_task
+def verify_provider_ledgers():
+    """Recompute provider totals from source and log any ledger drift."""
+    drift = verify_ledgers()
+    for item in drift:
+        logger.warning("Ledger drift for provider %(provider_id)s: %(field)s is %(ledger)s, expected %(expected)s", item)
+    return f"Verified provider ledgers, {len(drift)} drifted values."
+
+
+@shared_task
+def credit_loyalty_points():
+    """Fold uncredited loyalty points entries into the wallets."""
+    count = credit_pending_points()
+    return f"Credited {count} loyalty points entries."
+
+
+@shared_task
+def process_refunds():
+    """
+    Complete the pending refunds that need no admin (payments.refunds.auto_refunds)
+    in chunks; several workers can run this at once.
+    """
+    stats = process_pending_refunds(chunk_size=getattr(settings, 'REFUND_BATCH_SIZE', 500))
+    return f"Processed {stats['refunds']} refunds ({stats['refunded']} refunded, {stats['fees']} in fees)."
@@ -0,0 +1,139 @@
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bookings.models import Booking
+from payments.models import Transaction, ProviderFinanceDaily
+from payments.finance import provider_financial_summary, refresh_rollup_days, rollup_provider_finances
+from services.models import BusService, TrainService, FlightService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def sell(create_user):
+    customer = create_user(email="buyer@example.com", username="buyer")
+
+    def _sell(provider, model, amount, days_ago=0, status="Success"):
+        booking = Booking.objects.create(
+            customer=customer, total_amount=amount,
+            content_type=ContentType.objects.get_for_model(model) if model else None,
+        )
+        txn = Transaction.objects.create(booking=booking, customer_user=customer, provider_user=provider,
+                                         amount=amount, method="UPI", status=status)
+        if days_ago:
+            Transaction.objects.filter(pk=txn.pk).update(transaction_date=timezone.now() - timedelta(days=days_ago))
+        return txn
+    return _sell
+
+
+def breakdown(summary):
+    return {row["label"]: row["value"] for row in summary["revenue_breakdown"]}
+
+
+def test_summary_buckets_revenue_by_service_type(provider_client, sell):
+    client, provider, _ = provider_client
+    sell(provider, BusService, "100.00")
+    sell(provider, TrainService, "250.50")
+    sell(provider, FlightService, "1000.00")
+    sell(provider, None, "9.50")
+    sell(provider, BusService, "500.00", status="Refunded")
+
+    resp = client.get("/payments/finances-provider/")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert Decimal(str(data["summary"]["total_earnings"])) == Decimal("1360.00")
+    values = {row["label"]: Decimal(str(row["value"])) for row in data["revenue_breakdown"]}
+    assert values == {"Bus": Decimal("100.00"), "Train": Decimal("250.50"),
+                      "Flight": Decimal("1000.00"), "Miscellaneous": Decimal("9.50")}
+
+    # Query count doesn't depend on the number of transactions
+    with CaptureQueriesContext(connection) as few:
+        provider_financial_summary(provider)
+    for _ in range(20):
+        sell(provider, TrainService, "10.00")
+    with CaptureQueriesContext(connection) as many:
+        provider_financial_summary(provider)
+    assert len(many) == len(few)
+
+
+def test_rollup_matches_live_summary(create_user, sell):
+    provider = create_user(email="prov@example.com", username="prov", user_type="provider")
+    sell(provider, BusService, "100.00", days_ago=3)
+    sell(provider, FlightService, "300.00", days_ago=2)
+    sell(provider, BusService, "40.00", days_ago=2)
+
+    assert rollup_provider_finances(days=7) == 2
+    assert ProviderFinanceDaily.objects.get(day=timezone.localdate() - timedelta(days=2)).bus_revenue == Decimal("40.00")
+
+    # Sold after the rollup ran: served live on top of the rolled-up days
+    sell(provider, TrainService, "60.00")
+    live = provider_financial_summary(provider, use_rollup=False)
+    rolled = provider_financial_summary(provider, use_rollup=True)
+    assert rolled == live
+    assert breakdown(rolled) == {"Bus": Decimal("140.00"), "Train": Decimal("60.00"),
+                                 "Flight": Decimal("300.00"), "Miscellaneous": Decimal("0.00")}
+
+    # Re-running replaces the window instead of adding to it
+    rollup_provider_finances(days=7)
+    assert ProviderFinanceDaily.objects.count() == 2
+
+
+def test_rollup_keeps_history_older_than_its_window(create_user, sell):
+    provider = create_user(email="prov@example.com", username="prov", user_type="provider")
+    sell(provider, BusService, "100.00", days_ago=3)
+    sell(provider, FlightService, "300.00", days_ago=30)
+
+    # Rows that predate the rollup are read live
+    ProviderFinanceDaily.objects.create(provider=provider, day=timezone.localdate() - timedelta(days=3),
+                                        total_revenue=Decimal("100.00"), bus_revenue=Decimal("100.00"),
+                                        transaction_count=1)
+    live = provider_financial_summary(provider, use_rollup=False)
+    assert provider_financial_summary(provider, use_rollup=True) == live
+    assert live["summary"]["total_earnings"] == Decimal("400.00")
+
+    # The first real run backfills the whole history; later runs stretch back over missed days
+    ProviderFinanceDaily.objects.all().delete()
+    assert rollup_provider_finances(days=7) == 2
+    assert provider_financial_summary(provider, use_rollup=True) == live
+
+    # Runs missed for a while: the next one stretches back to the last rolled-up day
+    ProviderFinanceDaily.objects.all().delete()
+    sell(provider, TrainService, "60.00", days_ago=12)
+    rollup_provider_finances(days=7, today=timezone.localdate() - timedelta(days=11))
+    sell(provider, TrainService, "25.00", days_ago=9)
+    rollup_provider_finances(days=7)
+    assert ProviderFinanceDaily.objects.filter(day=timezone.localdate() - timedelta(days=9)).exists()
+    assert provider_financial_summary(provider, use_rollup=True) == provider_financial_summary(provider, use_rollup=False)
+
+
+def test_refreshed_day_drops_refunded_sales(create_user, sell):
+    provider = create_user(email="prov@example.com", username="prov", user_type="provider")
+    only = sell(provider, BusService, "100.00", days_ago=3)
+    pending = sell(provider, TrainService, "70.00", days_ago=2)
+    rollup_provider_finances(today=timezone.localdate() - timedelta(days=2))  # day -2 is not rolled up yet
+
+    Transaction.objects.filter(pk__in=[only.pk, pending.pk]).update(status="Refunded")
+    assert refresh_rollup_days(Transaction.objects.filter(pk__in=[only.pk, pending.pk])) == 1
+    row = ProviderFinanceDaily.objects.get()  # kept at zero, so the rolled-up range is unchanged
+    assert (row.day, row.total_revenue, row.transaction_count) == (timezone.localdate() - timedelta(days=3), Decimal("0.00"), 0)
+    assert provider_financial_summary(provider, use_rollup=True) == provider_financial_summary(provider, use_rollup=False)
+
+
+def test_summary_reads_refunds_and_payouts_from_the_ledger(create_user, sell):
+    from payments.ledger import record_sale
+    from payments.settlements import settle_period
+
+    provider = create_user(email="prov@example.com", username="prov", user_type="provider")
+    record_sale(sell(provider, BusService, "200.00", days_ago=1))
+    settle_period(timezone.now() - timedelta(days=2), timezone.now())
+
+    with CaptureQueriesContext(connection) as queries:
+        summary = provider_financial_summary(provider)["summary"]
+    assert len([q for q in queries if not q["sql"].startswith("EXPLAIN")]) == 2  # revenue, balance row
+    assert summary["pending_settlement"] == Decimal("200.00") - Decimal("180.00")
+    assert summary["refunds_issued"] == Decimal("0.00")
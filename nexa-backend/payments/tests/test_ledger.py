@@ -0,0 +1,97 @@
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+
+from bookings.models import Booking
+from payments.models import Transaction, Refund, ProviderBalance, ProviderLedgerEntry
+from payments.ledger import record_sale, record_refund, period_totals, verify_ledgers
+from payments.settlements import settle_period
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def provider(create_user):
+    return create_user(email="led@example.com", username="led", user_type="provider")
+
+
+@pytest.fixture
+def sale(create_user, provider):
+    customer = create_user(email="c@example.com", username="c")
+    booking = Booking.objects.create(customer=customer, total_amount=0)
+
+    def _sale(amount, record=True):
+        txn = Transaction.objects.create(booking=booking, customer_user=customer, provider_user=provider,
+                                         amount=amount, method="UPI", status="Success")
+        if record:
+            record_sale(txn)
+        return txn
+    return _sale
+
+
+def test_ledger_tracks_sales_refunds_and_settlements(provider, sale):
+    first = sale("1000.00")
+    sale("500.00")
+    refund = Refund.objects.create(transaction=first, amount="200.00", status="Completed", completed_at=timezone.now())
+    record_refund(refund)
+    Transaction.objects.filter(pk=first.pk).update(status="Refunded")
+
+    balance = ProviderBalance.objects.get(provider=provider)
+    assert balance.balance == Decimal("1300.00")
+    assert (balance.total_sales, balance.total_refunds) == (Decimal("1500.00"), Decimal("200.00"))
+
+    settle_period(timezone.now() - timedelta(hours=1), timezone.now() + timedelta(hours=1))
+    balance.refresh_from_db()
+    assert (balance.total_fees, balance.total_payouts) == (Decimal("50.00"), Decimal("450.00"))
+    assert balance.balance == Decimal("800.00")
+
+    entries = list(ProviderLedgerEntry.objects.filter(provider=provider).order_by("sequence"))
+    assert [e.entry_type for e in entries] == ["Sale", "Sale", "Refund", "Fee", "Payout"]
+    assert [e.amount for e in entries] == [Decimal(v) for v in ("1000", "500", "-200", "-50", "-450")]
+    assert entries[-1].balance_after == balance.balance
+
+    assert verify_ledgers() == []
+
+
+def test_period_totals_and_drift_report(provider, sale, capsys):
+    sale("100.00")
+    ProviderLedgerEntry.objects.update(created_at=timezone.now() - timedelta(days=10))
+    sale("40.00")
+    sale("60.00")
+
+    week = period_totals(provider, timezone.now() - timedelta(days=7), timezone.now() + timedelta(minutes=1))
+    assert week["sales"] == Decimal("100.00") and week["net"] == Decimal("100.00")
+
+    sale("25.00", record=False)
+    drift = verify_ledgers()
+    assert {d["field"] for d in drift} == {"total_sales", "balance"}
+
+    call_command("verify_ledger")
+    assert "2 drifted values." in capsys.readouterr().out
+
+
+def test_backfill_replays_history(provider, sale, capsys):
+    sale("70.00", record=False)
+    sale("30.00", record=False)
+
+    call_command("verify_ledger", "--backfill")
+    out = capsys.readouterr().out
+    assert "Backfilled 2 ledger entries." in out
+    assert "Provider ledgers match" in out
+    assert ProviderBalance.objects.get(provider=provider).balance == Decimal("100.00")
+
+
+def test_balances_are_locked_in_provider_order(create_user):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from payments.ledger import ledger_entry, post_entries
+
+    providers = [create_user(email=f"p{i}@example.com", username=f"p{i}", user_type="provider") for i in range(3)]
+    with CaptureQueriesContext(connection) as queries:
+        post_entries([ledger_entry(p.pk, 'Sale', Decimal("10")) for p in reversed(providers)])
+
+    lock, = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and "payments_providerbalance" in q["sql"]]
+    assert "ORDER BY" in lock and "provider_id" in lock.split("ORDER BY")[1]
+    assert ProviderBalance.objects.count() == 3
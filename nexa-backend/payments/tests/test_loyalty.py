@@ -0,0 +1,57 @@
+import pytest
+from decimal import Decimal
+from payments.models import Transaction, Refund, LoyaltyWallet, LoyaltyPointsEntry
+from payments.loyalty import credit_pending_points, record_earn, record_reversal, wallet_for
+from bookings.models import Booking
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def paid(create_user):
+    customer = create_user(email="loyal@example.com", username="loyal")
+    booking = Booking.objects.create(customer=customer, total_amount=0)
+
+    def _paid(amount):
+        return Transaction.objects.create(booking=booking, customer_user=customer, amount=amount,
+                                          method="UPI", status="Success")
+    return customer, _paid
+
+
+def test_entries_are_credited_in_one_batch(paid):
+    customer, pay = paid
+    for amount in ("100.00", "200.00", "300.00"):
+        record_earn(pay(amount), Decimal(amount) / 20)
+    assert not LoyaltyWallet.objects.exists()
+    assert wallet_for(customer).balance_points == Decimal("30.00")
+
+    assert credit_pending_points() == 3
+    assert LoyaltyWallet.objects.get(user=customer).balance_points == Decimal("30.00")
+    assert credit_pending_points() == 0
+    assert wallet_for(customer).balance_points == Decimal("30.00")
+
+
+def test_reversal_never_takes_wallet_below_zero(paid):
+    customer, pay = paid
+    txn = pay("100.00")
+    record_earn(txn, Decimal("5.00"))
+    credit_pending_points()
+
+    refund = Refund.objects.create(transaction=txn, amount="300.00", status="Completed")
+    record_reversal(refund, Decimal("15.00"))
+    assert wallet_for(customer).balance_points == Decimal("0.00")
+    credit_pending_points(user_ids=[customer.pk])
+    assert LoyaltyWallet.objects.get(user=customer).balance_points == Decimal("0.00")
+    assert not LoyaltyPointsEntry.objects.filter(credited=False).exists()
+
+
+def test_refund_approval_writes_one_reversal(paid, auth_client):
+    client, _, _ = auth_client
+    customer, pay = paid
+    txn = pay("400.00")
+    refund = Refund.objects.create(transaction=txn, amount="400.00", status="Pending")
+
+    for _ in range(2):
+        resp = client.post("/payments/refunds/process/", {"refund_id": str(refund.refund_id), "action": "approve"})
+        assert resp.status_code == 200
+    assert list(LoyaltyPointsEntry.objects.values_list("reason", "points")) == [("Reverse", Decimal("-20.00"))]
@@ -0,0 +1,145 @@
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from django.contrib.contenttypes.models import ContentType
+
+from bookings.models import Booking
+from payments.models import PaymentEvent, LoyaltyWallet
+from payments import outbox
+from payments.outbox import dispatch_pending_events
+from payments.utils import encode_qr_payload
+from provideranalytics.models import RouteAnalytics
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def pending_booking(auth_client, create_user):
+    from services.models import Station, Route, BusService, Vehicle, Policy
+    _, user, _ = auth_client
+    provider = create_user(email="bus@example.com", username="busprov", user_type="provider")
+    source = Station.objects.create(name="Pune", code="PNQ")
+    destination = Station.objects.create(name="Goa", code="GOI")
+    bus = BusService.objects.create(
+        provider_user_id=provider, route=Route.objects.create(source=source, destination=destination, distance_km=450),
+        departure_time=timezone.now() + timedelta(days=3), arrival_time=timezone.now() + timedelta(days=3, hours=9),
+        vehicle=Vehicle.objects.create(registration_no="MH12AB1234", model="Volvo", capacity=40),
+        policy=Policy.objects.create(cancellation_window=12, cancellation_fee=50, reschedule_fee=20, no_show_penalty=100),
+        base_price=1000,
+    )
+    return Booking.objects.create(
+        customer=user, provider=provider, total_amount=1000, email="cust@example.com",
+        content_type=ContentType.objects.get_for_model(BusService), object_id=bus.service_id,
+        source_id=source, destination_id=destination,
+    )
+
+
+def test_confirm_defers_side_effects_to_outbox(auth_client, pending_booking, monkeypatch):
+    client, user, _ = auth_client
+    resp = client.post("/payments/confirm/", {"booking_id": str(pending_booking.booking_id)})
+    assert resp.status_code == 200, resp.content
+    assert resp.json()["points_earned"] == 50.0
+
+    event = PaymentEvent.objects.get(booking=pending_booking)
+    assert event.status == "Pending" and event.payload == {"points": "50.00"}
+    assert event.transaction.provider_user == pending_booking.provider
+    assert not LoyaltyWallet.objects.filter(user=user).exists()
+    ticket = pending_booking.ticket
+    assert ticket.qr_code == encode_qr_payload(ticket.ticket_no)
+    assert not RouteAnalytics.objects.exists()
+
+    mailed = []
+    monkeypatch.setattr("bookings.tasks.send_booking_email", lambda b: mailed.append(b.booking_id) or True)
+    assert dispatch_pending_events() == (1, 0, 0)
+
+    event.refresh_from_db()
+    assert event.status == "Done" and event.attempts == 1
+    assert mailed == [pending_booking.booking_id]
+    assert LoyaltyWallet.objects.get(user=user).balance_points == Decimal("50.00")
+    assert RouteAnalytics.objects.get().total_bookings == 1
+    assert dispatch_pending_events() == (0, 0, 0)
+
+
+def test_failed_handler_is_retried_without_repeating_others(auth_client, pending_booking, monkeypatch, settings):
+    client, user, _ = auth_client
+    client.post("/payments/confirm/", {"booking_id": str(pending_booking.booking_id)})
+
+    def broken_mail(b):
+        raise ConnectionError("smtp down")
+
+    monkeypatch.setattr("bookings.tasks.send_booking_email", broken_mail)
+    assert dispatch_pending_events() == (0, 1, 0)
+    event = PaymentEvent.objects.get()
+    assert event.handlers_done == ["loyalty", "analytics"]
+    assert "smtp down" in event.last_error
+    assert event.available_at > timezone.now()
+
+    # Not due yet
+    assert dispatch_pending_events() == (0, 0, 0)
+
+    PaymentEvent.objects.update(available_at=timezone.now())
+    monkeypatch.setattr("bookings.tasks.send_booking_email", lambda b: True)
+    assert dispatch_pending_events() == (1, 0, 0)
+    assert LoyaltyWallet.objects.get(user=user).balance_points == Decimal("50.00")
+
+    settings.PAYMENT_OUTBOX_MAX_ATTEMPTS = 1
+    PaymentEvent.objects.update(status="Pending", handlers_done=["loyalty", "analytics"], attempts=0, available_at=timezone.now())
+    monkeypatch.setattr("bookings.tasks.send_booking_email", broken_mail)
+    assert dispatch_pending_events() == (0, 0, 1)
+    assert PaymentEvent.objects.get().status == "Failed"
+
+
+def test_handler_progress_survives_a_crashed_dispatcher(auth_client, pending_booking, monkeypatch):
+    client, _, _ = auth_client
+    client.post("/payments/confirm/", {"booking_id": str(pending_booking.booking_id)})
+
+    mailed = []
+    monkeypatch.setattr("bookings.tasks.send_booking_email", lambda b: mailed.append(b.booking_id) or True)
+
+    def crash(events):
+        raise SystemExit("worker killed")
+
+    monkeypatch.setitem(outbox.BATCH_HANDLERS, "analytics", crash)
+    with pytest.raises(SystemExit):
+        dispatch_pending_events()
+    assert PaymentEvent.objects.get().handlers_done == ["loyalty", "ticket_email"]
+
+    # Once the lease runs out another dispatcher picks the event up without mailing again
+    monkeypatch.setitem(outbox.BATCH_HANDLERS, "analytics", outbox.refresh_analytics)
+    PaymentEvent.objects.update(available_at=timezone.now())
+    assert dispatch_pending_events() == (1, 0, 0)
+    assert mailed == [pending_booking.booking_id]
+
+
+def test_ticket_email_runs_outside_a_transaction(auth_client, pending_booking, monkeypatch):
+    client, _, _ = auth_client
+    client.post("/payments/confirm/", {"booking_id": str(pending_booking.booking_id)})
+
+    depth = {}
+    monkeypatch.setattr("bookings.tasks.send_booking_email",
+                        lambda b: depth.setdefault("email", len(connection.savepoint_ids)) or True)
+    monkeypatch.setitem(outbox.EVENT_HANDLERS, "loyalty",
+                        lambda e: depth.setdefault("loyalty", len(connection.savepoint_ids)))
+    outer = len(connection.savepoint_ids)
+
+    assert dispatch_pending_events() == (1, 0, 0)
+    assert depth == {"email": outer, "loyalty": outer + 1}
+    assert PaymentEvent.objects.get().handlers_done == ["loyalty", "ticket_email", "analytics"]
+
+
+def test_slow_batch_renews_its_lease(auth_client, pending_booking, monkeypatch):
+    client, _, _ = auth_client
+    client.post("/payments/confirm/", {"booking_id": str(pending_booking.booking_id)})
+    first = PaymentEvent.objects.get()
+    PaymentEvent.objects.create(booking=first.booking, transaction=first.transaction, payload=first.payload)
+
+    clock = iter([0.0, 0.0, outbox.CLAIM_SECONDS])
+    monkeypatch.setattr(outbox.time, "monotonic", lambda: next(clock, outbox.CLAIM_SECONDS))
+    renewed = []
+    monkeypatch.setattr(outbox, "_renew_lease", lambda events: renewed.append(len(events)))
+    monkeypatch.setattr("bookings.tasks.send_booking_email", lambda b: True)
+
+    assert dispatch_pending_events() == (2, 0, 0)
+    assert renewed == [1]
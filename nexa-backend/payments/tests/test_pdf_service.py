@@ -0,0 +1,59 @@
+import random
+
+from django.core.management import call_command
+
+from payments.pdf_service import render_pdfs, stop_child_pool, MIN_POOL_BATCH
+from payments.utils import booking_styles
+from payments.management.commands.benchmark_pdfs import synthetic_booking
+
+
+def test_styles_are_built_once_per_status():
+    assert booking_styles(True) is booking_styles(True)
+    assert booking_styles(True)['title'].textColor != booking_styles(False)['title'].textColor
+
+
+def test_render_pdfs_keeps_order_and_reports_failures():
+    rng = random.Random(1)
+    bookings = [synthetic_booking(i, rng) for i in range(3)]
+    bookings.insert(1, {"booking_id": "broken"})
+
+    pdfs, stats = render_pdfs(bookings, workers=1)
+    assert [pdf is None for pdf in pdfs] == [False, True, False, False]
+    assert all(pdf.startswith(b"%PDF") for pdf in pdfs if pdf)
+    assert (stats["count"], stats["errors"], stats["workers"]) == (4, 1, 1)
+    assert stats["pdfs_per_sec"] > 0
+
+
+def test_render_pdfs_in_worker_processes():
+    rng = random.Random(2)
+    bookings = [synthetic_booking(i, rng) for i in range(MIN_POOL_BATCH)]
+
+    pdfs, stats = render_pdfs(bookings, workers=2)
+    assert stats["workers"] == 2 and stats["errors"] == 0
+    assert all(pdf.startswith(b"%PDF") for pdf in pdfs)
+
+
+def _render_in_daemon_child(bookings, results):
+    pdfs, stats = render_pdfs(bookings, workers=2)
+    again, _ = render_pdfs(bookings, workers=2)
+    results.put((stats["workers"], sum(pdf.startswith(b"%PDF") for pdf in pdfs + again)))
+    stop_child_pool()
+
+
+def test_render_pdfs_in_a_prefork_worker_child():
+    # Celery prefork children are daemonic billiard processes
+    import billiard
+    rng = random.Random(3)
+    bookings = [synthetic_booking(i, rng) for i in range(MIN_POOL_BATCH)]
+    results = billiard.Queue()
+    child = billiard.Process(target=_render_in_daemon_child, args=(bookings, results), daemon=True)
+    child.start()
+    workers, rendered = results.get(timeout=60)
+    child.join(10)
+    assert (workers, rendered) == (2, 2 * MIN_POOL_BATCH)
+
+
+def test_benchmark_command(capsys):
+    call_command("benchmark_pdfs", "--count", "2", "--workers", "1", "--compare")
+    out = capsys.readouterr().out
+    assert "serial: 2 PDFs" in out and "PDFs/s" in out and "Speedup" in out
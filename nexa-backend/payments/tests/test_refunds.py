@@ -0,0 +1,135 @@
+import pytest
+import numpy as np
+from decimal import Decimal
+from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.utils import timezone
+
+from bookings.models import Booking, BookingStatus
+from payments.models import Transaction, Refund, ProviderBalance, LoyaltyPointsEntry
+from payments.refunds import process_pending_refunds, refund_amounts
+from rest_framework.test import APIClient
+from services.models import Station, Route, Vehicle, Policy, BusService
+
+pytestmark = pytest.mark.django_db
+
+
+def test_policy_is_applied_elementwise():
+    kept, refunded = refund_amounts(
+        amount=np.array([100000, 100000, 100000, 30000, 100000]),
+        fee=np.array([50000, 50000, 50000, 50000, 50000]),
+        hours_before=np.array([2.0, 48.0, 2.0, 2.0, np.nan]),
+        window=np.array([24.0, 24.0, 24.0, 24.0, 0.0]),
+        waived=np.array([False, False, True, False, False]),
+    )
+    assert kept.tolist() == [50000, 0, 0, 30000, 0]
+    assert refunded.tolist() == [50000, 100000, 100000, 0, 100000]
+
+
+@pytest.fixture
+def cancelled(create_user):
+    customer = create_user(email="cx@example.com", username="cx")
+    provider = create_user(email="px@example.com", username="px", user_type="provider")
+    policy = Policy.objects.create(cancellation_window=24, cancellation_fee=150, reschedule_fee=0, no_show_penalty=0)
+    route = Route.objects.create(source=Station.objects.create(name="A", code="AAA"),
+                                 destination=Station.objects.create(name="B", code="BBB"), distance_km=100)
+    vehicle = Vehicle.objects.create(registration_no="X1", model="Bus", capacity=40)
+
+    def _cancel(amount, departs_in_hours, waived=False):
+        bus = BusService.objects.create(
+            provider_user_id=provider, route=route, vehicle=vehicle, policy=policy, base_price=amount,
+            departure_time=timezone.now() + timedelta(hours=departs_in_hours),
+            arrival_time=timezone.now() + timedelta(hours=departs_in_hours + 5),
+        )
+        booking = Booking.objects.create(
+            customer=customer, provider=provider, total_amount=amount, status="Cancelled",
+            content_type=ContentType.objects.get_for_model(BusService), object_id=bus.service_id,
+            no_cancellation_free_markup=waived,
+        )
+        txn = Transaction.objects.create(booking=booking, customer_user=customer, provider_user=provider,
+                                         amount=amount, method="UPI", status="Success")
+        return Refund.objects.create(transaction=txn, amount=amount, status="Pending")
+    return provider, _cancel
+
+
+def test_batch_processor_completes_refunds(cancelled, capsys):
+    provider, cancel = cancelled
+    late = cancel("1000.00", departs_in_hours=3)
+    early = cancel("800.00", departs_in_hours=72)
+    waived = cancel("600.00", departs_in_hours=3, waived=True)
+
+    stats = process_pending_refunds(chunk_size=2)
+    assert (stats["chunks"], stats["refunds"]) == (2, 3)
+    assert stats["refunded"] == Decimal("2250.00") and stats["fees"] == Decimal("150.00")
+
+    late.refresh_from_db()
+    assert (late.status, late.amount, late.cancellation_fee) == ("Completed", Decimal("850.00"), Decimal("150.00"))
+    assert Refund.objects.get(pk=early.pk).amount == Decimal("800.00")
+    assert Refund.objects.get(pk=waived.pk).cancellation_fee == Decimal("0.00")
+
+    assert not Transaction.objects.filter(status="Success").exists()
+    assert set(Booking.objects.values_list("payment_status", flat=True)) == {"Refunded"}
+    assert BookingStatus.objects.filter(status="Refunded").count() == 3
+    assert ProviderBalance.objects.get(provider=provider).total_refunds == Decimal("2250.00")
+    assert LoyaltyPointsEntry.objects.filter(reason="Reverse").count() == 3
+
+    # Nothing left; a second worker finds no work
+    assert process_pending_refunds()["refunds"] == 0
+    call_command("process_refunds")
+    assert "Processed 0 refunds" in capsys.readouterr().out
+
+
+def test_batch_only_completes_refunds_that_need_no_admin(cancelled, create_user, settings):
+    settings.REFUND_AUTO_APPROVE_LIMIT = 5000
+    _, cancel = cancelled
+    eligible = cancel("1000.00", departs_in_hours=72)
+    too_large = cancel("6000.00", departs_in_hours=72)
+    over_paid = cancel("500.00", departs_in_hours=72)
+    Refund.objects.filter(pk=over_paid.pk).update(amount="900.00")
+    still_booked = cancel("700.00", departs_in_hours=72)
+    Booking.objects.filter(pk=still_booked.transaction.booking_id).update(status="Confirmed")
+    approved = cancel("8000.00", departs_in_hours=72)
+    Refund.objects.filter(pk=approved.pk).update(processed_by_admin=create_user(
+        email="ad@example.com", username="ad", user_type="admin"))
+
+    assert process_pending_refunds()["refunds"] == 2
+    statuses = dict(Refund.objects.values_list("pk", "status"))
+    assert statuses[eligible.pk] == statuses[approved.pk] == "Completed"
+    assert statuses[too_large.pk] == statuses[over_paid.pk] == statuses[still_booked.pk] == "Pending"
+
+
+def test_admin_approval_keeps_the_same_fee_as_the_batch(cancelled, create_user):
+    _, cancel = cancelled
+    admin = create_user(email="ad@example.com", username="ad", user_type="admin")
+    by_admin = cancel("1000.00", departs_in_hours=3)
+    by_batch = cancel("1000.00", departs_in_hours=3)
+
+    client = APIClient()
+    client.force_authenticate(admin)
+    resp = client.post("/payments/refunds/process/", {"refund_id": str(by_admin.refund_id), "action": "approve"})
+    assert resp.status_code == 200
+    process_pending_refunds()
+
+    by_admin.refresh_from_db()
+    by_batch.refresh_from_db()
+    assert (by_admin.amount, by_admin.cancellation_fee) == (by_batch.amount, by_batch.cancellation_fee)
+    assert by_admin.cancellation_fee == Decimal("150.00")
+    assert by_admin.processed_by_admin == admin and by_batch.processed_by_admin is None
+
+
+def test_refunding_a_rolled_up_sale_rebuilds_its_day(cancelled):
+    from payments.finance import provider_financial_summary, rollup_provider_finances
+    from payments.models import ProviderFinanceDaily
+
+    provider, cancel = cancelled
+    kept, refunded = cancel("500.00", departs_in_hours=72), cancel("300.00", departs_in_hours=72)
+    Refund.objects.filter(pk=kept.pk).delete()
+    Transaction.objects.update(transaction_date=timezone.now() - timedelta(days=3))
+    rollup_provider_finances(days=7)
+    assert ProviderFinanceDaily.objects.get().total_revenue == Decimal("800.00")
+
+    process_pending_refunds()
+    row = ProviderFinanceDaily.objects.get()
+    assert (row.total_revenue, row.bus_revenue, row.transaction_count) == (Decimal("500.00"), Decimal("500.00"), 1)
+    assert provider_financial_summary(provider, use_rollup=True) == provider_financial_summary(provider, use_rollup=False)
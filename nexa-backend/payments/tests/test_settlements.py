@@ -0,0 +1,150 @@
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+
+from bookings.models import Booking
+from payments.models import Transaction, Settlement
+from payments.settlements import settle_period
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def providers_with_sales(create_user):
+    customer = create_user(email="buyer@example.com", username="buyer")
+    providers = [create_user(email=f"p{i}@example.com", username=f"p{i}", user_type="provider") for i in range(3)]
+    booking = Booking.objects.create(customer=customer, total_amount=0)
+
+    def sale(provider, amount, status="Success"):
+        return Transaction.objects.create(booking=booking, customer_user=customer, provider_user=provider,
+                                          amount=amount, method="UPI", status=status)
+
+    sale(providers[0], "100.10")
+    sale(providers[0], "200.25")
+    sale(providers[1], "0.05")
+    sale(providers[1], "999.00", status="Failed")
+    sale(providers[2], "50.00", status="Refunded")
+    return providers
+
+
+def test_settle_period_groups_all_providers(providers_with_sales):
+    p0, p1, p2 = providers_with_sales
+    start = timezone.now() - timedelta(hours=1)
+    settlements = settle_period(start, timezone.now() + timedelta(hours=1))
+
+    by_provider = {s.provider_user_id: s for s in settlements}
+    assert set(by_provider) == {p0.pk, p1.pk}
+    assert by_provider[p0.pk].amount == Decimal("270.32")  # 300.35 - 10%, rounded half up
+    assert by_provider[p1.pk].amount == Decimal("0.05")
+    assert by_provider[p0.pk].transaction_count == 2
+
+    assert Transaction.objects.filter(settlement=by_provider[p0.pk]).count() == 2
+    assert not Transaction.objects.filter(status="Failed", settlement__isnull=False).exists()
+
+    # Already settled transactions are never paid out again
+    assert settle_period(start, timezone.now() + timedelta(hours=1)) == []
+    assert Settlement.objects.count() == 2
+
+
+def test_settlement_view_and_command(providers_with_sales, create_user, capsys):
+    from rest_framework.test import APIClient
+    admin = create_user(email="admin@example.com", username="admin", user_type="admin")
+    admin.is_staff = True
+    client = APIClient()
+    client.force_authenticate(admin)
+    p0, p1, _ = providers_with_sales
+    start = (timezone.now() - timedelta(hours=1)).isoformat()
+    end = (timezone.now() + timedelta(hours=1)).isoformat()
+
+    resp = client.post("/payments/settlements/process/", {"provider_user_id": str(p0.pk), "period_start": start, "period_end": end})
+    assert resp.status_code == 201
+    assert Decimal(resp.json()["settlement"]["amount"]) == Decimal("270.32")
+
+    call_command("process_settlements", "--start", start)
+    assert "Created 1 settlements, total payout 0.05" in capsys.readouterr().out
+    assert not Transaction.objects.filter(status="Success", settlement__isnull=True).exists()
+
+
+def test_only_summed_transactions_are_linked(providers_with_sales, monkeypatch):
+    p0 = providers_with_sales[0]
+    sold_meanwhile = []
+    bulk_create = Settlement.objects.bulk_create
+
+    def bulk_create_then_sell(objs, **kwargs):
+        created = bulk_create(objs, **kwargs)
+        txn = Transaction.objects.filter(provider_user=p0).first()
+        sold_meanwhile.append(Transaction.objects.create(
+            booking=txn.booking, customer_user=txn.customer_user, provider_user=p0, amount="500.00", method="UPI",
+            status="Success", transaction_date=timezone.now() - timedelta(minutes=1),
+        ))
+        return created
+
+    monkeypatch.setattr(Settlement.objects, "bulk_create", bulk_create_then_sell)
+    settlements = settle_period(timezone.now() - timedelta(hours=1), timezone.now())
+    settlement = next(s for s in settlements if s.provider_user_id == p0.pk)
+
+    assert Transaction.objects.filter(settlement=settlement).count() == settlement.transaction_count == 2
+    sold_meanwhile[0].refresh_from_db()
+    assert sold_meanwhile[0].settlement_id is None
+
+
+def test_settlement_view_validates_period(providers_with_sales, create_user):
+    from rest_framework.test import APIClient
+    admin = create_user(email="admin@example.com", username="admin", user_type="admin")
+    admin.is_staff = True
+    client = APIClient()
+    client.force_authenticate(admin)
+    naive_start = (timezone.localtime() - timedelta(hours=1)).replace(tzinfo=None).isoformat()
+    naive_end = (timezone.localtime() + timedelta(hours=1)).replace(tzinfo=None).isoformat()
+
+    resp = client.post("/payments/settlements/process/", {"period_start": naive_start, "period_end": naive_end})
+    assert resp.status_code == 201
+    assert len(resp.json()["settlements"]) == 2
+
+    for bad in ("yesterday", "2026-13-01T00:00:00"):
+        resp = client.post("/payments/settlements/process/", {"period_start": bad, "period_end": naive_end})
+        assert resp.status_code == 400
+
+
+def test_settlement_sums_exactly_what_it_links(providers_with_sales, monkeypatch):
+    p0 = providers_with_sales[0]
+    bulk_create = Settlement.objects.bulk_create
+
+    def bulk_create_then_commit_a_sale(objs, **kwargs):
+        created = bulk_create(objs, **kwargs)
+        # Stamped inside the period, committed by another request mid-run
+        txn = Transaction.objects.filter(provider_user=p0).first()
+        late = Transaction.objects.create(booking=txn.booking, customer_user=txn.customer_user, provider_user=p0,
+                                          amount="500.00", method="UPI", status="Success")
+        Transaction.objects.filter(pk=late.pk).update(transaction_date=timezone.now() - timedelta(minutes=1))
+        return created
+
+    monkeypatch.setattr(Settlement.objects, "bulk_create", bulk_create_then_commit_a_sale)
+    settlements = settle_period(timezone.now() - timedelta(hours=1), timezone.now())
+    settlement = next(s for s in settlements if s.provider_user_id == p0.pk)
+
+    assert settlement.transaction_count == Transaction.objects.filter(settlement=settlement).count() == 3
+    assert settlement.gross_amount == Decimal("800.35")
+    assert Settlement.objects.get(pk=settlement.pk).amount == Decimal("720.32")
+
+
+def test_settlement_run_issues_a_fixed_number_of_queries(providers_with_sales, create_user):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    start = timezone.now() - timedelta(hours=1)
+    with CaptureQueriesContext(connection) as few:
+        assert len(settle_period(start, timezone.now())) == 2
+
+    customer = create_user(email="more@example.com", username="more")
+    booking = Booking.objects.create(customer=customer, total_amount=0)
+    for i in range(6):
+        provider = create_user(email=f"q{i}@example.com", username=f"q{i}", user_type="provider")
+        for _ in range(3):
+            Transaction.objects.create(booking=booking, customer_user=customer, provider_user=provider,
+                                       amount="10.00", method="UPI", status="Success")
+    with CaptureQueriesContext(connection) as many:
+        assert len(settle_period(start, timezone.now())) == 6
+    assert len(many) == len(few)
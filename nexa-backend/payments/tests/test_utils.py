@@ -8,6 +8,8 @@ from payments.utils import (
     format_datetime,
     calculate_duration,
     format_currency,
+    encode_qr_payload,
+    QRCodeFlowable,
 )
 
 
@@ -52,3 +54,21 @@ def test_generate_qr_code_and_pdf_mock(monkeypatch, tmp_path):
     }
     out = generate_booking_pdf(booking_data, str(tmp_path / "out.pdf"))
     assert out.endswith(".pdf")
+
+
+def test_qr_payload_is_drawn_as_vector_runs():
+    payload = encode_qr_payload("NEXA-B58D10C0")
+    rows = payload.split("\n")
+    assert len(rows) == 21 and all(len(row) == 21 and set(row) <= {"0", "1"} for row in rows)
+    assert rows[0].startswith("1111111")  # finder pattern
+
+    flowable = generate_qr_code("ignored", payload)
+    assert isinstance(flowable, QRCodeFlowable)
+    assert flowable.wrap(500, 500) == (flowable.size, flowable.size)
+
+    canv = mock.Mock()
+    path = canv.beginPath.return_value
+    flowable.drawOn(canv, 0, 0)
+    runs = sum(len([r for r in row.split("0") if r]) for row in rows)
+    assert path.rect.call_count == runs
+    canv.drawPath.assert_called_once_with(path, stroke=0, fill=1)
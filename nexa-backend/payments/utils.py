@@ -2,13 +2,14 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
+from functools import lru_cache
 import qrcode
 from io import BytesIO
 
@@ -26,16 +27,80 @@ except:
     print("Warning: Unicode fonts not found. Using 'Rs.' instead of ₹ symbol.")
 
 
+@lru_cache(maxsize=2)
+def booking_styles(confirmed):
+    """
+    Paragraph styles used by ``generate_booking_pdf``, built once per process.
+    Only the title colour depends on the booking, hence one set per status.
+    """
+    sample = getSampleStyleSheet()
+    normal = ParagraphStyle(
+        'CustomNormal',
+        parent=sample['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#334155'),
+        fontName=UNICODE_FONT
+    )
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=sample['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#10b981') if confirmed else colors.HexColor('#f59e0b'),
+            spaceAfter=12,
+            alignment=TA_CENTER,
+            fontName=UNICODE_FONT_BOLD
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=sample['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#1e40af'),
+            spaceAfter=8,
+            spaceBefore=12,
+            fontName=UNICODE_FONT_BOLD
+        ),
+        'subheading': ParagraphStyle(
+            'CustomSubHeading',
+            parent=sample['Heading3'],
+            fontSize=11,
+            textColor=colors.HexColor('#475569'),
+            spaceAfter=6,
+            fontName=UNICODE_FONT_BOLD
+        ),
+        'normal': normal,
+        'center': ParagraphStyle('center', parent=normal, alignment=TA_CENTER),
+        'tips': ParagraphStyle(
+            'Tips',
+            parent=normal,
+            fontSize=9,
+            leftIndent=15,
+            bulletIndent=5,
+            spaceAfter=4
+        ),
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=sample['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#64748b'),
+            alignment=TA_CENTER,
+            fontName=UNICODE_FONT
+        ),
+    }
+
+
+
 def generate_booking_pdf(booking_data, output_filename="booking_confirmation.pdf"):
     """
     Generate a professional booking confirmation PDF for any travel mode (Flight/Train/Bus).
     
     Args:
         booking_data (dict): Dictionary containing booking information
-        output_filename (str): Name of the output PDF file
+        output_filename (str or file): Name of the output PDF file, or a
+            writable binary file object such as ``BytesIO``
     
     Returns:
-        str: Path to the generated PDF file
+        str or file: ``output_filename``, once the PDF is written
     """
     
     # Create the PDF document
@@ -51,45 +116,12 @@ def generate_booking_pdf(booking_data, output_filename="booking_confirmation.pdf
     # Container for PDF elements
     elements = []
     
-    # Define custom styles
-    styles = getSampleStyleSheet()
-    
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#10b981') if booking_data['status'] == 'Confirmed' else colors.HexColor('#f59e0b'),
-        spaceAfter=12,
-        alignment=TA_CENTER,
-        fontName=UNICODE_FONT_BOLD
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#1e40af'),
-        spaceAfter=8,
-        spaceBefore=12,
-        fontName=UNICODE_FONT_BOLD
-    )
-    
-    subheading_style = ParagraphStyle(
-        'CustomSubHeading',
-        parent=styles['Heading3'],
-        fontSize=11,
-        textColor=colors.HexColor('#475569'),
-        spaceAfter=6,
-        fontName=UNICODE_FONT_BOLD
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.HexColor('#334155'),
-        fontName=UNICODE_FONT
-    )
+    # Styles are built once per process and shared by every PDF
+    styles = booking_styles(booking_data['status'] == 'Confirmed')
+    title_style = styles['title']
+    heading_style = styles['heading']
+    subheading_style = styles['subheading']
+    normal_style = styles['normal']
     
     # === HEADER SECTION ===
     status_symbol = "✓" if booking_data['status'] == 'Confirmed' else "⏳"
@@ -370,7 +402,7 @@ def generate_booking_pdf(booking_data, output_filename="booking_confirmation.pdf
     # === TICKET QR CODE (only if ticket exists) ===
     if booking_data.get('ticket'):
         ticket = booking_data['ticket']
-        qr_img = generate_qr_code(ticket['ticket_no'])
+        qr_img = generate_qr_code(ticket['ticket_no'], ticket.get('qr_code'))
         if qr_img:
             elements.append(Paragraph("E-Ticket", subheading_style))
             
@@ -389,11 +421,11 @@ def generate_booking_pdf(booking_data, output_filename="booking_confirmation.pdf
             elements.append(qr_img)
             elements.append(Paragraph(
                 f"<font size=8>{ticket['ticket_no']}</font>",
-                ParagraphStyle('center', parent=normal_style, alignment=TA_CENTER)
+                styles['center']
             ))
             elements.append(Paragraph(
                 f"<font size=8 color='#64748b'>Issued: {format_datetime(ticket['issued_at'])}</font>",
-                ParagraphStyle('center', parent=normal_style, alignment=TA_CENTER)
+                styles['center']
             ))
     else:
         elements.append(Paragraph(
@@ -465,14 +497,7 @@ def generate_booking_pdf(booking_data, output_filename="booking_confirmation.pdf
             "Keep your booking confirmation handy"
         ]
     
-    tips_style = ParagraphStyle(
-        'Tips',
-        parent=normal_style,
-        fontSize=9,
-        leftIndent=15,
-        bulletIndent=5,
-        spaceAfter=4
-    )
+    tips_style = styles['tips']
     
     for tip in tips:
         elements.append(Paragraph(f"• {tip}", tips_style))
@@ -480,14 +505,7 @@ def generate_booking_pdf(booking_data, output_filename="booking_confirmation.pdf
     elements.append(Spacer(1, 0.3*inch))
     
     # === FOOTER ===
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#64748b'),
-        alignment=TA_CENTER,
-        fontName=UNICODE_FONT
-    )
+    footer_style = styles['footer']
     
     elements.append(Spacer(1, 0.3*inch))
     elements.append(Paragraph(
@@ -502,20 +520,56 @@ def generate_booking_pdf(booking_data, output_filename="booking_confirmation.pdf
     return output_filename
 
 
-def generate_qr_code(data):
-    """Generate QR code image from data"""
+def encode_qr_payload(data):
+    """
+    Encode ``data`` as a QR code and return its module matrix as text: one
+    line per row, ``1`` for a dark module. Tickets store this in
+    ``Ticket.qr_code`` so the PDF never has to encode the QR again.
+    """
+    qr = qrcode.QRCode(border=0)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return "\n".join("".join("1" if dark else "0" for dark in row) for row in qr.get_matrix())
+
+
+class QRCodeFlowable(Flowable):
+    """
+    A QR code drawn as vector rectangles (one per horizontal run of dark
+    modules) with a two-module quiet zone around it.
+    """
+
+    QUIET_ZONE = 2
+
+    def __init__(self, payload, size=1.5*inch):
+        super().__init__()
+        self.rows = payload.split("\n")
+        self.size = size
+        self.hAlign = 'CENTER'
+
+    def wrap(self, availWidth, availHeight):
+        return self.size, self.size
+
+    def draw(self):
+        modules = len(self.rows) + 2 * self.QUIET_ZONE
+        unit = self.size / modules
+        path = self.canv.beginPath()
+        for r, row in enumerate(self.rows):
+            y = self.size - (r + self.QUIET_ZONE + 1) * unit
+            start = None
+            for c, module in enumerate(row + "0"):
+                if module == "1" and start is None:
+                    start = c
+                elif module != "1" and start is not None:
+                    path.rect((start + self.QUIET_ZONE) * unit, y, (c - start) * unit, unit)
+                    start = None
+        self.canv.setFillColor(colors.black)
+        self.canv.drawPath(path, stroke=0, fill=1)
+
+
+def generate_qr_code(data, payload=None):
+    """QR code flowable for ``data``; pass the stored ``payload`` to skip encoding."""
     try:
-        qr = qrcode.QRCode(version=1, box_size=10, border=2)
-        qr.add_data(data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to ReportLab Image
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        return Image(buffer, width=1.5*inch, height=1.5*inch)
+        return QRCodeFlowable(payload or encode_qr_payload(data))
     except Exception as e:
         print(f"Error generating QR code: {e}")
         return None
@@ -1,6 +1,8 @@
 # payments/views.py
 from django.db import transaction as db_transaction
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.decorators import action
@@ -13,8 +15,17 @@ import decimal
 from rest_framework.views import APIView
 
 from .models import Transaction, Refund, Settlement, LoyaltyWallet
+from .outbox import record_payment_confirmed
+from .settlements import settle_period
+from .finance import provider_financial_summary
+from .refunds import process_chunk
+from .ledger import record_sale
+from .loyalty import points_for, conversion_rate_for, record_earn, wallet_for
+from .utils import encode_qr_payload
 from .serializers import TransactionSerializer, RefundSerializer, SettlementSerializer, LoyaltyWalletSerializer,TransactionListSerializer
 from bookings.models import Booking, Ticket, BookingStatus
+from bookings.exports import streaming_export
+from bookings.expiry import cancel_scheduled_expiry
 
 class PaymentViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
@@ -23,8 +34,8 @@ class PaymentViewSet(viewsets.ViewSet):
         operation_summary="Confirm payment for a booking",
         operation_description=(
             "Confirm payment for a booking (booking must be in 'Pending' state). "
-            "Creates a Transaction record, marks the Booking as Paid+Confirmed, issues a Ticket, "
-            "and awards loyalty points to the customer."
+            "Creates a Transaction record, marks the Booking as Paid+Confirmed and issues a Ticket. "
+            "Loyalty points, the ticket email and analytics are handled asynchronously afterwards."
         ),
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -79,47 +90,58 @@ class PaymentViewSet(viewsets.ViewSet):
 
         if booking.payment_status == 'Paid':
             return Response({"detail": "Booking already paid."}, status=status.HTTP_400_BAD_REQUEST)
+        if booking.status == 'Expired':
+            return Response({"detail": "Booking hold expired; please book again."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # provider id only; no need to load the whole service object
+        provider_id = (
+            ContentType.objects.get_for_id(booking.content_type_id).model_class().objects
+            .filter(pk=booking.object_id).values_list('provider_user_id', flat=True).first()
+            if booking.content_type_id else None
+        )
 
         # create transaction
         txn = Transaction.objects.create(
             booking=booking,
             customer_user=request.user,
-            provider_user=(
-                booking.service_object.provider_user_id
-                if hasattr(booking.service_object, 'provider_user_id')
-                else None
-            ),
+            provider_user_id=provider_id,
             amount=booking.total_amount,
             method=method,
             status='Success'
         )
+        record_sale(txn)
 
-        # mark booking confirmed
+        # mark booking confirmed; analytics are refreshed by the outbox
         booking.status = 'Confirmed'
         booking.payment_status = 'Paid'
+        booking._defer_analytics = True
         booking.save(update_fields=['status', 'payment_status', 'updated_at'])
 
         # create ticket
+        ticket_no = f"NEXA-{booking.booking_id.hex[:8].upper()}"
         ticket = Ticket.objects.create(
             booking=booking,
-            ticket_no=f"NEXA-{booking.booking_id.hex[:8].upper()}",
+            ticket_no=ticket_no,
+            qr_code=encode_qr_payload(ticket_no),
             is_valid=True
         )
 
-        # loyalty award
-        wallet, _ = LoyaltyWallet.objects.get_or_create(user=request.user)
-        earned_points = float(booking.total_amount) * wallet.conversion_rate * 0.05
-        wallet.balance_points += decimal.Decimal(earned_points)
-        wallet.save()
+        # loyalty: ledger entry only; the outbox credits it to the wallet
+        earned_points = points_for(booking.total_amount, conversion_rate_for(request.user.pk))
+        record_earn(txn, earned_points)
 
         # booking status log
         BookingStatus.objects.create(booking=booking, status='Confirmed', remarks=f'Payment confirmed: txn {txn.txn_id}')
 
+        # loyalty, ticket email and analytics run after commit
+        record_payment_confirmed(booking, txn, earned_points)
+        db_transaction.on_commit(lambda: cancel_scheduled_expiry(booking.booking_id))
+
         return Response({
             "message": "Payment successful",
             "transaction": TransactionSerializer(txn).data,
             "ticket_no": ticket.ticket_no,
-            "points_earned": earned_points
+            "points_earned": float(earned_points)
         }, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -129,8 +151,7 @@ class PaymentViewSet(viewsets.ViewSet):
     )
     @action(detail=False, methods=['get'], url_path='wallet')
     def wallet(self, request):
-        wallet, _ = LoyaltyWallet.objects.get_or_create(user=request.user)
-        return Response(LoyaltyWalletSerializer(wallet).data)
+        return Response(LoyaltyWalletSerializer(wallet_for(request.user)).data)
 
 
 class RefundViewSet(viewsets.ViewSet):
@@ -183,28 +204,11 @@ class RefundViewSet(viewsets.ViewSet):
             refund.save()
             return Response({"detail": "Refund rejected."}, status=status.HTTP_200_OK)
 
-        # Approve: simulate external gateway refund success
-        refund.status = 'Completed'
-        refund.completed_at = timezone.now()
-        refund.save()
-
-        txn = refund.transaction
-        txn.status = 'Refunded'
-        txn.save()
-
-        booking = txn.booking
-        booking.payment_status = 'Refunded'
-        booking.status = 'Cancelled'
-        booking.save()
-
-        # reverse loyalty (simple proportional reverse)
-        wallet = LoyaltyWallet.objects.filter(user=booking.customer).first()
-        if wallet:
-            to_remove = float(refund.amount) * wallet.conversion_rate * 0.05
-            wallet.balance_points = max(0, float(wallet.balance_points) - to_remove)
-            wallet.save()
-
-        BookingStatus.objects.create(booking=booking, status='Refunded', remarks=f'Refund completed: {refund.refund_id}')
+        # Approve: simulate external gateway refund success. Same cancellation fee,
+        # ledger entry and loyalty reversal as the batch processor.
+        if refund.status != 'Completed':
+            process_chunk([refund.pk], approved_by=request.user if request.user.is_authenticated else None)
+            refund.refresh_from_db()
 
         return Response({"detail": "Refund processed.", "refund": RefundSerializer(refund).data}, status=status.HTTP_200_OK)
 
@@ -223,17 +227,19 @@ class SettlementViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
 
     @swagger_auto_schema(
-        operation_summary="Create settlement for provider (Admin)",
+        operation_summary="Create settlements for providers (Admin)",
         operation_description=(
-            "Create a settlement record for a provider for a given period.\n"
-            "Calculates total successful transactions for the provider in period, applies platform fee (10%), "
-            "and creates a Settlement with 'Pending' status for payout handling."
+            "Create settlement records for a given period.\n"
+            "Totals each provider's successful, not yet settled transactions in the period, applies the platform "
+            "fee (10%), and creates a Settlement with 'Pending' status for payout handling. The settled "
+            "transactions are linked to it so they are never paid out twice.\n"
+            "With provider_user_id only that provider is settled; without it every provider is settled in one batch."
         ),
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
-            required=['provider_user_id', 'period_start', 'period_end'],
+            required=['period_start', 'period_end'],
             properties={
-                'provider_user_id': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID, description='UUID of provider user'),
+                'provider_user_id': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID, description='UUID of provider user (omit to settle all providers)'),
                 'period_start': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, description='ISO datetime start of period'),
                 'period_end': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME, description='ISO datetime end of period')
             }
@@ -258,32 +264,48 @@ class SettlementViewSet(viewsets.ViewSet):
         }
     )
     @action(detail=False, methods=['post'], url_path='process')
-    @db_transaction.atomic
     def process(self, request):
         provider_id = request.data.get('provider_user_id')
         period_start = request.data.get('period_start')
         period_end = request.data.get('period_end')
 
-        if not (provider_id and period_start and period_end):
-            return Response({"detail": "provider_user_id, period_start, period_end required."}, status=status.HTTP_400_BAD_REQUEST)
-
-        start = timezone.datetime.fromisoformat(period_start)
-        end = timezone.datetime.fromisoformat(period_end)
-
-        txns = Transaction.objects.filter(provider_user_id=provider_id, status='Success', transaction_date__gte=start, transaction_date__lte=end)
-        total = sum([float(t.amount) for t in txns]) if txns else 0.0
-
-        platform_fee = total * 0.10
-        payout = total - platform_fee
+        if not (period_start and period_end):
+            return Response({"detail": "period_start, period_end required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        settlement = Settlement.objects.create(
-            provider_user_id=provider_id,
-            period_start=start,
-            period_end=end,
-            amount=payout,
-            currency='INR',
-            status='Pending'
-        )
+        try:
+            start, end = parse_datetime(str(period_start)), parse_datetime(str(period_end))
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({"detail": "period_start and period_end must be ISO datetimes."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        start = start if timezone.is_aware(start) else timezone.make_aware(start)
+        end = end if timezone.is_aware(end) else timezone.make_aware(end)
+
+        if not provider_id:
+            settlements = settle_period(start, end)
+            return Response({
+                "message": f"{len(settlements)} settlements created.",
+                "total_payout": sum((s.amount for s in settlements), Decimal('0.00')),
+                "settlements": [
+                    {"settlement_id": s.settlement_id, "provider_user_id": s.provider_user_id, "amount": s.amount}
+                    for s in settlements
+                ],
+            }, status=status.HTTP_201_CREATED)
+
+        settlements = settle_period(start, end, provider_ids=[provider_id])
+        if settlements:
+            settlement = settlements[0]
+        else:
+            # Nothing left to pay out; still record the (empty) settlement
+            settlement = Settlement.objects.create(
+                provider_user_id=provider_id,
+                period_start=start,
+                period_end=end,
+                amount=Decimal('0.00'),
+                currency='INR',
+                status='Pending'
+            )
 
         return Response({"message": "Settlement created.", "settlement": SettlementSerializer(settlement).data}, status=status.HTTP_201_CREATED)
 class TransactionHistoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -313,6 +335,42 @@ class TransactionHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+    EXPORT_COLUMNS = [
+        ('txn_id', 'txn_id'),
+        ('booking_id', 'booking_id'),
+        ('customer', 'customer_user__username'),
+        ('provider', 'provider_user__username'),
+        ('amount', 'amount'),
+        ('currency', 'currency'),
+        ('method', 'method'),
+        ('status', 'status'),
+        ('transaction_date', 'transaction_date'),
+        ('settlement_id', 'settlement_id'),
+    ]
+
+    @swagger_auto_schema(
+        operation_summary="Export transaction history",
+        operation_description=(
+            "Streams the provider's transactions (every transaction for admins) as CSV or NDJSON, "
+            "newest first, in constant memory."
+        ),
+        manual_parameters=[
+            openapi.Parameter('export_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['csv', 'ndjson'], default='csv'),
+            openapi.Parameter('from', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='First day (inclusive)'),
+            openapi.Parameter('to', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='Last day (inclusive)'),
+        ],
+    )
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[IsAuthenticated])
+    def export(self, request):
+        user = request.user
+        queryset = Transaction.objects.all() if user.user_type == 'admin' else Transaction.objects.filter(provider_user=user)
+        return streaming_export(
+            request, queryset.order_by('-transaction_date'), self.EXPORT_COLUMNS,
+            date_field='transaction_date', filename='transactions',
+        )
+
+
 class FinancialDashboardView(APIView):
     """
     Returns the complete financial dashboard summary for a provider:
@@ -321,85 +379,15 @@ class FinancialDashboardView(APIView):
     - Refunds Issued
     - Platform Fees
     - Revenue Breakdown (Bus / Train / Flight / Miscellaneous)
+    - Ledger balance and running totals
+
+    Computed by ``payments.finance`` with conditional aggregates, optionally
+    from the daily rollup.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-
-        # --- 1️⃣ TOTAL EARNINGS ---
-        total_earnings = (
-            Transaction.objects.filter(provider_user=user, status='Success')
-            .aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        )
-        print("Total Earnings Query:", Transaction.objects.filter(provider_user=user, status='Success').query)
-
-        # --- 2️⃣ PENDING SETTLEMENT ---
-        pending_settlement = (
-            Settlement.objects.filter(provider_user=user, status='Completed')
-            .aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        )
-
-        # --- 3️⃣ REFUNDS ISSUED ---
-        refunds_issued = (
-            Refund.objects.filter(transaction__provider_user=user, status='Completed')
-            .aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        )
-
-        # --- 4️⃣ PLATFORM FEES ---
-        platform_fees = (total_earnings * Decimal('0.00')).quantize(Decimal('0.01'))
-
-        # --- 5️⃣ REVENUE BREAKDOWN ---
-        transactions = (
-            Transaction.objects.filter(provider_user=user, status='Success')
-            .select_related('booking__content_type')
-        )
-
-        totals = {
-            "Bus": Decimal('0.00'),
-            "Train": Decimal('0.00'),
-            "Flight": Decimal('0.00'),
-            "Miscellaneous": Decimal('0.00'),
-        }
-
-        for txn in transactions:
-            booking = txn.booking
-            if not booking or not booking.content_type:
-                totals["Miscellaneous"] += txn.amount
-                continue
-
-            model_name = booking.content_type.model.lower()
-            if "bus" in model_name:
-                totals["Bus"] += txn.amount
-            elif "train" in model_name:
-                totals["Train"] += txn.amount
-            elif "flight" in model_name:
-                totals["Flight"] += txn.amount
-            else:
-                totals["Miscellaneous"] += txn.amount
-
-        total_revenue = sum(totals.values()) or Decimal('1.0')
-        breakdown = [
-            {
-                "label": label,
-                "value": totals[label],
-                "percentage": round((totals[label] / total_revenue) * 100, 2)
-            }
-            for label in totals
-        ]
-
-        # --- 🧾 FINAL RESPONSE ---
-        data = {
-            "summary": {
-                "total_earnings": total_earnings,
-                "pending_settlement": total_earnings - pending_settlement,
-                "refunds_issued": refunds_issued,
-                "platform_fees": platform_fees,
-            },
-            "revenue_breakdown": breakdown
-        }
-
-        return Response(data)
+        return Response(provider_financial_summary(request.user))
     
 class LoyaltyPointsView(APIView):
     """
@@ -408,8 +396,7 @@ class LoyaltyPointsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        wallet, _ = LoyaltyWallet.objects.get_or_create(user=user)
+        wallet = wallet_for(request.user)
 
         data = {
             "wallet_id": str(wallet.wallet_id),
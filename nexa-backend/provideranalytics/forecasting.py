@@ -0,0 +1,208 @@
+"""
+Demand forecasting per route.
+
+Training looks at departed services and learns, per route, how much of the
+final load is usually sold ``d`` days before departure (the pickup curve)
+plus a smoothed final load factor. Both are exponentially smoothed over
+departures so recent services weigh more. Results are cached in
+``RouteDemandCurve``.
+
+Forecasting then projects each upcoming service's current sales onto its
+route's curve and stores the expected final load in
+``ServiceDemandForecast``, which repricing and the provider dashboard read.
+"""
+from datetime import timedelta
+from itertools import groupby
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+from django.utils import timezone
+
+from bookings.models import Booking
+from services.models import BusService, TrainService, FlightService
+from .models import RouteDemandCurve, ServiceDemandForecast
+
+HORIZON_DAYS = 30
+SERVICE_MODELS = (BusService, TrainService, FlightService)
+# Below this share sold the multiplicative projection is too noisy to trust
+MIN_SHARE = 0.05
+
+
+def _load_services(model, **filters):
+    return list(
+        model.objects.filter(**filters)
+        .values_list('service_id', 'route_id', 'provider_user_id', 'departure_time', 'total_capacity')
+    )
+
+
+def _seats_sold(model, service_ids_qs, statuses):
+    """{service_id: passengers} for bookings on the given services."""
+    rows = (
+        Booking.objects.filter(
+            content_type=ContentType.objects.get_for_model(model),
+            object_id__in=service_ids_qs,
+            status__in=statuses,
+        )
+        .values('object_id')
+        .annotate(pax=Count('passengers'))
+    )
+    return {row['object_id']: row['pax'] for row in rows}
+
+
+def _smoothed(rows, alpha):
+    """Exponentially weighted mean of ``rows`` (oldest first) along axis 0."""
+    weights = (1 - alpha) ** np.arange(len(rows) - 1, -1, -1)
+    return np.average(rows, axis=0, weights=weights)
+
+
+def train_route_curves(history_days=365, alpha=0.3):
+    """
+    Rebuild ``RouteDemandCurve`` for every route with departed, booked services.
+    Returns the number of routes trained.
+    """
+    now = timezone.now()
+    window = {'departure_time__lt': now, 'departure_time__gte': now - timedelta(days=history_days)}
+
+    services, index = [], {}
+    svc_idx, days_out, pax = [], [], []
+    for model in SERVICE_MODELS:
+        model_services = _load_services(model, **window)
+        for row in model_services:
+            index[row[0]] = len(services)
+            services.append(row)
+
+        bookings = (
+            Booking.objects.filter(
+                content_type=ContentType.objects.get_for_model(model),
+                object_id__in=model.objects.filter(**window).values('service_id'),
+                status='Confirmed',
+            )
+            .annotate(pax=Count('passengers'))
+            .values_list('object_id', 'created_at', 'pax')
+            .iterator(chunk_size=20000)
+        )
+        for object_id, created_at, count in bookings:
+            i = index.get(object_id)
+            if i is None or not count:
+                continue
+            svc_idx.append(i)
+            days_out.append((services[i][3] - created_at).days)
+            pax.append(count)
+
+    if not svc_idx:
+        return 0
+
+    # sales[s, d] = passengers booked exactly d days out (last column: d >= horizon)
+    sales = np.zeros((len(services), HORIZON_DAYS + 1))
+    np.add.at(sales, (np.asarray(svc_idx), np.clip(days_out, 0, HORIZON_DAYS)), np.asarray(pax, dtype=float))
+    # sold_by[s, d] = passengers already booked d days out
+    sold_by = np.cumsum(sales[:, ::-1], axis=1)[:, ::-1]
+    final = sold_by[:, 0]
+    capacity = np.array([row[4] for row in services], dtype=float)
+
+    keep = np.flatnonzero((final > 0) & (capacity > 0))
+    routes = np.array([row[1] for row in services], dtype=object)[keep]
+    departures = np.array([row[3].timestamp() for row in services])[keep]
+    share = sold_by[keep] / final[keep, None]
+    load_factor = final[keep] / capacity[keep]
+
+    order = sorted(range(len(keep)), key=lambda k: (str(routes[k]), departures[k]))
+    curves = []
+    for route_id, group in groupby(order, key=lambda k: routes[k]):
+        rows = list(group)
+        curves.append(RouteDemandCurve(
+            route_id=route_id,
+            pickup_curve=[round(float(v), 4) for v in _smoothed(share[rows], alpha)],
+            expected_load_factor=round(float(_smoothed(load_factor[rows], alpha)), 4),
+            services_observed=len(rows),
+            trained_at=now,
+        ))
+
+    RouteDemandCurve.objects.bulk_create(
+        curves,
+        update_conflicts=True,
+        unique_fields=['route'],
+        update_fields=['pickup_curve', 'expected_load_factor', 'services_observed', 'trained_at'],
+    )
+    return len(curves)
+
+
+def expected_final_load(sold, capacity, days_out, curve):
+    """
+    Blend the pickup projection (``sold / share``) with the route's usual
+    final load, trusting the projection more as more of the curve has passed.
+    """
+    if curve is None or not curve.pickup_curve or not capacity:
+        return float(sold)
+    share = curve.pickup_curve[min(max(days_out, 0), len(curve.pickup_curve) - 1)]
+    prior = curve.expected_load_factor * capacity
+    projected = sold / share if share >= MIN_SHARE else prior
+    expected = share * projected + (1 - share) * prior
+    return float(min(max(expected, sold), capacity))
+
+
+def forecast_upcoming_services():
+    """
+    Refresh ``ServiceDemandForecast`` for every scheduled, not yet departed
+    service. Returns the number of forecasts written.
+    """
+    now = timezone.now()
+    curves = {c.route_id: c for c in RouteDemandCurve.objects.all()}
+
+    forecasts = []
+    for model in SERVICE_MODELS:
+        upcoming = {'departure_time__gt': now, 'status': 'Scheduled'}
+        sold = _seats_sold(
+            model, model.objects.filter(**upcoming).values('service_id'), ['Confirmed', 'Pending']
+        )
+        content_type = ContentType.objects.get_for_model(model)
+        for service_id, route_id, provider_id, departure, capacity in _load_services(model, **upcoming):
+            seats_sold = sold.get(service_id, 0)
+            expected = expected_final_load(seats_sold, capacity, (departure - now).days, curves.get(route_id))
+            forecasts.append(ServiceDemandForecast(
+                content_type=content_type,
+                object_id=service_id,
+                provider_id=provider_id,
+                route_id=route_id,
+                departure_time=departure,
+                capacity=capacity,
+                seats_sold=seats_sold,
+                expected_final_load=round(expected, 2),
+                expected_load_factor=round(expected / capacity, 4) if capacity else 0.0,
+                computed_at=now,
+            ))
+
+    ServiceDemandForecast.objects.bulk_create(
+        forecasts,
+        update_conflicts=True,
+        unique_fields=['content_type', 'object_id'],
+        update_fields=['departure_time', 'capacity', 'seats_sold',
+                       'expected_final_load', 'expected_load_factor', 'computed_at'],
+    )
+    # Anything not refreshed this run has departed, been cancelled or been
+    # removed, and would otherwise keep feeding repricing and the dashboard
+    ServiceDemandForecast.objects.filter(computed_at__lt=now).delete()
+    return len(forecasts)
+
+
+def reprice_bus_services():
+    """
+    Re-run dynamic pricing on upcoming bus services using their forecast
+    load. Bus is the only mode that stores its current fares; train and
+    flight fares are computed per quote.
+    """
+    now = timezone.now()
+    expected = dict(
+        ServiceDemandForecast.objects.filter(
+            content_type=ContentType.objects.get_for_model(BusService)
+        ).values_list('object_id', 'expected_load_factor')
+    )
+    services = list(BusService.objects.filter(
+        service_id__in=list(expected), dynamic_pricing_enabled=True, departure_time__gt=now,
+    ))
+    for service in services:
+        hours = (service.departure_time - now).total_seconds() / 3600
+        service.apply_dynamic_pricing(hours, expected_load_factor=expected[service.service_id])
+    BusService.objects.bulk_update(services, ['current_sleeper_price', 'current_non_sleeper_price'])
+    return len(services)
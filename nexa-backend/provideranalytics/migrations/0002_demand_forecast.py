@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:03
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('provideranalytics', '0001_initial'),
+        ('services', '0013_farehistorychunk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteDemandCurve',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('pickup_curve', models.JSONField(blank=True, default=list)),
+                ('expected_load_factor', models.FloatField(default=0.0)),
+                ('services_observed', models.PositiveIntegerField(default=0)),
+                ('trained_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('route', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demand_curve', to='services.route')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ServiceDemandForecast',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('object_id', models.UUIDField()),
+                ('departure_time', models.DateTimeField()),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('seats_sold', models.PositiveIntegerField(default=0)),
+                ('expected_final_load', models.FloatField(default=0.0)),
+                ('expected_load_factor', models.FloatField(default=0.0)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to=settings.AUTH_USER_MODEL)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='services.route')),
+            ],
+            options={
+                'ordering': ['departure_time'],
+                'unique_together': {('content_type', 'object_id')},
+            },
+        ),
+    ]
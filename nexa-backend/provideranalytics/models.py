@@ -169,3 +169,50 @@ class ProviderPerformance(models.Model):
             obj.total_revenue = item['total_revenue'] or Decimal('0.0')
             obj.last_updated = timezone.now()
             obj.save(update_fields=['total_bookings', 'total_revenue', 'last_updated'])
+
+
+class RouteDemandCurve(models.Model):
+    """
+    Learned booking curve for a route, rebuilt by the demand forecasting task.
+
+    ``pickup_curve[d]`` is the share of a service's final load that is
+    usually already sold ``d`` days before departure (last entry covers
+    everything further out). ``expected_load_factor`` is the smoothed final
+    load factor of recent departures.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    route = models.OneToOneField('services.Route', on_delete=models.CASCADE, related_name='demand_curve')
+
+    pickup_curve = models.JSONField(default=list, blank=True)
+    expected_load_factor = models.FloatField(default=0.0)
+    services_observed = models.PositiveIntegerField(default=0)
+    trained_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Demand curve: {self.route}"
+
+
+class ServiceDemandForecast(models.Model):
+    """
+    Expected final load for one upcoming Bus/Train/Flight service.
+    Read by the repricing job and the provider dashboard.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE)
+    object_id = models.UUIDField()
+    provider = models.ForeignKey(User, on_delete=models.CASCADE, related_name='demand_forecasts')
+    route = models.ForeignKey('services.Route', on_delete=models.CASCADE, related_name='demand_forecasts')
+    departure_time = models.DateTimeField()
+
+    capacity = models.PositiveIntegerField(default=0)
+    seats_sold = models.PositiveIntegerField(default=0)
+    expected_final_load = models.FloatField(default=0.0)
+    expected_load_factor = models.FloatField(default=0.0)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id')
+        ordering = ['departure_time']
+
+    def __str__(self):
+        return f"Forecast {self.object_id}: {self.expected_load_factor:.0%}"
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.db.models import Sum, Count, Q
 from django.db.models.functions import TruncMonth
 from decimal import Decimal
-from .models import RouteAnalytics
+from .models import RouteAnalytics, ServiceDemandForecast
 from bookings.models import Booking
 from services.models import BusService, TrainService, FlightService, Route
 
@@ -45,6 +45,7 @@ class DashboardSummarySerializer(serializers.Serializer):
 
     # 🆕 New field
     booking_distribution = serializers.DictField()
+    expected_load = serializers.DictField()
 
     route_performance = RoutePerformanceSerializer(many=True)
     revenue_trends = RevenueTrendSerializer(many=True)
@@ -156,6 +157,26 @@ class DashboardSummarySerializer(serializers.Serializer):
         top_routes = RouteAnalytics.objects.order_by('-total_revenue')[:5]
         route_performance = RoutePerformanceSerializer(top_routes, many=True).data
 
+        # 8️⃣ Forecast load of upcoming services (refreshed hourly)
+        forecast_qs = ServiceDemandForecast.objects.all()
+        if provider:
+            forecast_qs = forecast_qs.filter(provider=provider)
+        forecast = forecast_qs.aggregate(
+            upcoming_services=Count('id'),
+            capacity=Sum('capacity'),
+            seats_sold=Sum('seats_sold'),
+            expected_final_load=Sum('expected_final_load'),
+        )
+        capacity = forecast['capacity'] or 0
+        expected_final_load = forecast['expected_final_load'] or 0.0
+        expected_load = {
+            "upcoming_services": forecast['upcoming_services'],
+            "capacity": capacity,
+            "seats_sold": forecast['seats_sold'] or 0,
+            "expected_final_load": round(expected_final_load, 2),
+            "expected_load_factor": round(expected_final_load / capacity, 4) if capacity else 0.0,
+        }
+
         # ✅ Final data
         return {
             'total_bookings': total_bookings,
@@ -164,6 +185,7 @@ class DashboardSummarySerializer(serializers.Serializer):
             'active_routes': active_routes,
             'active_services': active_services,
             'booking_distribution': booking_distribution,
+            'expected_load': expected_load,
             'growth_rates': growth_rates,
             'route_performance': route_performance,
             'revenue_trends': revenue_trends
@@ -407,4 +429,37 @@ class RouteComparisonSerializer(serializers.Serializer):
         # Sort by revenue (descending)
         data = sorted(data, key=lambda x: x["occupancy"], reverse=True)
 
-        return data
\ No newline at end of file
+        return data
+
+class DemandForecastSerializer(serializers.ModelSerializer):
+    service_id = serializers.UUIDField(source='object_id', read_only=True)
+    service_type = serializers.CharField(source='content_type.model', read_only=True)
+    route_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ServiceDemandForecast
+        fields = [
+            'service_id',
+            'service_type',
+            'route_name',
+            'departure_time',
+            'capacity',
+            'seats_sold',
+            'expected_final_load',
+            'expected_load_factor',
+            'computed_at',
+        ]
+
+    def get_route_name(self, obj):
+        return f"{obj.route.source.code} → {obj.route.destination.code}"
+
+    @staticmethod
+    def get_forecast_data(provider):
+        """
+        ``provider``'s upcoming services with their forecast final load,
+        soonest first. Forecasts are refreshed hourly by provideranalytics.tasks.
+        """
+        qs = ServiceDemandForecast.objects.select_related(
+            'content_type', 'route__source', 'route__destination'
+        ).filter(provider=provider)
+        return DemandForecastSerializer(qs, many=True).data
@@ -6,6 +6,9 @@ from provideranalytics.models import RouteAnalytics, ProviderPerformance
 
 @receiver(post_save, sender=Booking)
 def update_analytics_on_booking(sender, instance, **kwargs):
+    # Payment confirmation refreshes analytics through the payments outbox
+    if getattr(instance, '_defer_analytics', False):
+        return
     if instance.status == 'Confirmed' and instance.payment_status == 'Paid':
         RouteAnalytics.update_from_bookings()
         ProviderPerformance.update_from_bookings()
@@ -0,0 +1,17 @@
+from celery import shared_task
+from .forecasting import train_route_curves, forecast_upcoming_services, reprice_bus_services
+
+
+@shared_task
+def train_demand_curves():
+    """Relearn per-route booking curves from the full departed-service history."""
+    count = train_route_curves()
+    return f"Trained demand curves for {count} routes."
+
+
+@shared_task
+def refresh_demand_forecasts():
+    """Forecast final load for upcoming services, then reprice buses with it."""
+    forecasts = forecast_upcoming_services()
+    repriced = reprice_bus_services()
+    return f"Forecast {forecasts} services, repriced {repriced} bus services."
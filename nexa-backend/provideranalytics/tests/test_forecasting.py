@@ -0,0 +1,120 @@
+import pytest
+from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from bookings.models import Booking, BookingPassenger
+from services.models import Station, Route, Vehicle, Policy, BusService
+from provideranalytics.forecasting import (
+    train_route_curves, forecast_upcoming_services, reprice_bus_services, expected_final_load,
+)
+from provideranalytics.models import RouteDemandCurve, ServiceDemandForecast
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def route():
+    return Route.objects.create(
+        source=Station.objects.create(name="Pune", code="PNQ"),
+        destination=Station.objects.create(name="Goa", code="GOI"),
+        distance_km=450,
+    )
+
+
+@pytest.fixture
+def make_bus(provider_user, route):
+    vehicle = Vehicle.objects.create(registration_no="MH12", model="Volvo", capacity=10, status="Active")
+    policy = Policy.objects.create(cancellation_window=12, cancellation_fee=0, reschedule_fee=0,
+                                   no_show_penalty=0, terms_conditions="-")
+
+    def _make(departs_in, **kwargs):
+        departure = timezone.now() + departs_in
+        return BusService.objects.create(
+            provider_user_id=provider_user, route=route, vehicle=vehicle, policy=policy,
+            departure_time=departure, arrival_time=departure + timedelta(hours=8),
+            base_price=500, sleeper_price=500, non_sleeper_price=400, total_capacity=10, **kwargs,
+        )
+    return _make
+
+
+def book(service, pax, days_before_departure, status='Confirmed'):
+    booking = Booking.objects.create(
+        content_type=ContentType.objects.get_for_model(BusService),
+        object_id=service.service_id, status=status, total_amount=100 * pax,
+    )
+    BookingPassenger.objects.bulk_create(BookingPassenger(booking=booking, name="P") for _ in range(pax))
+    Booking.objects.filter(pk=booking.pk).update(
+        created_at=service.departure_time - timedelta(days=days_before_departure, hours=1)
+    )
+
+
+def test_train_route_curves_learns_pickup_share(route, make_bus):
+    for weeks_ago in (3, 2):
+        past = make_bus(timedelta(weeks=-weeks_ago))
+        book(past, 4, days_before_departure=10)
+        book(past, 4, days_before_departure=1)
+
+    assert train_route_curves() == 1
+    curve = RouteDemandCurve.objects.get(route=route)
+    assert curve.services_observed == 2
+    assert curve.expected_load_factor == pytest.approx(0.8)
+    assert curve.pickup_curve[0] == pytest.approx(1.0)
+    assert curve.pickup_curve[5] == pytest.approx(0.5)
+    assert curve.pickup_curve[20] == pytest.approx(0.0)
+
+
+def test_expected_final_load_blends_projection_and_prior():
+    curve = RouteDemandCurve(pickup_curve=[1.0, 0.5, 0.0], expected_load_factor=0.6)
+    # Far out: nothing to project from, fall back to the route's usual load
+    assert expected_final_load(0, 10, 30, curve) == pytest.approx(6.0)
+    # Half way: 4 sold now projects to 8, blended 50/50 with the prior of 6
+    assert expected_final_load(4, 10, 1, curve) == pytest.approx(7.0)
+    # Never below what is already sold, never above capacity
+    assert expected_final_load(9, 10, 1, curve) == pytest.approx(10.0)
+    assert expected_final_load(3, 10, 1, None) == 3.0
+
+
+def test_forecast_feeds_bus_repricing_and_dashboard(route, make_bus, auth_client):
+    RouteDemandCurve.objects.create(route=route, pickup_curve=[1.0, 0.5, 0.2], expected_load_factor=0.9)
+    upcoming = make_bus(timedelta(days=1, hours=6), dynamic_pricing_enabled=True)
+    book(upcoming, 2, days_before_departure=0, status='Pending')
+
+    assert forecast_upcoming_services() == 1
+    forecast = ServiceDemandForecast.objects.get(object_id=upcoming.service_id)
+    assert forecast.seats_sold == 2
+    assert forecast.expected_final_load == pytest.approx(6.5)
+
+    assert reprice_bus_services() == 1
+    upcoming.refresh_from_db()
+    # Priced off the 65% forecast rather than the 0 booked_seats counter
+    assert float(upcoming.current_sleeper_price) == pytest.approx(500 * (1 + 0.65 * 0.5), rel=1e-3)
+
+    resp = auth_client.get(reverse("demand-forecast"))
+    assert resp.status_code == 200
+    assert resp.data["forecasts"][0]["route_name"] == "PNQ → GOI"
+
+    expected_load = auth_client.get(reverse("provider-dashboard")).data["expected_load"]
+    assert expected_load["upcoming_services"] == 1
+    assert expected_load["seats_sold"] == 2
+    assert expected_load["expected_load_factor"] == pytest.approx(0.65)
+
+    other = get_user_model().objects.create_user(username="prov2", email="prov2@example.com",
+                                                 password="testpass", user_type="provider")
+    auth_client.force_authenticate(user=other)
+    assert auth_client.get(reverse("demand-forecast")).data["forecasts"] == []
+    auth_client.force_authenticate(user=None)
+    assert auth_client.get(reverse("demand-forecast")).status_code in (401, 403)
+
+
+def test_forecast_drops_departed_and_cancelled_services(make_bus):
+    departed = make_bus(timedelta(days=2))
+    cancelled = make_bus(timedelta(days=3))
+    kept = make_bus(timedelta(days=4))
+    assert forecast_upcoming_services() == 3
+
+    BusService.objects.filter(pk=departed.pk).update(departure_time=timezone.now() - timedelta(hours=1))
+    BusService.objects.filter(pk=cancelled.pk).update(status='Cancelled')
+    assert forecast_upcoming_services() == 1
+    assert list(ServiceDemandForecast.objects.values_list('object_id', flat=True)) == [kept.service_id]
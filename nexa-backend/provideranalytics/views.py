@@ -1,7 +1,8 @@
 # analytics/views.py
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .serializers import DashboardSummarySerializer,DateOccupancyHeatmapSerializer,MonthlyRevenueTrendSerializer,RouteComparisonSerializer
+from rest_framework.permissions import IsAuthenticated
+from .serializers import DashboardSummarySerializer,DateOccupancyHeatmapSerializer,MonthlyRevenueTrendSerializer,RouteComparisonSerializer,DemandForecastSerializer
 
 class ProviderDashboardView(APIView):
     """
@@ -40,4 +41,14 @@ class RouteComparisonView(APIView):
     def get(self, request):
         provider = request.user if request.user.is_authenticated else None
         routes_data = RouteComparisonSerializer.get_route_comparison_data(provider)
-        return Response({"routes": routes_data})
\ No newline at end of file
+        return Response({"routes": routes_data})
+
+class DemandForecastView(APIView):
+    """
+    Returns expected final load for the provider's upcoming services.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        data = DemandForecastSerializer.get_forecast_data(request.user)
+        return Response({"forecasts": data})
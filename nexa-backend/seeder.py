@@ -1,24 +1,53 @@
 """
 Modern Service Seeder for Nexa Backend
 Generates realistic bus, flight, and train services matching the frontend API structure.
+
+Two ways to load them:
+
+* HTTP (default): POSTs to the create endpoints from a pool of worker threads,
+  each holding its own keep-alive session::
+
+      python seeder.py --buses 500 --flights 500 --trains 200 --concurrency 16
+
+* ORM (``--orm``): skips HTTP and writes through ``services.ingest`` in bulk,
+  for quickly building a local benchmarking dataset::
+
+      python seeder.py --orm --provider provider@example.com --buses 10000
+
+Payloads come from per-mode RNGs seeded with ``--seed``, so the same seed and
+counts always produce the same dataset, whatever the concurrency.
 """
 
+import argparse
 import json
+import os
 import random
-import requests
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 # ==========================
 # Configuration
 # ==========================
-BASE_URL = "http://127.0.0.1:8000"
-AUTH_TOKEN = "onKSFH0puJZYJ75MQ8JaAnNN5qV6uvjBXcXxB26w"  # Replace with your actual token
+BASE_URL = os.environ.get("NEXA_BASE_URL", "http://127.0.0.1:8000")
+AUTH_TOKEN = os.environ.get("NEXA_SEED_TOKEN", "onKSFH0puJZYJ75MQ8JaAnNN5qV6uvjBXcXxB26w")  # Replace with your actual token
+DEFAULT_SEED = 455
 
 # Load station data
-BUS_STATIONS = json.load(open("BusStopsList.json"))
-FLIGHT_STATIONS = json.load(open("Airportslist.json"))
-TRAIN_STATIONS = json.load(open("TrainStationsList.json"))
+DATA_DIR = Path(__file__).resolve().parent
+BUS_STATIONS = json.loads((DATA_DIR / "BusStopsList.json").read_text())
+FLIGHT_STATIONS = json.loads((DATA_DIR / "Airportslist.json").read_text())
+TRAIN_STATIONS = json.loads((DATA_DIR / "TrainStationsList.json").read_text())
 
 # Available amenities
 AMENITIES_LIST = [
@@ -39,10 +68,10 @@ def build_amenities_object(selected_amenities: List[str]) -> Dict[str, bool]:
     return amenities
 
 
-def random_amenities(min_count: int = 3, max_count: int = 7) -> List[str]:
+def random_amenities(rng: random.Random, min_count: int = 3, max_count: int = 7) -> List[str]:
     """Select random amenities."""
-    count = random.randint(min_count, max_count)
-    return random.sample(AMENITIES_LIST, count)
+    count = rng.randint(min_count, max_count)
+    return rng.sample(AMENITIES_LIST, count)
 
 
 def format_iso_timestamp(dt: datetime) -> str:
@@ -60,9 +89,9 @@ def calculate_duration(departure: datetime, arrival: datetime) -> str:
     return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
 
-def random_city_pair(stations: List[Dict]) -> tuple:
+def random_city_pair(rng: random.Random, stations: List[Dict]) -> tuple:
     """Pick two distinct cities."""
-    return random.sample(stations, 2)
+    return rng.sample(stations, 2)
 
 
 def build_terms_conditions(baggage: str, luggage: str, terms: str) -> str:
@@ -70,14 +99,46 @@ def build_terms_conditions(baggage: str, luggage: str, terms: str) -> str:
     return f"Baggage Allowance: {baggage}kg. Luggage Allowance: {luggage}kg. {terms}"
 
 
+# ==========================
+# Generator Base
+# ==========================
+
+class ServiceGenerator(ABC):
+    """Builds create payloads for one service type from its own seeded RNG."""
+    service_type = ""
+    endpoint = ""
+    number_field = ""
+    days_spread = 30
+
+    def __init__(self, seed: Optional[int] = DEFAULT_SEED):
+        self.rng = random.Random(f"{seed}:{self.service_type}") if seed is not None else random.Random()
+
+    def describe(self, payload: Dict[str, Any]) -> str:
+        route = payload['route']
+        return f"{route['source']['city']} → {route['destination']['city']} ({payload[self.number_field]})"
+
+    @abstractmethod
+    def generate_service(self, start_date: datetime) -> Dict[str, Any]:
+        """One create payload departing on ``start_date``."""
+
+    def payloads(self, num_services: int, start_date: datetime) -> List[Dict[str, Any]]:
+        """Generate ``num_services`` payloads departing within ``days_spread`` days of ``start_date``."""
+        result = []
+        for _ in range(num_services):
+            date = start_date + timedelta(days=self.rng.randint(0, self.days_spread))
+            result.append(self.generate_service(date))
+        return result
+
+
 # ==========================
 # Bus Service Generator
 # ==========================
 
-class BusServiceGenerator:
-    def __init__(self, api_url: str, token: str):
-        self.api_url = f"{api_url}/services/bus-services/"
-        self.token = token
+class BusServiceGenerator(ServiceGenerator):
+    service_type = "bus"
+    endpoint = "/services/bus-services/"
+    number_field = "bus_number"
+    days_spread = 30
 
     def random_vehicle(self, capacity: int) -> Dict[str, Any]:
         """Generate random bus vehicle details."""
@@ -85,35 +146,35 @@ class BusServiceGenerator:
         reg_prefixes = ['DL', 'MH', 'KA', 'TS', 'UP', 'GJ', 'RJ']
         
         return {
-            "registration_no": f"{random.choice(reg_prefixes)}{random.randint(1,99):02d}AB{random.randint(1000,9999)}",
-            "model": random.choice(models),
+            "registration_no": f"{self.rng.choice(reg_prefixes)}{self.rng.randint(1,99):02d}AB{self.rng.randint(1000,9999)}",
+            "model": self.rng.choice(models),
             "capacity": capacity,
-            "amenities": build_amenities_object(random_amenities()),
+            "amenities": build_amenities_object(random_amenities(self.rng)),
             "status": "Active"
         }
     
     def random_policy(self) -> Dict[str, Any]:
         """Generate random cancellation policy."""
-        baggage = str(random.choice([15, 20, 25]))
-        luggage = str(random.choice([10, 15, 20]))
+        baggage = str(self.rng.choice([15, 20, 25]))
+        luggage = str(self.rng.choice([10, 15, 20]))
         terms = "Standard cancellation and refund terms apply. No refund for no-show."
         
         return {
-            "cancellation_window": random.choice([6, 12, 24]),
-            "cancellation_fee": f"{random.randint(100, 200)}.00",
+            "cancellation_window": self.rng.choice([6, 12, 24]),
+            "cancellation_fee": f"{self.rng.randint(100, 200)}.00",
             "reschedule_allowed": True,
-            "reschedule_fee": f"{random.randint(50, 150)}.00",
-            "no_show_penalty": f"{random.randint(150, 300)}.00",
+            "reschedule_fee": f"{self.rng.randint(50, 150)}.00",
+            "no_show_penalty": f"{self.rng.randint(150, 300)}.00",
             "terms_conditions": build_terms_conditions(baggage, luggage, terms),
-            "no_cancellation_fee_markup": f"{random.randint(0, 100)}.00",
-            "no_reschedule_fee_markup": f"{random.randint(0, 50)}.00"
+            "no_cancellation_fee_markup": f"{self.rng.randint(0, 100)}.00",
+            "no_reschedule_fee_markup": f"{self.rng.randint(0, 50)}.00"
         }
 
     def format_bus_stations(self, bus_stops: List[Dict], base_time: datetime) -> List[Dict[str, str]]:
         """Format bus stations with time offsets."""
         result = []
         for i, stop in enumerate(bus_stops):
-            stop_time = base_time + timedelta(minutes=(i + 1) * random.randint(5, 15))
+            stop_time = base_time + timedelta(minutes=(i + 1) * self.rng.randint(5, 15))
             result.append({
                 "code": stop["code"],
                 "name": stop["name"],
@@ -127,7 +188,7 @@ class BusServiceGenerator:
         for i, stop in enumerate(stops):
             stop_time = datetime.fromisoformat(stop["departure_time"].replace("Z", ""))
             duration = calculate_duration(stop_time, destination_arrival)
-            price_reduction = random.uniform(0.2, 0.4) * base_price
+            price_reduction = self.rng.uniform(0.2, 0.4) * base_price
             
             result.append({
                 "stop_order": i + 1,
@@ -137,7 +198,7 @@ class BusServiceGenerator:
                     "city": stop["station"]["city"],
                     "state": stop["station"]["state"],
                     "BusStations": self.format_bus_stations(
-                        stop["station"]["points"][:random.randint(2, 4)],
+                        stop["station"]["points"][:self.rng.randint(2, 4)],
                         stop_time
                     )
                 },
@@ -148,36 +209,36 @@ class BusServiceGenerator:
     
     def generate_service(self, start_date: datetime) -> Dict[str, Any]:
         """Generate a complete bus service payload."""
-        source, destination = random_city_pair(BUS_STATIONS)
+        source, destination = random_city_pair(self.rng, BUS_STATIONS)
         
         # Random departure and arrival times
         departure = start_date.replace(
-            hour=random.randint(5, 22),
-            minute=random.choice([0, 15, 30, 45]),
+            hour=self.rng.randint(5, 22),
+            minute=self.rng.choice([0, 15, 30, 45]),
             second=0,
             microsecond=0
         )
-        travel_hours = random.randint(4, 16)
-        arrival = departure + timedelta(hours=travel_hours, minutes=random.randint(0, 59))
+        travel_hours = self.rng.randint(4, 16)
+        arrival = departure + timedelta(hours=travel_hours, minutes=self.rng.randint(0, 59))
         
         # Seat configuration
-        num_rows_sleeper = random.randint(5, 10)
+        num_rows_sleeper = self.rng.randint(5, 10)
         num_columns_sleeper = 2
-        num_rows_seater = random.randint(8, 15)
+        num_rows_seater = self.rng.randint(8, 15)
         num_columns_seater = 4
         capacity = (num_rows_sleeper * num_columns_sleeper) + (num_rows_seater * num_columns_seater)
         
         # Pricing
-        base_price = random.randint(400, 1200)
-        sleeper_price = base_price * random.uniform(1.5, 2.0)
+        base_price = self.rng.randint(400, 1200)
+        sleeper_price = base_price * self.rng.uniform(1.5, 2.0)
         seater_price = base_price
         
         # Intermediate stops (0-2 stops)
-        num_stops = random.randint(0, 2)
+        num_stops = self.rng.randint(0, 2)
         intermediate_stops = []
         if num_stops > 0:
             available_stations = [s for s in BUS_STATIONS if s not in (source, destination)]
-            selected_stops = random.sample(available_stations, min(num_stops, len(available_stations)))
+            selected_stops = self.rng.sample(available_stations, min(num_stops, len(available_stations)))
             
             for i, stop in enumerate(selected_stops):
                 stop_time = departure + timedelta(hours=(i + 1) * (travel_hours / (num_stops + 1)))
@@ -195,7 +256,7 @@ class BusServiceGenerator:
                     "city": source["city"],
                     "state": source["state"],
                     "BusStations": self.format_bus_stations(
-                        source["points"][:random.randint(3, 5)],
+                        source["points"][:self.rng.randint(3, 5)],
                         departure
                     )
                 },
@@ -205,11 +266,11 @@ class BusServiceGenerator:
                     "city": destination["city"],
                     "state": destination["state"],
                     "BusStations": self.format_bus_stations(
-                        destination["points"][:random.randint(3, 5)],
+                        destination["points"][:self.rng.randint(3, 5)],
                         arrival
                     )
                 },
-                "distance_km": random.randint(100, 1500),
+                "distance_km": self.rng.randint(100, 1500),
                 "estimated_duration": calculate_duration(departure, arrival),
                 "stops": self.format_stops(intermediate_stops, arrival, base_price),
                 "source_pickup_points": {},
@@ -220,8 +281,8 @@ class BusServiceGenerator:
             "departure_time": format_iso_timestamp(departure),
             "arrival_time": format_iso_timestamp(arrival),
             "status": "Scheduled",
-            "bus_number": str(random.randint(1000, 9999)),
-            "bus_travels_name": random.choice([
+            "bus_number": str(self.rng.randint(1000, 9999)),
+            "bus_travels_name": self.rng.choice([
                 "RedBus Travels", "BlueLine Coaches", "ExpressWay Buses",
                 "CityLink Travels", "Royal Cruiser", "VRL Travels"
             ]),
@@ -232,113 +293,74 @@ class BusServiceGenerator:
             "base_price": f"{base_price:.2f}",
             "sleeper_price": f"{sleeper_price:.2f}",
             "non_sleeper_price": f"{seater_price:.2f}",
-            "dynamic_pricing_enabled": random.choice([True, False]),
-            "dynamic_factor": round(random.uniform(1.0, 1.5), 2)
+            "dynamic_pricing_enabled": self.rng.choice([True, False]),
+            "dynamic_factor": round(self.rng.uniform(1.0, 1.5), 2)
         }
         
         return payload
-    
-    def create_service(self, payload: Dict[str, Any]) -> bool:
-        """Post service to backend."""
-        try:
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Token {self.token}"
-                },
-                json=payload
-            )
-            
-            if response.ok:
-                print(f"✅ Bus service created: {payload['route']['source']['city']} → "
-                      f"{payload['route']['destination']['city']} ({payload['bus_number']})")
-                return True
-            else:
-                print(f"❌ Failed to create bus service: {response.status_code}")
-                print(f"   Response: {response.text[:200]}")
-                return False
-        except Exception as e:
-            print(f"❌ Error creating bus service: {str(e)}")
-            return False
-    
-    def seed(self, num_services: int, start_date: datetime):
-        """Generate and create multiple services."""
-        print(f"\n{'='*60}")
-        print(f"🚌 Creating {num_services} Bus Services")
-        print(f"{'='*60}\n")
-        
-        success_count = 0
-        for i in range(num_services):
-            date = start_date + timedelta(days=random.randint(0, 30))
-            payload = self.generate_service(date)
-            if self.create_service(payload):
-                success_count += 1
-        
-        print(f"\n✨ Successfully created {success_count}/{num_services} bus services\n")
-
 
 
 # ==========================
 # Flight Service Generator
 # ==========================
 
-class FlightServiceGenerator:
-    def __init__(self, api_url: str, token: str):
-        self.api_url = f"{api_url}/services/flight-services/"
-        self.token = token
-    
+class FlightServiceGenerator(ServiceGenerator):
+    service_type = "flight"
+    endpoint = "/services/flight-services/"
+    number_field = "flight_number"
+    days_spread = 60
+
     def random_vehicle(self, capacity: int) -> Dict[str, Any]:
         """Generate random aircraft details."""
         models = ["Airbus A320", "Boeing 737", "Airbus A321neo", "Boeing 787", "ATR 72"]
         reg_prefixes = ['VT-ALQ', 'VT-BXN', 'VT-CKD', 'VT-DLZ', 'VT-EPH']
         
         return {
-            "registration_no": random.choice(reg_prefixes),
-            "model": random.choice(models),
+            "registration_no": self.rng.choice(reg_prefixes),
+            "model": self.rng.choice(models),
             "capacity": capacity,
-            "amenities": build_amenities_object(random_amenities(5, 9)),
+            "amenities": build_amenities_object(random_amenities(self.rng, 5, 9)),
             "status": "Active"
         }
     
     def random_policy(self) -> Dict[str, Any]:
         """Generate random flight policy."""
-        baggage = str(random.choice([15, 20, 25, 30]))
-        luggage = str(random.choice([7, 10, 15]))
+        baggage = str(self.rng.choice([15, 20, 25, 30]))
+        luggage = str(self.rng.choice([7, 10, 15]))
         terms = "Standard airline cancellation policy applies. Check-in closes 45 minutes before departure."
         
         return {
-            "cancellation_window": random.choice([24, 48, 72]),
-            "cancellation_fee": f"{random.randint(1000, 2500)}.00",
+            "cancellation_window": self.rng.choice([24, 48, 72]),
+            "cancellation_fee": f"{self.rng.randint(1000, 2500)}.00",
             "reschedule_allowed": True,
-            "reschedule_fee": f"{random.randint(800, 1500)}.00",
-            "no_show_penalty": f"{random.randint(2000, 4000)}.00",
+            "reschedule_fee": f"{self.rng.randint(800, 1500)}.00",
+            "no_show_penalty": f"{self.rng.randint(2000, 4000)}.00",
             "terms_conditions": build_terms_conditions(baggage, luggage, terms),
-            "no_cancellation_fee_markup": f"{random.randint(0, 500)}.00",
-            "no_reschedule_fee_markup": f"{random.randint(0, 300)}.00"
+            "no_cancellation_fee_markup": f"{self.rng.randint(0, 500)}.00",
+            "no_reschedule_fee_markup": f"{self.rng.randint(0, 300)}.00"
         }
     
     def generate_service(self, start_date: datetime) -> Dict[str, Any]:
         """Generate a complete flight service payload."""
-        source, destination = random_city_pair(FLIGHT_STATIONS)
+        source, destination = random_city_pair(self.rng, FLIGHT_STATIONS)
         
         # Random departure and arrival times
         departure = start_date.replace(
-            hour=random.randint(5, 22),
-            minute=random.choice([0, 15, 30, 45]),
+            hour=self.rng.randint(5, 22),
+            minute=self.rng.choice([0, 15, 30, 45]),
             second=0,
             microsecond=0
         )
-        travel_hours = random.randint(1, 4)
-        travel_minutes = random.choice([0, 15, 30, 45])
+        travel_hours = self.rng.randint(1, 4)
+        travel_minutes = self.rng.choice([0, 15, 30, 45])
         arrival = departure + timedelta(hours=travel_hours, minutes=travel_minutes)
         
         # Seat configuration
-        num_rows_business = random.randint(3, 6)
+        num_rows_business = self.rng.randint(3, 6)
         num_columns_business = 4
-        num_rows_premium = random.randint(5, 10)
+        num_rows_premium = self.rng.randint(5, 10)
         num_columns_premium = 6
-        num_rows_economy = random.randint(15, 25)
+        num_rows_economy = self.rng.randint(15, 25)
         num_columns_economy = 6
         
         capacity = (num_rows_business * num_columns_business + 
@@ -346,9 +368,9 @@ class FlightServiceGenerator:
                    num_rows_economy * num_columns_economy)
         
         # Pricing
-        base_economy = random.randint(3000, 8000)
-        premium_price = base_economy * random.uniform(1.6, 2.0)
-        business_price = base_economy * random.uniform(2.5, 3.5)
+        base_economy = self.rng.randint(3000, 8000)
+        premium_price = base_economy * self.rng.uniform(1.6, 2.0)
+        business_price = base_economy * self.rng.uniform(2.5, 3.5)
         
         # Build payload matching frontend structure
         payload = {
@@ -367,7 +389,7 @@ class FlightServiceGenerator:
                     "state": destination["state"],
                     "BusStations": {}
                 },
-                "distance_km": random.randint(300, 2500),
+                "distance_km": self.rng.randint(300, 2500),
                 "estimated_duration": calculate_duration(departure, arrival),
                 "stops": [],
                 "source_pickup_points": {},
@@ -375,11 +397,11 @@ class FlightServiceGenerator:
             },
             "vehicle": self.random_vehicle(capacity),
             "policy": self.random_policy(),
-            "flight_number": f"{random.choice(['AI', '6E', 'UK', 'SG', 'QP'])}{random.randint(100, 999)}",
-            "airline_name": random.choice([
+            "flight_number": f"{self.rng.choice(['AI', '6E', 'UK', 'SG', 'QP'])}{self.rng.randint(100, 999)}",
+            "airline_name": self.rng.choice([
                 "Air India", "IndiGo", "Vistara", "SpiceJet", "Akasa Air", "Go First"
             ]),
-            "aircraft_model": random.choice(["Airbus A320", "Boeing 737", "A321neo", "Boeing 787"]),
+            "aircraft_model": self.rng.choice(["Airbus A320", "Boeing 737", "A321neo", "Boeing 787"]),
             "num_rows_business": num_rows_business,
             "num_columns_business": num_columns_business,
             "num_rows_premium": num_rows_premium,
@@ -390,92 +412,53 @@ class FlightServiceGenerator:
             "business_price": f"{business_price:.2f}",
             "premium_price": f"{premium_price:.2f}",
             "economy_price": f"{base_economy:.2f}",
-            "dynamic_pricing_enabled": random.choice([True, False]),
-            "dynamic_factor": round(random.uniform(1.0, 1.8), 2),
+            "dynamic_pricing_enabled": self.rng.choice([True, False]),
+            "dynamic_factor": round(self.rng.uniform(1.0, 1.8), 2),
             "departure_time": format_iso_timestamp(departure),
             "arrival_time": format_iso_timestamp(arrival),
             "status": "Scheduled"
         }
         
         return payload
-    
-    def create_service(self, payload: Dict[str, Any]) -> bool:
-        """Post service to backend."""
-        try:
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Token {self.token}"
-                },
-                json=payload
-            )
-            
-            if response.ok:
-                print(f"✅ Flight service created: {payload['route']['source']['city']} → "
-                      f"{payload['route']['destination']['city']} ({payload['flight_number']})")
-                return True
-            else:
-                print(f"❌ Failed to create flight service: {response.status_code}")
-                print(f"   Response: {response.text[:200]}")
-                return False
-        except Exception as e:
-            print(f"❌ Error creating flight service: {str(e)}")
-            return False
-    
-    def seed(self, num_services: int, start_date: datetime):
-        """Generate and create multiple services."""
-        print(f"\n{'='*60}")
-        print(f"✈️  Creating {num_services} Flight Services")
-        print(f"{'='*60}\n")
-        
-        success_count = 0
-        for i in range(num_services):
-            date = start_date + timedelta(days=random.randint(0, 60))
-            payload = self.generate_service(date)
-            if self.create_service(payload):
-                success_count += 1
-        
-        print(f"\n✨ Successfully created {success_count}/{num_services} flight services\n")
-
 
 
 # ==========================
 # Train Service Generator
 # ==========================
 
-class TrainServiceGenerator:
-    def __init__(self, api_url: str, token: str):
-        self.api_url = f"{api_url}/services/train-services/"
-        self.token = token
-    
+class TrainServiceGenerator(ServiceGenerator):
+    service_type = "train"
+    endpoint = "/services/train-services/"
+    number_field = "train_number"
+    days_spread = 45
+
     def random_vehicle(self, capacity: int) -> Dict[str, Any]:
         """Generate random locomotive details."""
         models = ["WAP-7", "WAG-9", "WDP-4D", "WAP-4", "WAP-5"]
         
         return {
-            "registration_no": f"{random.choice(models)} {random.randint(30000, 39999)}",
-            "model": random.choice(models),
+            "registration_no": f"{self.rng.choice(models)} {self.rng.randint(30000, 39999)}",
+            "model": self.rng.choice(models),
             "capacity": capacity,
-            "amenities": build_amenities_object(random_amenities(4, 8)),
+            "amenities": build_amenities_object(random_amenities(self.rng, 4, 8)),
             "status": "Active"
         }
     
     def random_policy(self) -> Dict[str, Any]:
         """Generate random train policy."""
-        baggage = str(random.choice([40, 50, 60]))
-        luggage = str(random.choice([20, 25, 30]))
+        baggage = str(self.rng.choice([40, 50, 60]))
+        luggage = str(self.rng.choice([20, 25, 30]))
         terms = "Indian Railways cancellation policy applies. Refund as per railway rules."
         
         return {
-            "cancellation_window": random.choice([4, 6, 12]),
-            "cancellation_fee": f"{random.randint(80, 200)}.00",
+            "cancellation_window": self.rng.choice([4, 6, 12]),
+            "cancellation_fee": f"{self.rng.randint(80, 200)}.00",
             "reschedule_allowed": True,
-            "reschedule_fee": f"{random.randint(50, 150)}.00",
-            "no_show_penalty": f"{random.randint(300, 600)}.00",
+            "reschedule_fee": f"{self.rng.randint(50, 150)}.00",
+            "no_show_penalty": f"{self.rng.randint(300, 600)}.00",
             "terms_conditions": build_terms_conditions(baggage, luggage, terms),
-            "no_cancellation_fee_markup": f"{random.randint(0, 100)}.00",
-            "no_reschedule_fee_markup": f"{random.randint(0, 80)}.00"
+            "no_cancellation_fee_markup": f"{self.rng.randint(0, 100)}.00",
+            "no_reschedule_fee_markup": f"{self.rng.randint(0, 80)}.00"
         }
     
     def random_bogies_config(self) -> tuple:
@@ -484,29 +467,29 @@ class TrainServiceGenerator:
         total_capacity = 0
         
         # Sleeper class
-        if random.choice([True, True, False]):
-            count = random.randint(5, 12)
+        if self.rng.choice([True, True, False]):
+            count = self.rng.randint(5, 12)
             seats_per = 72
             config['sleeper'] = {'count': count, 'seats_per_bogie': seats_per}
             total_capacity += count * seats_per
         
         # Third AC
-        if random.choice([True, False]):
-            count = random.randint(2, 6)
+        if self.rng.choice([True, False]):
+            count = self.rng.randint(2, 6)
             seats_per = 64
             config['third_ac'] = {'count': count, 'seats_per_bogie': seats_per}
             total_capacity += count * seats_per
         
         # Second AC
-        if random.choice([True, False, False]):
-            count = random.randint(1, 4)
+        if self.rng.choice([True, False, False]):
+            count = self.rng.randint(1, 4)
             seats_per = 48
             config['second_ac'] = {'count': count, 'seats_per_bogie': seats_per}
             total_capacity += count * seats_per
         
         # Ensure at least one bogie type
         if not config:
-            count = random.randint(8, 12)
+            count = self.rng.randint(8, 12)
             config['sleeper'] = {'count': count, 'seats_per_bogie': 72}
             total_capacity = count * 72
         
@@ -514,24 +497,24 @@ class TrainServiceGenerator:
     
     def generate_service(self, start_date: datetime) -> Dict[str, Any]:
         """Generate a complete train service payload with 2-6 intermediate stops."""
-        source, destination = random_city_pair(TRAIN_STATIONS)
+        source, destination = random_city_pair(self.rng, TRAIN_STATIONS)
 
         # Random departure and arrival times
         departure = start_date.replace(
-            hour=random.randint(0, 23),
-            minute=random.choice([0, 15, 30, 45]),
+            hour=self.rng.randint(0, 23),
+            minute=self.rng.choice([0, 15, 30, 45]),
             second=0,
             microsecond=0
         )
-        travel_hours = random.randint(6, 48)
-        travel_minutes = random.choice([0, 15, 30, 45])
+        travel_hours = self.rng.randint(6, 48)
+        travel_minutes = self.rng.choice([0, 15, 30, 45])
         arrival = departure + timedelta(hours=travel_hours, minutes=travel_minutes)
 
         # Bogie configuration and capacity
         bogies_config, capacity = self.random_bogies_config()
 
         # Pricing based on available classes
-        base_price = random.randint(300, 1500)
+        base_price = self.rng.randint(300, 1500)
         prices = {}
 
         if 'sleeper' in bogies_config:
@@ -545,9 +528,9 @@ class TrainServiceGenerator:
         base_price_value = base_price
 
         # Generate 2-6 intermediate stops (distinct from source and destination)
-        num_stops = random.randint(2, 6)
+        num_stops = self.rng.randint(2, 6)
         available_stations = [s for s in TRAIN_STATIONS if s not in (source, destination)]
-        selected_stops = random.sample(available_stations, min(num_stops, len(available_stations)))
+        selected_stops = self.rng.sample(available_stations, min(num_stops, len(available_stations)))
 
         # Distribute stop times evenly between departure and arrival (further stops are closer to destination)
         total_trip_seconds = (arrival - departure).total_seconds()
@@ -596,7 +579,7 @@ class TrainServiceGenerator:
                     "state": destination["state"],
                     "BusStations": {}
                 },
-                "distance_km": random.randint(200, 3500),
+                "distance_km": self.rng.randint(200, 3500),
                 "estimated_duration": calculate_duration(departure, arrival),
                 "stops": stops,
                 "source_pickup_points": {},
@@ -604,94 +587,199 @@ class TrainServiceGenerator:
             },
             "vehicle": self.random_vehicle(capacity),
             "policy": self.random_policy(),
-            "train_name": random.choice([
+            "train_name": self.rng.choice([
                 "Rajdhani Express", "Shatabdi Express", "Duronto Express",
                 "Garib Rath", "Sampark Kranti", "Humsafar Express",
                 "Jan Shatabdi", "Tejas Express", "Vande Bharat"
             ]),
-            "train_number": str(random.randint(10000, 99999)),
+            "train_number": str(self.rng.randint(10000, 99999)),
             "bogies_config": bogies_config,
             "base_price": f"{base_price_value:.2f}",
             **prices,
-            "dynamic_pricing_enabled": random.choice([True, False]),
-            "dynamic_factor": round(random.uniform(1.0, 1.4), 2),
+            "dynamic_pricing_enabled": self.rng.choice([True, False]),
+            "dynamic_factor": round(self.rng.uniform(1.0, 1.4), 2),
             "departure_time": format_iso_timestamp(departure),
             "arrival_time": format_iso_timestamp(arrival),
             "status": "Scheduled"
         }
 
         return payload
-    
-    def create_service(self, payload: Dict[str, Any]) -> bool:
-        """Post service to backend."""
+
+
+# ==========================
+# Seeders
+# ==========================
+
+@dataclass
+class SeedStats:
+    service_type: str
+    requested: int
+    created: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.service_type}: {self.created}/{self.requested} created, {self.failed} failed "
+                f"in {self.elapsed:.1f}s ({self.rate:,.1f} services/sec)")
+
+
+class HttpSeeder:
+    """
+    POSTs payloads to the create endpoints from ``concurrency`` worker threads.
+    Each worker keeps one ``requests.Session`` so connections are reused.
+    """
+
+    def __init__(self, base_url: str, token: str, concurrency: int = 8, timeout: float = 60, verbose: bool = False):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.verbose = verbose
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                "Content-Type": "application/json",
+                "Authorization": f"Token {self.token}",
+            })
+            # Retry only failed connects; a retried POST could create a duplicate
+            retry = Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.2)
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry))
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry))
+            self._local.session = session
+        return session
+
+    def _post(self, url: str, payload: Dict[str, Any]) -> Optional[str]:
+        """Return None on success, otherwise an error message."""
         try:
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Token {self.token}"
-                },
-                json=payload
-            )
-            
-            if response.ok:
-                print(f"✅ Train service created: {payload['route']['source']['city']} → "
-                      f"{payload['route']['destination']['city']} ({payload['train_number']})")
-                return True
-            else:
-                print(f"❌ Failed to create train service: {response.status_code}")
-                print(f"   Response: {response.text[:200]}")
-                return False
-        except Exception as e:
-            print(f"❌ Error creating train service: {str(e)}")
-            return False
-    
-    def seed(self, num_services: int, start_date: datetime):
-        """Generate and create multiple services."""
-        print(f"\n{'='*60}")
-        print(f"🚂 Creating {num_services} Train Services")
-        print(f"{'='*60}\n")
-        
-        success_count = 0
-        for i in range(num_services):
-            date = start_date + timedelta(days=random.randint(0, 45))
-            payload = self.generate_service(date)
-            if self.create_service(payload):
-                success_count += 1
-        
-        print(f"\n✨ Successfully created {success_count}/{num_services} train services\n")
+            response = self._session().post(url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            return f"{type(e).__name__}: {e}"
+        if response.ok:
+            return None
+        return f"{response.status_code}: {response.text[:200]}"
+
+    def run(self, generator: ServiceGenerator, num_services: int, start_date: datetime) -> SeedStats:
+        stats = SeedStats(generator.service_type, num_services)
+        payloads = generator.payloads(num_services, start_date)
+        url = f"{self.base_url}{generator.endpoint}"
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._post, url, payload): payload for payload in payloads}
+            for future in as_completed(futures):
+                error = future.result()
+                label = generator.describe(futures[future])
+                if error is None:
+                    stats.created += 1
+                    if self.verbose:
+                        print(f"✅ {generator.service_type} service created: {label}")
+                else:
+                    stats.failed += 1
+                    stats.errors.append(error)
+                    print(f"❌ Failed to create {generator.service_type} service {label}: {error}")
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+
+class OrmSeeder:
+    """Writes payloads straight to the database through ``services.ingest.ServiceIngestor``."""
+
+    def __init__(self, provider: str, batch_size: int = 500):
+        sys.path.insert(0, str(DATA_DIR))
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+        import django
+        django.setup()
+
+        from django.contrib.auth import get_user_model
+        from django.db.models import Q
+
+        User = get_user_model()
+        self.provider = User.objects.filter(Q(username=provider) | Q(email=provider)).first()
+        if self.provider is None:
+            raise SystemExit(f"No user matches '{provider}'.")
+        self.batch_size = batch_size
+
+    def run(self, generator: ServiceGenerator, num_services: int, start_date: datetime) -> SeedStats:
+        from services.ingest import ServiceIngestor
+
+        stats = SeedStats(generator.service_type, num_services)
+        rows = [{"service_type": generator.service_type, **payload}
+                for payload in generator.payloads(num_services, start_date)]
+        result = ServiceIngestor(self.provider, batch_size=self.batch_size).ingest(rows)
+        stats.created, stats.failed, stats.elapsed = result.created, result.failed, result.elapsed
+        for line_no, message in result.errors:
+            stats.errors.append(message)
+            print(f"❌ Failed to create {generator.service_type} service #{line_no}: {message[:200]}")
+        return stats
 
 
 # ==========================
 # Main Script
 # ==========================
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed bus, flight and train services.")
+    parser.add_argument("--buses", type=int, default=10)
+    parser.add_argument("--flights", type=int, default=10)
+    parser.add_argument("--trains", type=int, default=10)
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=datetime(2025, 11, 23))
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="RNG seed; same seed, same dataset.")
+    parser.add_argument("--concurrency", type=int, default=8, help="HTTP worker threads.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--token", default=AUTH_TOKEN)
+    parser.add_argument("--orm", action="store_true", help="Write through the ORM instead of the HTTP API.")
+    parser.add_argument("--provider", help="Username or email owning the services (--orm only).")
+    parser.add_argument("--batch-size", type=int, default=500, help="Services per bulk write (--orm only).")
+    parser.add_argument("--verbose", action="store_true", help="Print every created service.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main seeder script."""
+    args = parse_args(argv)
     print("\n" + "="*60)
     print("🌟 NEXA SERVICE SEEDER")
     print("="*60)
-    
-    # Configuration
-    start_date = datetime(2025, 11, 23)
-    num_buses = 10
-    num_flights = 10
-    num_trains = 10
-    
-    # Initialize generators
-    bus_gen = BusServiceGenerator(BASE_URL, AUTH_TOKEN)
-    flight_gen = FlightServiceGenerator(BASE_URL, AUTH_TOKEN)
-    train_gen = TrainServiceGenerator(BASE_URL, AUTH_TOKEN)
-    
-    # Run seeders
-    bus_gen.seed(num_buses, start_date)
-    flight_gen.seed(num_flights, start_date)
-    train_gen.seed(num_trains, start_date)
-    
+
+    if args.orm:
+        if not args.provider:
+            raise SystemExit("--provider is required with --orm")
+        seeder = OrmSeeder(args.provider, batch_size=args.batch_size)
+    else:
+        seeder = HttpSeeder(args.base_url, args.token, concurrency=args.concurrency, verbose=args.verbose)
+
+    plan = [
+        (BusServiceGenerator(args.seed), args.buses),
+        (FlightServiceGenerator(args.seed), args.flights),
+        (TrainServiceGenerator(args.seed), args.trains),
+    ]
+    all_stats = []
+    for generator, count in plan:
+        if count <= 0:
+            continue
+        print(f"\nCreating {count} {generator.service_type} services...")
+        stats = seeder.run(generator, count, args.start_date)
+        print(f"✨ {stats.summary()}")
+        all_stats.append(stats)
+
+    created = sum(s.created for s in all_stats)
+    failed = sum(s.failed for s in all_stats)
+    elapsed = sum(s.elapsed for s in all_stats)
     print("\n" + "="*60)
-    print("✨ SEEDING COMPLETE!")
+    print(f"✨ SEEDING COMPLETE! {created} created, {failed} failed, "
+          f"{created / elapsed if elapsed else 0:,.1f} services/sec overall")
     print("="*60 + "\n")
+    return all_stats
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'services'
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from .fare_history import flush_if_due
+        # Fare points recorded in a quiet web process are written on its next request
+        request_finished.connect(flush_if_due, dispatch_uid='services.flush_fare_history')
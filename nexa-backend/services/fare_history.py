@@ -0,0 +1,227 @@
+"""
+Fare history store.
+
+Every repricing (``apply_dynamic_pricing``) and every booking (the seat
+prices of a bus or flight booking, ``get_price_for_journey(..., record=True)``
+for trains) records a point here; search and other quotes do not. Points are
+buffered in process and written in batches so the booking path only pays
+for a list append. A point joins the buffer once the surrounding transaction
+commits, so a rolled-back booking or ingest batch leaves none behind. The
+buffer is flushed once it reaches ``FARE_HISTORY_BATCH_SIZE`` points or
+``FARE_HISTORY_FLUSH_SECONDS`` seconds. Points left in a quiet process are
+written at the end of its next request (``flush_if_due``), by the periodic
+``flush_fare_history_points`` task in workers, and when a worker process
+shuts down. A flush that fails is logged and its points go back into the
+buffer for the next one.
+
+On disk there is one ``FareHistoryChunk`` per (service, class, day), holding
+the first point in full and the rest as ``[seconds, paise]`` deltas.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import FareHistoryChunk
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_buffer = []
+_last_flush = time.monotonic()
+
+
+def _batch_size():
+    return getattr(settings, "FARE_HISTORY_BATCH_SIZE", 200)
+
+
+def _flush_seconds():
+    return getattr(settings, "FARE_HISTORY_FLUSH_SECONDS", 30)
+
+
+def _to_paise(price):
+    return int((Decimal(str(price)) * 100).quantize(Decimal("1")))
+
+
+def _from_paise(paise):
+    return (Decimal(paise) / 100).quantize(Decimal("0.01"))
+
+
+def record_fare(service, class_type, price, at=None):
+    """
+    Queue one fare point for ``service`` / ``class_type``.
+
+    Cheap enough to call from the booking path: the point is buffered once
+    the caller's transaction commits, and nothing touches the database until
+    the buffer is due for a flush.
+    """
+    if price is None or not getattr(settings, "FARE_HISTORY_ENABLED", True):
+        return
+
+    content_type = ContentType.objects.get_for_model(service, for_concrete_model=False)
+    point = (content_type.id, service.pk, class_type, at or timezone.now(), _to_paise(price))
+    # Runs straight away outside a transaction; dropped if it rolls back
+    transaction.on_commit(partial(_buffer_point, point))
+
+
+def _buffer_point(point):
+    with _lock:
+        _buffer.append(point)
+        due = len(_buffer) >= _batch_size() or time.monotonic() - _last_flush >= _flush_seconds()
+    if due:
+        flush_fare_history()
+
+
+def pending_fare_count():
+    with _lock:
+        return len(_buffer)
+
+
+def flush_if_due(**kwargs):
+    """Flush buffered points older than the flush interval; hooked to ``request_finished``."""
+    with _lock:
+        due = bool(_buffer) and time.monotonic() - _last_flush >= _flush_seconds()
+    if due:
+        flush_fare_history()
+
+
+def flush_fare_history():
+    """
+    Write all buffered points, appending to existing day chunks.
+
+    Returns the number of points written. Errors are logged, not raised:
+    the points are put back and the next flush retries them.
+    """
+    global _last_flush
+    with _lock:
+        points = list(_buffer)
+        _buffer.clear()
+        _last_flush = time.monotonic()
+
+    if not points:
+        return 0
+
+    try:
+        _write_points(points)
+    except Exception:
+        logger.exception("Could not write %d fare history points; keeping them for the next flush", len(points))
+        with _lock:
+            _buffer[:0] = points
+        return 0
+    return len(points)
+
+
+def _locked_chunks(keys):
+    """Existing chunks for (content type, object, class, day) ``keys``, locked, by key."""
+    lookup = Q()
+    for ct_id, object_id, class_type, day in keys:
+        lookup |= Q(content_type_id=ct_id, object_id=object_id, class_type=class_type, day=day)
+    return {
+        (c.content_type_id, c.object_id, c.class_type, c.day): c
+        for c in FareHistoryChunk.objects.select_for_update().filter(lookup)
+    }
+
+
+def _write_points(points):
+    grouped = defaultdict(list)
+    for ct_id, object_id, class_type, at, paise in points:
+        day = timezone.localdate(at)
+        grouped[(ct_id, object_id, class_type, day)].append((at, paise))
+    for day_points in grouped.values():
+        day_points.sort(key=lambda p: p[0])
+
+    with transaction.atomic():
+        chunks = _locked_chunks(grouped)
+
+        # New days start a chunk with their first point. Another process may
+        # create the same chunk meanwhile: its insert wins, and all of our
+        # points for that day are appended to its chunk instead.
+        new = {}
+        for key in grouped.keys() - chunks.keys():
+            first_at, first_paise = grouped[key][0]
+            new[key] = FareHistoryChunk(
+                content_type_id=key[0],
+                object_id=key[1],
+                class_type=key[2],
+                day=key[3],
+                start_time=first_at,
+                start_price=_from_paise(first_paise),
+                last_time=first_at,
+                last_price=_from_paise(first_paise),
+                points=[],
+                point_count=1,
+            )
+        if new:
+            FareHistoryChunk.objects.bulk_create(new.values(), ignore_conflicts=True)
+            created = set(FareHistoryChunk.objects.filter(
+                chunk_id__in=[c.chunk_id for c in new.values()]
+            ).values_list('chunk_id', flat=True))
+            raced = [key for key, chunk in new.items() if chunk.chunk_id not in created]
+            if raced:
+                chunks.update(_locked_chunks(raced))
+
+        for key, day_points in grouped.items():
+            chunk = chunks.get(key)
+            if chunk is None:
+                chunk = chunks[key] = new[key]
+                day_points = day_points[1:]
+            last_at, last_paise = chunk.last_time, _to_paise(chunk.last_price)
+            for at, paise in day_points:
+                seconds = round((at - last_at).total_seconds())
+                chunk.points.append([seconds, paise - last_paise])
+                last_at += timedelta(seconds=seconds)
+                last_paise = paise
+            chunk.last_time = last_at
+            chunk.last_price = _from_paise(last_paise)
+            chunk.point_count = len(chunk.points) + 1
+
+        FareHistoryChunk.objects.bulk_update(
+            chunks.values(), ['points', 'last_time', 'last_price', 'point_count']
+        )
+
+
+def decode_chunk(chunk):
+    """Expand a chunk back into a list of ``(datetime, Decimal)`` points."""
+    at = chunk.start_time
+    paise = _to_paise(chunk.start_price)
+    decoded = [(at, _from_paise(paise))]
+    for seconds, paise_delta in chunk.points:
+        at += timedelta(seconds=seconds)
+        paise += paise_delta
+        decoded.append((at, _from_paise(paise)))
+    return decoded
+
+
+def get_fare_series(service, class_type, start=None, end=None):
+    """
+    Fare points for one (service, class) between ``start`` and ``end``
+    (inclusive datetimes; either may be None), oldest first.
+    """
+    content_type = ContentType.objects.get_for_model(service, for_concrete_model=False)
+    chunks = FareHistoryChunk.objects.filter(
+        content_type=content_type, object_id=service.pk, class_type=class_type
+    )
+    # Whole days are skipped in SQL, the edges are trimmed after decoding
+    if start is not None:
+        chunks = chunks.filter(last_time__gte=start)
+    if end is not None:
+        chunks = chunks.filter(start_time__lte=end)
+
+    series = []
+    for chunk in chunks.order_by('day'):
+        for at, price in decode_chunk(chunk):
+            if start is not None and at < start:
+                continue
+            if end is not None and at > end:
+                continue
+            series.append((at, price))
+    return series
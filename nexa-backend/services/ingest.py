@@ -0,0 +1,191 @@
+"""
+Bulk service ingestion.
+
+Takes the same payloads the create endpoints accept (one JSON object per line,
+plus ``"service_type": "bus" | "train" | "flight"``) and writes them in
+batches: every station and route in a batch is resolved with a handful of
+queries (see ``services.routing``), and services and train segments go in as multi-row inserts
+(``COPY`` on PostgreSQL for the segment table). Seats are not written at
+all: services point at a shared ``SeatLayout`` (see ``services.seating``).
+"""
+import json
+import logging
+import time
+from collections import namedtuple
+
+from django.db import connection, transaction
+
+from .models import Route, Vehicle, Policy, BusService, TrainService, TrainServiceSegment, FlightService
+from .routing import resolve_stations, resolve_routes, route_station_data
+from .seating import assign_layout
+from .serializers import BusServiceCreateSerializer, TrainServiceCreateSerializer, FlightServiceCreateSerializer
+
+CREATE_SERIALIZERS = {
+    'bus': BusServiceCreateSerializer,
+    'train': TrainServiceCreateSerializer,
+    'flight': FlightServiceCreateSerializer,
+}
+SERVICE_MODELS = {'bus': BusService, 'train': TrainService, 'flight': FlightService}
+
+# Train segments are the bulk of the rows; use COPY for them once a batch is this big
+COPY_THRESHOLD = 1000
+
+logger = logging.getLogger(__name__)
+
+IngestResult = namedtuple('IngestResult', 'created failed errors elapsed failed_batches', defaults=((),))
+# A batch whose write raised; its rows are counted as failed and not retried
+FailedBatch = namedtuple('FailedBatch', 'batch first_line last_line rows error')
+
+
+def copy_insert(model, objs, batch_size=5000):
+    """
+    Insert ``objs`` with PostgreSQL ``COPY`` when the driver supports it,
+    otherwise fall back to ``bulk_create``.
+    """
+    if connection.vendor != 'postgresql' or len(objs) < COPY_THRESHOLD:
+        model.objects.bulk_create(objs, batch_size=batch_size)
+        return
+
+    fields = model._meta.concrete_fields
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if not hasattr(raw, 'copy'):  # psycopg2
+            model.objects.bulk_create(objs, batch_size=batch_size)
+            return
+        with raw.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+            for obj in objs:
+                copy.write_row([f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields])
+
+
+def build_train_segments(service, stations, layout):
+    """Same counts as ``TrainService.create_service_segments``, without the queries."""
+    counts = {key: layout.class_counts.get(key, 0) for key in ('sleeper', 'second_ac', 'third_ac')}
+    return [
+        TrainServiceSegment(
+            train_service=service,
+            from_station=stations[i],
+            to_station=stations[i + 1],
+            segment_index=i,
+            available_count_sleeper=counts['sleeper'],
+            available_count_second_ac=counts['second_ac'],
+            available_count_third_ac=counts['third_ac'],
+        )
+        for i in range(len(stations) - 1)
+    ]
+
+
+class ServiceIngestor:
+    """
+    Usage::
+
+        result = ServiceIngestor(provider).ingest(rows)
+
+    ``rows`` is any iterable of dicts (or JSON strings). Invalid rows are
+    reported in ``result.errors`` as ``(line_no, message)`` and skipped. A
+    batch that fails to write is rolled back on its own and reported in
+    ``result.failed_batches``; the other batches still go in.
+    """
+
+    def __init__(self, provider, batch_size=500, progress=None):
+        self.provider = provider
+        self.batch_size = batch_size
+        self.progress = progress
+
+    def ingest(self, rows):
+        started = time.perf_counter()
+        created, errors, failed_batches = 0, [], []
+        batch, lines, batch_no = [], [], 0
+
+        def failed():
+            return len(errors) + sum(b.rows for b in failed_batches)
+
+        def flush():
+            nonlocal created, batch_no
+            batch_no += 1
+            try:
+                created += self._write_batch(batch)
+            except Exception as exc:
+                logger.exception("Ingest batch %d (lines %d-%d) failed", batch_no, lines[0], lines[-1])
+                failed_batches.append(FailedBatch(batch_no, lines[0], lines[-1], len(batch), str(exc)))
+            self._report(created, failed(), started)
+
+        for line_no, row in enumerate(rows, start=1):
+            if isinstance(row, (str, bytes)) and not row.strip():
+                continue
+            try:
+                batch.append(self._validate(row))
+            except ValueError as exc:
+                errors.append((line_no, str(exc)))
+                continue
+            lines.append(line_no)
+            if len(batch) >= self.batch_size:
+                flush()
+                batch, lines = [], []
+
+        if batch:
+            flush()
+
+        return IngestResult(created, failed(), errors, time.perf_counter() - started, failed_batches)
+
+    def _report(self, created, failed, started):
+        if self.progress:
+            self.progress(created, failed, time.perf_counter() - started)
+
+    def _validate(self, row):
+        if isinstance(row, (str, bytes)):
+            try:
+                row = json.loads(row)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"invalid JSON: {exc}")
+        row = dict(row)
+        service_type = row.pop('service_type', None)
+        if service_type not in CREATE_SERIALIZERS:
+            raise ValueError("service_type must be bus, train or flight")
+        serializer = CREATE_SERIALIZERS[service_type](data=row)
+        if not serializer.is_valid():
+            raise ValueError(json.dumps(serializer.errors))
+        return service_type, serializer.validated_data
+
+    # ---------- batch writers ----------
+
+    @transaction.atomic
+    def _write_batch(self, batch):
+        stations = resolve_stations(
+            station for _, data in batch for station in route_station_data(data['route'])
+        )
+        routes, route_stations = resolve_routes([data['route'] for _, data in batch], stations)
+
+        vehicles = Vehicle.objects.bulk_create([Vehicle(**data['vehicle']) for _, data in batch])
+        policies = Policy.objects.bulk_create([Policy(**data['policy']) for _, data in batch])
+
+        services = {'bus': [], 'train': [], 'flight': []}
+        for (service_type, data), route, vehicle, policy in zip(batch, routes, vehicles, policies):
+            fields = {k: v for k, v in data.items() if k not in ('route', 'vehicle', 'policy')}
+            service = SERVICE_MODELS[service_type](
+                provider_user_id=self.provider, route=route, vehicle=vehicle, policy=policy, **fields
+            )
+            services[service_type].append(service)
+
+        layouts = {}
+        segments = []
+        for service in services['bus']:
+            assign_layout(service, layouts)
+            service.apply_dynamic_pricing()
+        for service in services['flight']:
+            assign_layout(service, layouts)
+        for service in services['train']:
+            stops = route_stations[service.route.route_id]
+            layout = assign_layout(service, layouts)
+            segments.extend(build_train_segments(service, stops, layout))
+            # TrainService.update_duration, applied in bulk below
+            service.route.estimated_duration = service.arrival_time - service.departure_time
+
+        for service_type, objs in services.items():
+            SERVICE_MODELS[service_type].objects.bulk_create(objs)
+        copy_insert(TrainServiceSegment, segments)
+
+        train_routes = {s.route.route_id: s.route for s in services['train']}
+        Route.objects.bulk_update(list(train_routes.values()), ['estimated_duration'])
+        return len(batch)
@@ -0,0 +1,49 @@
+# services/management/commands/backtest_pricing.py
+import json
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from services.pricing_backtest import load_booking_arrays, replay, SERVICE_MODELS
+
+
+class Command(BaseCommand):
+    help = "Replay historical bookings against the dynamic pricing formulas for a range of dynamic_factor values."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factors', default='0,0.25,0.5,0.75,1,1.5,2',
+                            help="Comma separated dynamic_factor values to try.")
+        parser.add_argument('--mode', action='append', choices=sorted(SERVICE_MODELS),
+                            help="Limit to bus/train/flight (repeatable). Default: all.")
+        parser.add_argument('--days', type=int, default=None,
+                            help="Only use bookings from the last N days.")
+        parser.add_argument('--elasticity', type=float, default=0.0,
+                            help="Price elasticity of demand; 0 replays history as-is.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            factors = [float(f) for f in options['factors'].split(',') if f.strip()]
+        except ValueError:
+            raise CommandError("--factors must be a comma separated list of numbers.")
+        start = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+
+        t0 = time.perf_counter()
+        arrays = load_booking_arrays(options['mode'], start=start)
+        t1 = time.perf_counter()
+        results = replay(arrays, factors, elasticity=options['elasticity'])
+        t2 = time.perf_counter()
+
+        if options['json']:
+            self.stdout.write(json.dumps([r._asdict() for r in results], indent=2))
+            return
+
+        self.stdout.write(f"{len(arrays['pax'])} bookings ({int(np.sum(arrays['pax']))} passengers) "
+                          f"loaded in {t1 - t0:.2f}s, replayed in {t2 - t1:.2f}s")
+        self.stdout.write(f"{'factor':>8} {'revenue':>16} {'load':>8} {'passengers':>12} {'avg mult':>9}")
+        for r in results:
+            self.stdout.write(f"{r.factor:>8.2f} {r.revenue:>16,.2f} {r.load_factor:>8.2%} "
+                              f"{r.passengers:>12,.1f} {r.avg_multiplier:>9.4f}")
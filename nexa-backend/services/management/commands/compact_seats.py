@@ -0,0 +1,33 @@
+# services/management/commands/compact_seats.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services.models import BusService, TrainService, FlightService
+from services.seating import compact_service_seats
+
+SERVICE_MODELS = {'bus': BusService, 'train': TrainService, 'flight': FlightService}
+
+
+class Command(BaseCommand):
+    help = "Move existing services onto shared seat layouts and drop their unbooked seat rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=sorted(SERVICE_MODELS), action='append',
+                            help="Only compact this service type (repeatable). Default: all.")
+
+    def handle(self, *args, **options):
+        layouts = {}
+        for mode in options['mode'] or SERVICE_MODELS:
+            services, deleted, skipped = 0, 0, 0
+            pending = SERVICE_MODELS[mode].objects.filter(seat_layout__isnull=True)
+            for service in pending.iterator(chunk_size=500):
+                with transaction.atomic():
+                    removed = compact_service_seats(service, layouts)
+                if removed is None:
+                    skipped += 1
+                    continue
+                services += 1
+                deleted += removed
+            self.stdout.write(self.style.SUCCESS(
+                f"{mode}: {services} services moved to layouts, {deleted} seat rows removed, {skipped} skipped."
+            ))
@@ -0,0 +1,53 @@
+# services/management/commands/ingest_services.py
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from services.ingest import ServiceIngestor
+
+
+class Command(BaseCommand):
+    help = "Bulk-create bus/train/flight services from a JSONL file of create payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSONL file, one service per line ('-' for stdin).")
+        parser.add_argument('--provider', required=True,
+                            help="Username, email or user_id of the provider that owns the services.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        ident = options['provider']
+        lookup = Q(username=ident) | Q(email=ident)
+        if len(ident) == 36:
+            lookup |= Q(user_id=ident)
+        provider = User.objects.filter(lookup).first()
+        if provider is None:
+            raise CommandError(f"No user matches '{ident}'.")
+
+        def progress(created, failed, elapsed):
+            rate = created / elapsed if elapsed else 0
+            self.stdout.write(f"  {created} services created, {failed} failed ({rate:,.0f} services/s)")
+
+        ingestor = ServiceIngestor(provider, batch_size=options['batch_size'], progress=progress)
+        if options['path'] == '-':
+            result = ingestor.ingest(sys.stdin)
+        else:
+            try:
+                with open(options['path'], encoding='utf-8') as fh:
+                    result = ingestor.ingest(fh)
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for line_no, message in result.errors[:20]:
+            self.stderr.write(f"line {line_no}: {message}")
+        for failed in result.failed_batches:
+            self.stderr.write(f"batch {failed.batch} (lines {failed.first_line}-{failed.last_line}) "
+                              f"not written: {failed.error}")
+        rate = result.created / result.elapsed if result.elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created} services in {result.elapsed:.1f}s "
+            f"({rate * 60:,.0f}/min), {result.failed} rows skipped."
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('services', '0012_busservice_bus_number_busservice_bus_travels_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FareHistoryChunk',
+            fields=[
+                ('chunk_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('object_id', models.UUIDField()),
+                ('class_type', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('start_time', models.DateTimeField()),
+                ('start_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('last_time', models.DateTimeField()),
+                ('last_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('points', models.JSONField(blank=True, default=list)),
+                ('point_count', models.PositiveIntegerField(default=1)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'ordering': ['day'],
+                'unique_together': {('content_type', 'object_id', 'class_type', 'day')},
+            },
+        ),
+    ]
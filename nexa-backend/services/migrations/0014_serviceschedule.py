@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:12
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0013_farehistorychunk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceSchedule',
+            fields=[
+                ('schedule_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('service_type', models.CharField(choices=[('bus', 'Bus'), ('train', 'Train'), ('flight', 'Flight')], max_length=10)),
+                ('days_of_week', models.JSONField(default=list)),
+                ('departure_time', models.TimeField()),
+                ('duration', models.DurationField()),
+                ('service_fields', models.JSONField(blank=True, default=dict)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('generated_until', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.policy')),
+                ('provider_user_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_schedules', to=settings.AUTH_USER_MODEL)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.route')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.vehicle')),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:18
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0014_serviceschedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatLayout',
+            fields=[
+                ('layout_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('mode', models.CharField(choices=[('bus', 'Bus'), ('train', 'Train'), ('flight', 'Flight')], max_length=10)),
+                ('signature', models.CharField(max_length=64, unique=True)),
+                ('seats', models.JSONField(default=list)),
+                ('class_counts', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='busservice',
+            name='seat_layout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bus_services', to='services.seatlayout'),
+        ),
+        migrations.AddField(
+            model_name='flightservice',
+            name='seat_layout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='flight_services', to='services.seatlayout'),
+        ),
+        migrations.AddField(
+            model_name='trainservice',
+            name='seat_layout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='train_services', to='services.seatlayout'),
+        ),
+    ]
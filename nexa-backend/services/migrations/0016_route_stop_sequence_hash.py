@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:25
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_stop_sequence_hash(apps, schema_editor):
+    Route = apps.get_model('services', 'Route')
+    RouteStop = apps.get_model('services', 'RouteStop')
+
+    sequences = {}
+    for route_id, station_id in RouteStop.objects.order_by('route_id', 'stop_order').values_list('route_id', 'station_id'):
+        sequences.setdefault(route_id, []).append(str(station_id))
+
+    routes = []
+    for route in Route.objects.only('route_id').iterator():
+        if route.route_id not in sequences:
+            continue
+        route.stop_sequence_hash = hashlib.sha256(",".join(sequences[route.route_id]).encode()).hexdigest()
+        routes.append(route)
+    Route.objects.bulk_update(routes, ['stop_sequence_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0015_seatlayout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='stop_sequence_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.RunPython(backfill_stop_sequence_hash, migrations.RunPython.noop),
+    ]
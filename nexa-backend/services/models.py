@@ -1,6 +1,8 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from datetime import datetime
 from django.db.models import F,Min
 from decimal import Decimal
@@ -115,6 +117,8 @@ class Route(models.Model):
     # to link these to the Station model as well (e.g., ManyToManyField).
     source_pickup_points = models.JSONField(default=list, blank=True, null=True)
     destination_dropoff_points = models.JSONField(default=list, blank=True, null=True)
+    # sha256 of the ordered stop station ids; lets route matching use one indexed lookup
+    stop_sequence_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     intermediate_stops = models.ManyToManyField(
             Station,
             related_name="stops_on_routes",
@@ -159,6 +163,34 @@ class Policy(models.Model):
     def __str__(self):
         return f"Policy {self.policy_id}"
 
+
+# ---------- SEAT LAYOUT ----------
+class SeatLayout(models.Model):
+    """
+    Seat map shared by every service with the same seat configuration.
+
+    ``seats`` lists ``[seat_number, seat_class]`` for buses and flights and
+    ``[seat_number, class_type, bogie_number, seat_type]`` for trains.
+    Services that point at a layout only get seat rows for seats that have
+    been booked; see ``services.seating``.
+    """
+    MODES = [
+        ('bus', 'Bus'),
+        ('train', 'Train'),
+        ('flight', 'Flight'),
+    ]
+
+    layout_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    mode = models.CharField(max_length=10, choices=MODES)
+    # sha256 of (mode, seats); identical configurations share one row
+    signature = models.CharField(max_length=64, unique=True)
+    seats = models.JSONField(default=list)
+    class_counts = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.mode} layout ({len(self.seats)} seats)"
+
 ###################################
 # ---------- BUS SERVICE ----------
 ###################################
@@ -185,6 +217,8 @@ class BusService(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Scheduled')
     bus_number  =  models.IntegerField(default=0,blank=True,null=True)
     bus_travels_name =  models.CharField(max_length=100,default="Placeholder", blank=True,null= True)
+    # Shared seat map; NULL for services that still have a full set of BusSeat rows
+    seat_layout = models.ForeignKey(SeatLayout, on_delete=models.PROTECT, null=True, blank=True, related_name="bus_services")
 
     # ✳️ Seat Configuration
     num_rows_sleeper = models.PositiveIntegerField(default=0)
@@ -212,21 +246,30 @@ class BusService(models.Model):
         return f"{self.route.source} → {self.route.destination} ({self.status})"
 
     # 💡 Smart dynamic pricing
-    def apply_dynamic_pricing(self, time_to_departure_hours=24):
+    def apply_dynamic_pricing(self, time_to_departure_hours=24, expected_load_factor=None):
+        # expected_load_factor comes from the demand forecast; pricing uses
+        # whichever of current or expected occupancy is higher.
+        from services.fare_history import record_fare
+
         if not self.dynamic_pricing_enabled:
             self.current_sleeper_price = self.sleeper_price
             self.current_non_sleeper_price = self.non_sleeper_price
-            return
+        else:
+            occupancy_rate = 0.0
+            if self.total_capacity > 0:
+                occupancy_rate = self.booked_seats / self.total_capacity
+            if expected_load_factor is not None:
+                occupancy_rate = max(occupancy_rate, min(expected_load_factor, 1.0))
 
-        occupancy_rate = 0.0
-        if self.total_capacity > 0:
-            occupancy_rate = self.booked_seats / self.total_capacity
+            occupancy_multiplier = 1 + (occupancy_rate * self.dynamic_factor * 0.5)
+            time_factor = 1 + max(0, (24 - time_to_departure_hours) / 100)
 
-        occupancy_multiplier = 1 + (occupancy_rate * self.dynamic_factor * 0.5)
-        time_factor = 1 + max(0, (24 - time_to_departure_hours) / 100)
+            self.current_sleeper_price = round(float(self.sleeper_price) * occupancy_multiplier * time_factor, 2)
+            self.current_non_sleeper_price = round(float(self.non_sleeper_price) * occupancy_multiplier * time_factor, 2)
 
-        self.current_sleeper_price = round(float(self.sleeper_price) * occupancy_multiplier * time_factor, 2)
-        self.current_non_sleeper_price = round(float(self.non_sleeper_price) * occupancy_multiplier * time_factor, 2)
+        # 📈 Keep a fare history point for every repricing
+        record_fare(self, 'Sleeper', self.current_sleeper_price)
+        record_fare(self, 'NonSleeper', self.current_non_sleeper_price)
 
 
 # ---------- SEAT ----------
@@ -270,6 +313,8 @@ class TrainService(models.Model):
         default=dict,
         help_text="JSON object describing bogie configuration. e.g., {'Sleeper': {'count': 10, 'seats_per_bogie': 72}}"
     )
+    # Shared seat map; NULL for services that still have a full set of TrainSeat rows
+    seat_layout = models.ForeignKey(SeatLayout, on_delete=models.PROTECT, null=True, blank=True, related_name="train_services")
 
     
     # These prices are for the *full route* (source to destination)
@@ -331,7 +376,8 @@ class TrainService(models.Model):
         # 1. Calculate Occupancy Factor
         occupancy_rate = 0.0
         try:
-            total_capacity_class = self.train_seats.filter(class_type=class_type).count()
+            from services.seating import class_capacity
+            total_capacity_class = class_capacity(self, class_type)
             if total_capacity_class > 0:
                 # Find the segments this journey covers
                 segments = self.segments.filter(segment_index__in=segment_indices)
@@ -389,12 +435,13 @@ class TrainService(models.Model):
 
 
 
-    def get_price_for_journey(self, from_station, to_station, class_type):
+    def get_price_for_journey(self, from_station, to_station, class_type, record=False):
         """
         Calculates the final, scaled, and dynamically-adjusted price
         for a journey between any two stations on this service's route.
         
         This is the primary function to call when a user searches for a price.
+        ``record=True`` (used when booking) also adds the fare to the fare history.
         """
         
         # --- 1. Get Base Sleeper Price for the Journey ---
@@ -472,6 +519,17 @@ class TrainService(models.Model):
 
         final_price = journey_base_price * occ_multiplier * time_multiplier
 
+        # 📈 Record booked fares as full-route fares so points from different
+        # sub-journeys land on the same curve.
+        if record:
+            from services.fare_history import record_fare
+            full_route_price = {
+                'Sleeper': base_sleeper_full,
+                'SecondAC': self.second_ac_price or base_sleeper_full,
+                'ThirdAC': self.third_ac_price or base_sleeper_full,
+            }[class_type]
+            record_fare(self, class_type, round(full_route_price * occ_multiplier * time_multiplier, 2))
+
         return round(final_price, 2)
 
     # --- (Existing get_full_stop_list and create_service_segments methods) ---
@@ -497,7 +555,7 @@ class TrainService(models.Model):
         """
         Populates the TrainServiceSegment table for this service.
         This should be called *once* when the service is first created,
-        *after* all TrainSeat objects have been created.
+        *after* its seat layout is set (or its TrainSeat objects created).
         """
         if self.segments.exists():
             return # Already created
@@ -509,10 +567,16 @@ class TrainService(models.Model):
         # MODIFIED: Force a fresh query to the database instead of using the
         # potentially stale related manager cache. This is crucial when seats
         # have just been added via bulk_create in the same operation.
-        seats = TrainSeat.objects.filter(train_service=self).all()
-        total_sleeper = seats.filter(class_type='sleeper').count()
-        total_second_ac = seats.filter(class_type='second_ac').count()
-        total_third_ac = seats.filter(class_type='third_ac').count()
+        if self.seat_layout_id:
+            counts = self.seat_layout.class_counts
+            total_sleeper = counts.get('sleeper', 0)
+            total_second_ac = counts.get('second_ac', 0)
+            total_third_ac = counts.get('third_ac', 0)
+        else:
+            seats = TrainSeat.objects.filter(train_service=self).all()
+            total_sleeper = seats.filter(class_type='sleeper').count()
+            total_second_ac = seats.filter(class_type='second_ac').count()
+            total_third_ac = seats.filter(class_type='third_ac').count()
         print(f"Creating segments with total seats - Sleeper: {total_sleeper}, 2AC: {total_second_ac}, 3AC: {total_third_ac}")
 
         for i in range(len(full_stops) - 1):
@@ -636,6 +700,8 @@ class FlightService(models.Model):
     flight_number = models.CharField(max_length=20)
     airline_name = models.CharField(max_length=100)
     aircraft_model = models.CharField(max_length=100, default="Boeing 737")
+    # Shared seat map; NULL for services that still have a full set of FlightSeat rows
+    seat_layout = models.ForeignKey(SeatLayout, on_delete=models.PROTECT, null=True, blank=True, related_name="flight_services")
 
     # ✈️ Seat configuration per class
     num_rows_business = models.PositiveIntegerField(default=0)
@@ -685,6 +751,12 @@ class FlightService(models.Model):
         if self.economy_price:
             self.economy_price = round(float(self.economy_price) * occupancy_multiplier * time_factor, 2)
 
+        # 📈 Keep a fare history point for every repricing
+        from services.fare_history import record_fare
+        record_fare(self, 'Business', self.business_price)
+        record_fare(self, 'PremiumEconomy', self.premium_price)
+        record_fare(self, 'Economy', self.economy_price)
+
 
 # ---------- FLIGHT SEAT ----------
 class FlightSeat(models.Model):
@@ -699,3 +771,83 @@ class FlightSeat(models.Model):
     def __str__(self):
         return f"{self.flight_service.airline_name} - {self.seat_class} Seat {self.seat_number}"
 
+
+######################################
+# ---------- SERVICE SCHEDULE ----------
+######################################
+class ServiceSchedule(models.Model):
+    """
+    Recurring template for a bus/train/flight departure.
+
+    ``services.schedules.materialize_schedules`` turns it into concrete
+    services for the next N days, reusing the already-resolved route,
+    vehicle and policy. ``service_fields`` holds everything else the create
+    serializer would take (prices, seat/bogie layout, names and numbers).
+    """
+    SERVICE_TYPES = [
+        ('bus', 'Bus'),
+        ('train', 'Train'),
+        ('flight', 'Flight'),
+    ]
+
+    schedule_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    provider_user_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name="service_schedules")
+    service_type = models.CharField(max_length=10, choices=SERVICE_TYPES)
+    route = models.ForeignKey(Route, on_delete=models.CASCADE)
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE)
+    policy = models.ForeignKey(Policy, on_delete=models.CASCADE)
+
+    # 0 = Monday ... 6 = Sunday
+    days_of_week = models.JSONField(default=list)
+    departure_time = models.TimeField()
+    duration = models.DurationField()
+    service_fields = models.JSONField(default=dict, blank=True)
+
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    # Last date already materialized; the generator only adds days after it
+    generated_until = models.DateField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.service_type} {self.route} @ {self.departure_time} ({self.days_of_week})"
+
+
+######################################
+# ---------- FARE HISTORY ----------
+######################################
+class FareHistoryChunk(models.Model):
+    """
+    One day of fare history for a single (service, class) pair.
+
+    Points are append-only and delta-encoded: the first point is stored as
+    ``start_time`` / ``start_price`` and ``points`` holds ``[seconds, paise]``
+    offsets from the previous point. Use ``services.fare_history`` to write
+    and read these rows rather than touching ``points`` directly.
+    """
+    chunk_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    # Works for BusService, TrainService and FlightService alike
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.UUIDField()
+    service_object = GenericForeignKey('content_type', 'object_id')
+
+    class_type = models.CharField(max_length=50)
+    day = models.DateField()
+
+    start_time = models.DateTimeField()
+    start_price = models.DecimalField(max_digits=10, decimal_places=2)
+    last_time = models.DateTimeField()
+    last_price = models.DecimalField(max_digits=10, decimal_places=2)
+    points = models.JSONField(default=list, blank=True)
+    point_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id', 'class_type', 'day')
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.class_type} fares for {self.object_id} on {self.day} ({self.point_count} points)"
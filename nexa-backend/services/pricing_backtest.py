@@ -0,0 +1,178 @@
+"""
+Offline backtest for ``dynamic_factor``.
+
+Historical confirmed bookings are loaded once into NumPy arrays and replayed
+against the same formulas the models use at runtime:
+
+    occupancy_multiplier = 1 + occupancy * dynamic_factor * weight
+    time_factor          = 1 + max(0, (24 - hours_to_departure) / 100)
+
+with ``weight`` 0.5 for bus/train (``BusService.apply_dynamic_pricing``,
+``TrainService._get_dynamic_multipliers``) and 0.4 for flights
+(``FlightService.apply_dynamic_pricing``). Occupancy is what the service had
+sold *before* each booking: the whole service for bus/flight, the booked class
+for trains.
+
+Each booking's base fare is its paid fare with the service's own multiplier
+divided back out, so replaying with the service's current factor reproduces
+history. With ``elasticity > 0`` demand shrinks as ``multiplier ** -elasticity``
+so higher factors trade load for yield instead of only ever adding revenue.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+
+from bookings.models import Booking
+from .models import BusService, TrainService, FlightService, TrainSeat
+from .seating import TRAIN_SEAT_CLASS
+
+OCCUPANCY_WEIGHT = {'bus': 0.5, 'train': 0.5, 'flight': 0.4}
+SERVICE_MODELS = {'bus': BusService, 'train': TrainService, 'flight': FlightService}
+
+BacktestResult = namedtuple('BacktestResult', 'factor revenue load_factor passengers avg_multiplier')
+
+
+def load_booking_arrays(modes=None, start=None, end=None, chunk_size=20000):
+    """
+    Pull confirmed bookings and their services into flat NumPy arrays,
+    sorted by (inventory group, booking time).
+    """
+    columns = {k: [] for k in ('group', 'booked_at', 'departure', 'pax', 'amount',
+                                'capacity', 'weight', 'own_factor', 'dynamic')}
+    group_ids = {}
+
+    for mode in modes or SERVICE_MODELS:
+        model = SERVICE_MODELS[mode]
+        services = {
+            row[0]: row[1:]
+            for row in model.objects.values_list(
+                'service_id', 'departure_time', 'total_capacity',
+                'dynamic_factor', 'dynamic_pricing_enabled',
+            ).iterator(chunk_size=chunk_size)
+        }
+        class_capacity = {}
+        if mode == 'train':
+            # Layout services carry per-class counts; legacy ones have a row per seat
+            class_capacity = {
+                (row['train_service_id'], row['class_type']): row['n']
+                for row in TrainSeat.objects.filter(train_service__seat_layout__isnull=True)
+                .values('train_service_id', 'class_type').annotate(n=Count('seat_id'))
+            }
+            for service_id, counts in TrainService.objects.filter(seat_layout__isnull=False).values_list(
+                'service_id', 'seat_layout__class_counts'
+            ).iterator(chunk_size=chunk_size):
+                for class_type, n in counts.items():
+                    class_capacity[(service_id, class_type)] = n
+
+        bookings = Booking.objects.filter(
+            status='Confirmed', content_type=ContentType.objects.get_for_model(model),
+        )
+        if start is not None:
+            bookings = bookings.filter(created_at__gte=start)
+        if end is not None:
+            bookings = bookings.filter(created_at__lte=end)
+        rows = (
+            bookings.annotate(pax=Count('passengers'))
+            .values_list('object_id', 'class_type', 'created_at', 'total_amount', 'pax')
+            .iterator(chunk_size=chunk_size)
+        )
+
+        for object_id, class_type, created_at, amount, pax in rows:
+            service = services.get(object_id)
+            if service is None or not pax:
+                continue
+            departure, capacity, factor, dynamic = service
+            if mode == 'train':
+                key = (object_id, class_type)
+                capacity = class_capacity.get((object_id, TRAIN_SEAT_CLASS.get(class_type, class_type)), capacity)
+            else:
+                key = object_id
+            if not capacity:
+                continue
+
+            columns['group'].append(group_ids.setdefault(key, len(group_ids)))
+            columns['booked_at'].append(created_at.timestamp())
+            columns['departure'].append(departure.timestamp())
+            columns['pax'].append(pax)
+            columns['amount'].append(float(amount))
+            columns['capacity'].append(capacity)
+            columns['weight'].append(OCCUPANCY_WEIGHT[mode])
+            columns['own_factor'].append(factor)
+            columns['dynamic'].append(dynamic)
+
+    arrays = {
+        'group': np.asarray(columns['group'], dtype=np.int64),
+        'booked_at': np.asarray(columns['booked_at'], dtype=np.float64),
+        'departure': np.asarray(columns['departure'], dtype=np.float64),
+        'pax': np.asarray(columns['pax'], dtype=np.float64),
+        'amount': np.asarray(columns['amount'], dtype=np.float64),
+        'capacity': np.asarray(columns['capacity'], dtype=np.float64),
+        'weight': np.asarray(columns['weight'], dtype=np.float64),
+        'own_factor': np.asarray(columns['own_factor'], dtype=np.float64),
+        'dynamic': np.asarray(columns['dynamic'], dtype=bool),
+    }
+    order = np.lexsort((arrays['booked_at'], arrays['group']))
+    return {name: values[order] for name, values in arrays.items()}
+
+
+def _sold_before(group, pax):
+    """Seats already sold in the same group before each booking (rows sorted by group, time)."""
+    if not len(group):
+        return pax
+    running = np.cumsum(pax)
+    group_start = np.r_[True, group[1:] != group[:-1]]
+    offset = np.maximum.accumulate(np.where(group_start, running - pax, 0))
+    return running - pax - offset
+
+
+def _multiplier(arrays, factor, sold):
+    occupancy = np.clip(sold / arrays['capacity'], 0.0, 1.0)
+    hours = (arrays['departure'] - arrays['booked_at']) / 3600
+    time_factor = 1 + np.maximum(0.0, (24 - hours) / 100)
+    return (1 + occupancy * factor * arrays['weight']) * time_factor
+
+
+def replay(arrays, factors, elasticity=0.0, iterations=3):
+    """
+    Re-price every booking under each candidate ``factor``.
+
+    Returns one ``BacktestResult`` per factor, in the order given.
+    """
+    pax = arrays['pax']
+    historic = np.where(
+        arrays['dynamic'],
+        _multiplier(arrays, arrays['own_factor'], _sold_before(arrays['group'], pax)),
+        1.0,
+    )
+    base_fare = arrays['amount'] / pax / historic
+
+    # Every seat of every group that saw at least one booking
+    group_ids, first = np.unique(arrays['group'], return_index=True)
+    seats_offered = arrays['capacity'][first].sum() if len(group_ids) else 0.0
+
+    results = []
+    for factor in factors:
+        demand = pax
+        # Occupancy depends on how much demand survived, which depends on
+        # the multiplier; a few fixed-point passes settle it.
+        for _ in range(iterations if elasticity else 1):
+            multiplier = _multiplier(arrays, factor, _sold_before(arrays['group'], demand))
+            demand = pax * multiplier ** -elasticity if elasticity else pax
+
+        revenue = float(np.sum(base_fare * demand * multiplier))
+        sold = float(np.sum(demand))
+        results.append(BacktestResult(
+            factor=float(factor),
+            revenue=round(revenue, 2),
+            load_factor=round(sold / seats_offered, 4) if seats_offered else 0.0,
+            passengers=round(sold, 2),
+            avg_multiplier=round(float(np.average(multiplier, weights=demand)), 4) if sold else 1.0,
+        ))
+    return results
+
+
+def run_backtest(factors, modes=None, start=None, end=None, elasticity=0.0):
+    """Load history and replay it; convenience wrapper for the command and tests."""
+    return replay(load_booking_arrays(modes, start, end), factors, elasticity=elasticity)
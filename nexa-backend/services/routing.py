@@ -0,0 +1,144 @@
+"""
+Batched station and route resolution.
+
+Shared by ``RouteNestedSerializer.create`` (one route) and the bulk ingestor
+(a whole batch of routes). Either way the work is a fixed handful of
+queries, no matter how many stops or routes there are:
+
+* stations: one lookup, one ``bulk_create`` for the missing ones. They are
+  matched on ``code``, or on ``name`` when there is no code;
+* routes: one lookup through ``Route.stop_sequence_hash``, then one
+  ``bulk_create`` each for new routes and their ``RouteStop`` rows. A route
+  matches when source, destination, distance, duration, pickup/drop-off
+  points and the full stop sequence are all the same.
+"""
+import hashlib
+import json
+import random
+from datetime import timedelta
+
+from django.db.models import Q
+
+from .models import Station, Route, RouteStop
+
+
+def station_key(data):
+    return ('code', data['code']) if data.get('code') else ('name', data.get('name'))
+
+
+def route_station_data(route_data):
+    """Station payloads of a route in stop order: source, stops..., destination."""
+    return [route_data['source'], *[s['station'] for s in route_data.get('stops', [])], route_data['destination']]
+
+
+def stop_sequence_hash(station_ids):
+    return hashlib.sha256(",".join(str(pk) for pk in station_ids).encode()).hexdigest()
+
+
+def _route_key(source_id, destination_id, route_data, sequence_hash):
+    return (
+        source_id,
+        destination_id,
+        route_data.get('distance_km'),
+        route_data.get('estimated_duration'),
+        json.dumps(route_data.get('source_pickup_points') or [], sort_keys=True),
+        json.dumps(route_data.get('destination_dropoff_points') or [], sort_keys=True),
+        sequence_hash,
+    )
+
+
+def resolve_stations(station_payloads):
+    """Return {station_key: Station} for every payload, creating the missing stations."""
+    wanted = {}
+    for data in station_payloads:
+        wanted.setdefault(station_key(data), data)
+
+    codes = [value for kind, value in wanted if kind == 'code']
+    names = [value for kind, value in wanted if kind == 'name']
+    found = {}
+    # Lowest pk wins when a code is duplicated, like the old per-stop .first()
+    for station in Station.objects.filter(Q(code__in=codes) | Q(code__isnull=True, name__in=names)).order_by('-pk'):
+        key = ('code', station.code) if station.code else ('name', station.name)
+        found[key] = station
+
+    missing = [
+        Station(
+            name=data.get('name'),
+            code=data.get('code'),
+            city=data.get('city'),
+            state=data.get('state'),
+            BusStations=data.get('BusStations', []),
+        )
+        for key, data in wanted.items() if key not in found
+    ]
+    for station in Station.objects.bulk_create(missing):
+        found[station_key({'code': station.code, 'name': station.name})] = station
+    return found
+
+
+def resolve_routes(route_payloads, stations):
+    """
+    Return (route per payload, {route_id: [Station, ...] in stop order}),
+    creating routes and stops that don't exist yet. ``stations`` is the
+    mapping returned by ``resolve_stations``.
+    """
+    wanted = []
+    for route_data in route_payloads:
+        sequence = [stations[station_key(data)] for data in route_station_data(route_data)]
+        sequence_hash = stop_sequence_hash(s.pk for s in sequence)
+        wanted.append((route_data, sequence, sequence_hash))
+
+    existing = {}
+    candidates = Route.objects.filter(stop_sequence_hash__in={h for _, _, h in wanted})
+    for route in candidates.order_by('-pk'):
+        key = _route_key(route.source_id, route.destination_id, {
+            'distance_km': route.distance_km,
+            'estimated_duration': route.estimated_duration,
+            'source_pickup_points': route.source_pickup_points,
+            'destination_dropoff_points': route.destination_dropoff_points,
+        }, route.stop_sequence_hash)
+        existing[key] = route
+
+    routes, route_stations = [], {}
+    new_routes, new_stops = [], []
+    for route_data, sequence, sequence_hash in wanted:
+        key = _route_key(sequence[0].pk, sequence[-1].pk, route_data, sequence_hash)
+        route = existing.get(key)
+        if route is None:
+            route = Route(
+                source=sequence[0],
+                destination=sequence[-1],
+                distance_km=route_data.get('distance_km'),
+                estimated_duration=route_data.get('estimated_duration'),
+                source_pickup_points=route_data.get('source_pickup_points', []),
+                destination_dropoff_points=route_data.get('destination_dropoff_points', []),
+                stop_sequence_hash=sequence_hash,
+            )
+            if route.distance_km is None:
+                # Same placeholder as Route.update_distnace_randomly; such
+                # routes never match an existing one, as before
+                route.distance_km = random.uniform(50.0, 1000.0)
+            else:
+                existing[key] = route
+            new_routes.append(route)
+            new_stops.extend(_route_stops(route, sequence, route_data.get('stops', [])))
+        routes.append(route)
+        route_stations[route.route_id] = sequence
+
+    Route.objects.bulk_create(new_routes)
+    RouteStop.objects.bulk_create(new_stops, batch_size=5000)
+    return routes, route_stations
+
+
+def _route_stops(route, sequence, stops_data):
+    stops = [RouteStop(route=route, station=sequence[0], stop_order=0,
+                       duration_to_destination=timedelta(seconds=0), price_to_destination=0)]
+    for order, stop_data in enumerate(stops_data, start=1):
+        stops.append(RouteStop(
+            route=route, station=sequence[order], stop_order=order,
+            price_to_destination=stop_data.get('price_to_destination'),
+            duration_to_destination=stop_data.get('duration_to_destination'),
+        ))
+    stops.append(RouteStop(route=route, station=sequence[-1], stop_order=len(sequence) - 1,
+                           duration_to_destination=timedelta(seconds=0), price_to_destination=0))
+    return stops
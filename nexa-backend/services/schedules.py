@@ -0,0 +1,116 @@
+"""
+Recurring schedules → concrete services.
+
+``materialize_schedules`` walks every active ``ServiceSchedule`` and creates
+the departures that fall between the last generated date and the horizon.
+Route, vehicle and policy were resolved once when the schedule was created
+and every departure shares one seat layout, so a run is a couple of bulk
+inserts per schedule regardless of how many days it covers.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .ingest import SERVICE_MODELS, build_train_segments, copy_insert
+from .models import ServiceSchedule, TrainServiceSegment
+from .seating import assign_layout
+
+
+def _horizon_days():
+    return getattr(settings, "SCHEDULE_HORIZON_DAYS", 30)
+
+
+def max_days_ahead():
+    return getattr(settings, "SCHEDULE_MAX_DAYS_AHEAD", 365)
+
+
+def departure_dates(schedule, first, last):
+    """Dates in [first, last] that the schedule runs on."""
+    if schedule.end_date and schedule.end_date < last:
+        last = schedule.end_date
+    first = max(first, schedule.start_date)
+    days = set(schedule.days_of_week)
+    current = first
+    while current <= last:
+        if current.weekday() in days:
+            yield current
+        current += timedelta(days=1)
+
+
+def _service_kwargs(schedule):
+    model = SERVICE_MODELS[schedule.service_type]
+    fields = {
+        name: model._meta.get_field(name).to_python(value)
+        for name, value in schedule.service_fields.items()
+    }
+    return {
+        **fields,
+        'provider_user_id': schedule.provider_user_id,
+        'route': schedule.route,
+        'vehicle': schedule.vehicle,
+        'policy': schedule.policy,
+    }
+
+
+def _materialize(schedule, until, now):
+    first = schedule.generated_until + timedelta(days=1) if schedule.generated_until else timezone.localdate(now)
+    model = SERVICE_MODELS[schedule.service_type]
+    kwargs = _service_kwargs(schedule)
+
+    stations = []
+    if schedule.service_type == 'train':
+        stations = [stop.station for stop in schedule.route.stops.select_related('station').order_by('stop_order')]
+
+    services, segments = [], []
+    layouts = {}
+    for day in departure_dates(schedule, first, until):
+        departure = timezone.make_aware(datetime.combine(day, schedule.departure_time))
+        if departure <= now:
+            continue
+        service = model(departure_time=departure, arrival_time=departure + schedule.duration, **kwargs)
+        layout = assign_layout(service, layouts)
+        if schedule.service_type == 'bus':
+            service.apply_dynamic_pricing()
+        elif schedule.service_type == 'train':
+            segments.extend(build_train_segments(service, stations, layout))
+        services.append(service)
+
+    model.objects.bulk_create(services)
+    copy_insert(TrainServiceSegment, segments)
+    if services and schedule.service_type == 'train':
+        # TrainService.update_duration, once for the whole run
+        schedule.route.estimated_duration = schedule.duration
+        schedule.route.save(update_fields=['estimated_duration'])
+    return len(services)
+
+
+def materialize_schedules(days_ahead=None, schedules=None):
+    """
+    Create services for every active schedule up to ``days_ahead`` days from
+    today, at most ``SCHEDULE_MAX_DAYS_AHEAD``. Safe to run repeatedly: each
+    schedule remembers how far it got. Returns the number of services created.
+    """
+    now = timezone.now()
+    days_ahead = min(days_ahead if days_ahead is not None else _horizon_days(), max_days_ahead())
+    until = timezone.localdate(now) + timedelta(days=days_ahead)
+    if schedules is None:
+        schedules = ServiceSchedule.objects.filter(is_active=True)
+    schedule_ids = list(schedules.values_list('schedule_id', flat=True))
+
+    created = 0
+    for schedule_id in schedule_ids:
+        with transaction.atomic():
+            # Lock so overlapping beat runs can't generate the same days twice
+            schedule = (
+                ServiceSchedule.objects.select_for_update()
+                .select_related('route', 'vehicle', 'policy')
+                .get(schedule_id=schedule_id)
+            )
+            if schedule.generated_until and schedule.generated_until >= until:
+                continue
+            created += _materialize(schedule, until, now)
+            schedule.generated_until = until
+            schedule.save(update_fields=['generated_until', 'updated_at'])
+    return created
@@ -0,0 +1,207 @@
+"""
+Shared seat layouts and sparse per-service seat rows.
+
+A service's seat map follows entirely from its configuration (rows and
+columns per class, or ``bogies_config`` for trains), so every service with
+the same configuration points at one ``SeatLayout``. Seat rows (``BusSeat``,
+``TrainSeat``, ``FlightSeat``) are only written for seats that get booked;
+reads compose the layout with whatever rows exist.
+
+Services created before layouts existed have ``seat_layout = NULL`` and a
+full set of seat rows. Every helper here handles both.
+"""
+import hashlib
+import json
+from collections import Counter
+
+from .models import SeatLayout, BusService, BusSeat, TrainService, TrainSeat, FlightService, FlightSeat
+
+# service model → (layout mode, seat model, seat FK, seat class field, related name)
+SEAT_MODELS = {
+    BusService: ('bus', BusSeat, 'bus_service', 'seat_type', 'seats'),
+    TrainService: ('train', TrainSeat, 'train_service', 'class_type', 'train_seats'),
+    FlightService: ('flight', FlightSeat, 'flight_service', 'seat_class', 'flight_seats'),
+}
+
+# Train class as booked and priced (``TrainService.CLASS_CHOICES``) → the
+# ``bogies_config`` key used by ``TrainSeat.class_type`` and layouts
+TRAIN_SEAT_CLASS = {'Sleeper': 'sleeper', 'SecondAC': 'second_ac', 'ThirdAC': 'third_ac'}
+
+
+def _grid(prefix, seat_class, rows, cols):
+    return [[f"{prefix}{r + 1}{chr(65 + c)}", seat_class] for r in range(rows or 0) for c in range(cols or 0)]
+
+
+def layout_seats(service):
+    """Layout entries for ``service``'s seat configuration, in the order seats used to be generated."""
+    if isinstance(service, BusService):
+        return (
+            _grid('S', 'Sleeper', service.num_rows_sleeper, service.num_columns_sleeper)
+            + _grid('N', 'NonSleeper', service.num_rows_non_sleeper, service.num_columns_non_sleeper)
+        )
+    if isinstance(service, FlightService):
+        return (
+            _grid('', 'Business', service.num_rows_business, service.num_columns_business)
+            + _grid('P', 'PremiumEconomy', service.num_rows_premium, service.num_columns_premium)
+            + _grid('E', 'Economy', service.num_rows_economy, service.num_columns_economy)
+        )
+    seats = []
+    bogie_counter = 0
+    for class_type, details in (service.bogies_config or {}).items():
+        for i in range(1, details.get('count', 0) + 1):
+            bogie_counter += 1
+            bogie_code = f"{class_type[0:2].upper()}{i}"
+            for seat_num in range(1, details.get('seats_per_bogie', 0) + 1):
+                seats.append([f"{bogie_code}-{seat_num}", class_type, bogie_counter, 'Lower'])
+    return seats
+
+
+def get_layout(mode, seats, cache=None):
+    """
+    Return the shared ``SeatLayout`` for ``seats``, creating it on first use.
+    Pass a dict as ``cache`` to skip the lookup for repeated configurations.
+    """
+    signature = hashlib.sha256(json.dumps([mode, seats]).encode()).hexdigest()
+    if cache is not None and signature in cache:
+        return cache[signature]
+    layout, _ = SeatLayout.objects.get_or_create(
+        signature=signature,
+        defaults={'mode': mode, 'seats': seats, 'class_counts': dict(Counter(seat[1] for seat in seats))},
+    )
+    if cache is not None:
+        cache[signature] = layout
+    return layout
+
+
+def assign_layout(service, cache=None):
+    """Point ``service`` at the layout for its configuration and set ``total_capacity`` (doesn't save)."""
+    layout = get_layout(SEAT_MODELS[type(service)][0], layout_seats(service), cache)
+    service.seat_layout = layout
+    service.total_capacity = len(layout.seats)
+    return layout
+
+
+def seat_price(service, seat_class):
+    if isinstance(service, BusService):
+        prices = {'Sleeper': service.sleeper_price, 'NonSleeper': service.non_sleeper_price}
+    else:
+        prices = {
+            'Business': service.business_price,
+            'PremiumEconomy': service.premium_price,
+            'Economy': service.economy_price,
+        }
+    return prices.get(seat_class) or service.base_price
+
+
+def _seat_row(service, entry, num_segments=0):
+    if isinstance(service, BusService):
+        return BusSeat(bus_service=service, seat_number=entry[0], seat_type=entry[1],
+                       price=seat_price(service, entry[1]))
+    if isinstance(service, FlightService):
+        return FlightSeat(flight_service=service, seat_number=entry[0], seat_class=entry[1],
+                          price=seat_price(service, entry[1]))
+    return TrainSeat(train_service=service, seat_number=entry[0], class_type=entry[1],
+                     bogie_number=entry[2], seat_type=entry[3], availability_mask='0' * num_segments)
+
+
+def _num_segments(service):
+    return service.segments.count() if isinstance(service, TrainService) else 0
+
+
+def composed_seats(service):
+    """
+    Every seat of ``service`` as seat model instances: the stored row where
+    there is one, otherwise an unsaved free seat (``seat_id=None``) built
+    from the layout. Uses the related manager, so prefetches still apply.
+    """
+    related = SEAT_MODELS[type(service)][4]
+    rows = list(getattr(service, related).all())
+    if not service.seat_layout_id:
+        return rows
+
+    by_number = {row.seat_number: row for row in rows}
+    num_segments = _num_segments(service) if len(by_number) < len(service.seat_layout.seats) else 0
+    seats = []
+    for entry in service.seat_layout.seats:
+        seat = by_number.get(entry[0])
+        if seat is None:
+            seat = _seat_row(service, entry, num_segments)
+            seat.seat_id = None
+        seats.append(seat)
+    return seats
+
+
+def class_capacity(service, seat_class):
+    """Number of seats of ``seat_class`` on ``service``; train classes may be given either way."""
+    if isinstance(service, TrainService):
+        seat_class = TRAIN_SEAT_CLASS.get(seat_class, seat_class)
+    if service.seat_layout_id:
+        return service.seat_layout.class_counts.get(seat_class, 0)
+    _, seat_model, fk, class_field, _ = SEAT_MODELS[type(service)]
+    return seat_model.objects.filter(**{fk: service, class_field: seat_class}).count()
+
+
+def untouched_seat_numbers(service, seat_class, count, exclude=()):
+    """
+    Up to ``count`` layout seats of ``seat_class`` that have no seat row yet,
+    and so are free on every segment, in ``seat_number`` order.
+    """
+    if not service.seat_layout_id or count <= 0:
+        return []
+    _, seat_model, fk, _, _ = SEAT_MODELS[type(service)]
+    taken = set(seat_model.objects.filter(**{fk: service}).values_list('seat_number', flat=True))
+    taken.update(exclude)
+    numbers = sorted(
+        entry[0] for entry in service.seat_layout.seats
+        if entry[1] == seat_class and entry[0] not in taken
+    )
+    return numbers[:count]
+
+
+def materialize_seats(service, seat_numbers):
+    """
+    Write seat rows for the layout seats in ``seat_numbers`` that don't have
+    one yet, so booking code can lock and update them like any other seat.
+    Call with the service row locked. Does nothing for legacy services.
+    """
+    wanted = set(seat_numbers)
+    if not service.seat_layout_id or not wanted:
+        return
+    _, seat_model, fk, _, _ = SEAT_MODELS[type(service)]
+    existing = set(
+        seat_model.objects.filter(**{fk: service, 'seat_number__in': wanted}).values_list('seat_number', flat=True)
+    )
+    num_segments = _num_segments(service)
+    seat_model.objects.bulk_create([
+        _seat_row(service, entry, num_segments)
+        for entry in service.seat_layout.seats
+        if entry[0] in wanted and entry[0] not in existing
+    ])
+
+
+def compact_service_seats(service, cache=None):
+    """
+    Move a legacy service onto its shared layout and delete the seat rows
+    that were never booked. Returns the number of rows deleted, or ``None``
+    when the stored seats don't match the configuration (left untouched).
+    """
+    if service.seat_layout_id:
+        return 0
+    _, seat_model, fk, _, _ = SEAT_MODELS[type(service)]
+    rows = seat_model.objects.filter(**{fk: service})
+    numbers = {entry[0] for entry in layout_seats(service)}
+    if not set(rows.values_list('seat_number', flat=True)) <= numbers:
+        return None
+
+    capacity = service.total_capacity
+    assign_layout(service, cache)
+    service.total_capacity = capacity
+    service.save(update_fields=['seat_layout'])
+
+    unused = rows.filter(booking_passenger__isnull=True)
+    if isinstance(service, TrainService):
+        unused = unused.exclude(availability_mask__contains='1')
+    else:
+        unused = unused.filter(is_booked=False)
+    deleted, _ = unused.delete()
+    return deleted
@@ -4,6 +4,9 @@ from .models import Route, Station, RouteStop
 from .models import Vehicle
 from .models import Policy
 from .models import TrainSeat,TrainService,TrainServiceSegment,FlightSeat,FlightService
+from .models import ServiceSchedule
+from .routing import resolve_stations, resolve_routes, route_station_data
+from .seating import assign_layout, composed_seats
 from django.db import transaction
 from user_management.models import ServiceProvider
 from django.db.models import Prefetch
@@ -69,109 +72,12 @@ class RouteNestedSerializer(serializers.ModelSerializer):
             'source_pickup_points',
             'destination_dropoff_points'
         ]
-    def get_or_create_station(self,data):
-        """Safely get or create a station — if duplicates exist, pick the first."""
-        code = data.get("code")
-        BusStations = data.get("BusStations", [])
-        filters = {}
-        if code:
-            filters["code"] = code
-        if BusStations != []:
-            filters["BusStations"] = BusStations
-        else:
-            # fallback if no code provided
-            filters["name"] = data.get("name")
-
-        # Try to find any existing matching station
-        existing = Station.objects.filter(**filters).first()
-        if existing:
-            return existing
-
-        # Otherwise create a new one
-        return Station.objects.create(
-            name=data.get("name"),
-            code=data.get("code"),
-            city=data.get("city"),
-            state=data.get("state"),
-            BusStations=data.get("BusStations", []),
-        )
-
     @transaction.atomic
     def create(self, validated_data):
-        source_data = validated_data.pop('source')
-        destination_data = validated_data.pop('destination')
-        stops_data = validated_data.pop('stops', [])
-        distance_km = validated_data.pop('distance_km', None)
-        estimated_duration = validated_data.pop('estimated_duration', None)
-        source_pickup_points = validated_data.pop('source_pickup_points', [])
-        destination_dropoff_points = validated_data.pop('destination_dropoff_points', [])
-
-        # --- Safe "get or create" for stations ---
-        source = self.get_or_create_station(source_data)
-        destination = self.get_or_create_station(destination_data)
-
-        # --- Build intended stop sequence ---
-        intended_stops = [source.code]
-        for stop_data in stops_data:
-            intended_stops.append(stop_data['station']['code'])
-        intended_stops.append(destination.code)
-
-        # --- Try to find identical existing route ---
-        candidate_routes = (
-            Route.objects.filter(
-                source=source,
-                destination=destination,
-                distance_km=distance_km,
-                estimated_duration=estimated_duration,
-                source_pickup_points=source_pickup_points,
-                destination_dropoff_points=destination_dropoff_points,
-            )
-            .prefetch_related('stops__station')
-        )
-
-        matched_route = None
-        for route in candidate_routes:
-            route_stop_codes = [s.station.code for s in route.stops.all().order_by('stop_order')]
-            if route_stop_codes == intended_stops:
-                matched_route = route
-                break
-
-        if matched_route:
-            return matched_route
-
-        # --- Create new route ---
-        route = Route.objects.create(
-            source=source,
-            destination=destination,
-            distance_km=distance_km,
-            estimated_duration=estimated_duration,
-            source_pickup_points=source_pickup_points,
-            destination_dropoff_points=destination_dropoff_points,
-            **validated_data,
-        )
-        if distance_km is None:
-            route.update_distnace_randomly()
-
-        # --- Add stops ---
-        stop_order = 0
-        RouteStop.objects.create(route=route, station=source, stop_order=stop_order,duration_to_destination=timedelta(seconds=0),price_to_destination=0)
-        stop_order += 1
-
-        for stop_data in stops_data:
-            station_data = stop_data.pop('station')
-            stop_data.pop('stop_order', None)
-            station = self.get_or_create_station(station_data)
-
-            RouteStop.objects.create(
-                route=route,
-                station=station,
-                stop_order=stop_order,
-                **{k: v for k, v in stop_data.items() if k in ['price_to_destination', 'duration_to_destination']}
-            )
-            stop_order += 1
-
-        RouteStop.objects.create(route=route, station=destination, stop_order=stop_order,duration_to_destination=timedelta(seconds=0),price_to_destination=0)
-        return route
+        # Stations, route match and stops in a fixed number of queries
+        stations = resolve_stations(route_station_data(validated_data))
+        routes, _ = resolve_routes([validated_data], stations)
+        return routes[0]
 
 # -----------------------
 # Vehicle Serializer (Nested Create)
@@ -246,8 +152,8 @@ class BusServiceDetailSerializer(serializers.ModelSerializer,ProviderRatingMixin
     vehicle = VehicleSerializer(read_only=True)
     policy = PolicySerializer(read_only=True)
     
-    # This is correct: field name 'seats' matches related_name='seats'
-    seats = BusSeatSerializer(many=True, read_only=True)
+    # Layout seats composed with the booked seat rows
+    seats = serializers.SerializerMethodField()
     provider_rating = serializers.SerializerMethodField()
     provider_total_reviews = serializers.SerializerMethodField()
 
@@ -255,6 +161,9 @@ class BusServiceDetailSerializer(serializers.ModelSerializer,ProviderRatingMixin
         model = BusService
         fields = '__all__'
 
+    def get_seats(self, obj):
+        return BusSeatSerializer(composed_seats(obj), many=True).data
+
 # -----------------------
 # BusService Create Serializer (Nested)
 # -----------------------
@@ -265,7 +174,7 @@ class BusServiceCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BusService
-        exclude = ['provider_user_id', 'booked_seats', 'total_capacity', 'current_sleeper_price', 'current_non_sleeper_price']
+        exclude = ['provider_user_id', 'booked_seats', 'total_capacity', 'seat_layout', 'current_sleeper_price', 'current_non_sleeper_price']
 
     def create(self, validated_data):
         # Nested route creation
@@ -280,7 +189,7 @@ class BusServiceCreateSerializer(serializers.ModelSerializer):
         vehicle = Vehicle.objects.create(**vehicle_data)
         policy = Policy.objects.create(**policy_data)
 
-        bus_service = BusService.objects.create(
+        bus_service = BusService(
             provider_user_id=request.user,
             route=route,
             vehicle=vehicle,
@@ -288,36 +197,8 @@ class BusServiceCreateSerializer(serializers.ModelSerializer):
             **validated_data
         )
 
-        # ---- Auto-generate seats ----
-        sleeper_total = bus_service.num_rows_sleeper * bus_service.num_columns_sleeper
-        nonsleeper_total = bus_service.num_rows_non_sleeper * bus_service.num_columns_non_sleeper
-        total_capacity = sleeper_total + nonsleeper_total
-        bus_service.total_capacity = total_capacity
-        bus_service.save()
-
-        seats = []
-        # Sleeper seats
-        for r in range(bus_service.num_rows_sleeper):
-            for c in range(bus_service.num_columns_sleeper):
-                seat_number = f"S{r+1}{chr(65+c)}"
-                seats.append(BusSeat(
-                    bus_service=bus_service,
-                    seat_number=seat_number,
-                    seat_type='Sleeper',
-                    price=bus_service.sleeper_price or bus_service.base_price
-                ))
-        # Non-sleeper seats
-        for r in range(bus_service.num_rows_non_sleeper):
-            for c in range(bus_service.num_columns_non_sleeper):
-                seat_number = f"N{r+1}{chr(65+c)}"
-                seats.append(BusSeat(
-                    bus_service=bus_service,
-                    seat_number=seat_number,
-                    seat_type='NonSleeper',
-                    price=bus_service.non_sleeper_price or bus_service.base_price
-                ))
-
-        BusSeat.objects.bulk_create(seats)
+        # ---- Seats come from the shared layout; rows are written on booking ----
+        assign_layout(bus_service)
         bus_service.apply_dynamic_pricing()
         bus_service.save()
         return bus_service
@@ -381,6 +262,7 @@ class TrainServiceCreateSerializer(serializers.ModelSerializer):
         exclude = [
             'provider_user_id',
             'total_capacity',
+            'seat_layout',
             'created_at',
             'updated_at'
         ]
@@ -405,7 +287,7 @@ class TrainServiceCreateSerializer(serializers.ModelSerializer):
         departure_time = validated_data.pop('departure_time', None)
     
         
-        train_service = TrainService.objects.create(
+        train_service = TrainService(
             provider_user_id=request.user,
             route=route,
             vehicle=vehicle,
@@ -414,60 +296,14 @@ class TrainServiceCreateSerializer(serializers.ModelSerializer):
             departure_time=departure_time,
             **validated_data
         )
-        # 3️⃣ Determine the number of segments for the mask
-        # We do this BEFORE creating seats.
-        num_segments = len(train_service.get_full_stop_list()) - 1
-        print(f"Number of segments for availability mask: {num_segments}")
-        # CORRECT MASK: '0' means available.
-        default_availability_mask = '0' * num_segments
-
-        # 4️⃣ Generate Seats IN MEMORY (don't save yet)
-        seats_to_create = []
-        bogie_counter = 0
-
-        if 'bogies_config' in validated_data:
-            for class_type, details in validated_data['bogies_config'].items():
-                bogie_count_for_class = details.get('count', 0)
-                seats_per_bogie = details.get('seats_per_bogie', 0)
-
-                for i in range(1, bogie_count_for_class + 1):
-                    bogie_counter += 1
-                    bogie_code = f"{class_type[0:2].upper()}{i}" 
-
-                    for seat_num in range(1, seats_per_bogie + 1):
-                        # (Your seat type logic here)
-                        seat_type = 'Lower' # Simplified for example
-                        
-                        seats_to_create.append(
-                            TrainSeat(
-                                train_service=train_service,
-                                bogie_number=bogie_counter,
-                                seat_number=f"{bogie_code}-{seat_num}",
-                                seat_type=seat_type,
-                                class_type=class_type,
-                                # Use the CORRECT mask
-                                availability_mask=default_availability_mask
-                            )
-                        )
-        
-        # 5️⃣ Bulk create all seats in a single, efficient query
-        if seats_to_create:
-            TrainSeat.objects.bulk_create(seats_to_create)
-         # optional if in same transaction but good in tests
-        train_service.refresh_from_db()  # ensures fresh instance
-
-        # ✅ Force a true DB requery
-        seat_count = TrainSeat.objects.filter(train_service=train_service).count()
-        if seat_count == 0 : 
+        # 3️⃣ Point at the shared seat layout; seat rows are written on booking
+        layout = assign_layout(train_service)
+        train_service.save()
+        if not layout.seats:
             return None
-        print(f"Seats visible in DB before segment creation: {seat_count}")
-        # 6️⃣ NOW that seats exist, create the segments.
-        # This call will now correctly count the seats you just created.
-        train_service.create_service_segments()
 
-        # 7️⃣ Update capacity and save
-        train_service.total_capacity = len(seats_to_create)
-        train_service.save()
+        # 4️⃣ Create the segments from the layout's per-class counts
+        train_service.create_service_segments()
         train_service.update_duration()
         return train_service
     
@@ -500,19 +336,16 @@ class FlightServiceDetailSerializer(serializers.ModelSerializer,ProviderRatingMi
     provider_rating = serializers.SerializerMethodField()
     provider_total_reviews = serializers.SerializerMethodField()
 
-    # --- THIS IS THE FIX ---
-    # The field is named 'seats', but it gets data from 'flight_seats'
-    seats = FlightSeatSerializer(
-        many=True, 
-        read_only=True, 
-        source='flight_seats'  # <-- ADDED
-    )
-    # --- END FIX ---
+    # Layout seats composed with the booked 'flight_seats' rows
+    seats = serializers.SerializerMethodField()
 
     class Meta:
         model = FlightService
         fields = '__all__'
 
+    def get_seats(self, obj):
+        return FlightSeatSerializer(composed_seats(obj), many=True).data
+
 # -----------------------
 # Flight Service Create Serializer (Nested)
 # -----------------------
@@ -523,7 +356,7 @@ class FlightServiceCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = FlightService
-        exclude = ['provider_user_id', 'booked_seats', 'total_capacity']
+        exclude = ['provider_user_id', 'booked_seats', 'total_capacity', 'seat_layout']
 
     def create(self, validated_data):
         request = self.context['request']
@@ -537,7 +370,7 @@ class FlightServiceCreateSerializer(serializers.ModelSerializer):
         policy = Policy.objects.create(**policy_data)
 
         # Create FlightService
-        flight_service = FlightService.objects.create(
+        flight_service = FlightService(
             provider_user_id=request.user,
             route=route,
             vehicle=vehicle,
@@ -545,48 +378,8 @@ class FlightServiceCreateSerializer(serializers.ModelSerializer):
             **validated_data
         )
 
-        # ---- Auto-generate Seats ----
-        seats_to_create = []
-
-        # Helper to generate seat codes like 1A, 1B, etc.
-        def seat_code(row, col):
-            return f"{row + 1}{chr(65 + col)}"
-
-        # Business class
-        for r in range(flight_service.num_rows_business):
-            for c in range(flight_service.num_columns_business):
-                seats_to_create.append(FlightSeat(
-                    flight_service=flight_service,
-                    seat_number=seat_code(r, c),
-                    seat_class='Business',
-                    price=flight_service.business_price or flight_service.base_price
-                ))
-
-        # Premium Economy
-        for r in range(flight_service.num_rows_premium):
-            for c in range(flight_service.num_columns_premium):
-                seats_to_create.append(FlightSeat(
-                    flight_service=flight_service,
-                    seat_number=f"P{seat_code(r, c)}",
-                    seat_class='PremiumEconomy',
-                    price=flight_service.premium_price or flight_service.base_price
-                ))
-
-        # Economy class
-        for r in range(flight_service.num_rows_economy):
-            for c in range(flight_service.num_columns_economy):
-                seats_to_create.append(FlightSeat(
-                    flight_service=flight_service,
-                    seat_number=f"E{seat_code(r, c)}",
-                    seat_class='Economy',
-                    price=flight_service.economy_price or flight_service.base_price
-                ))
-
-        # Bulk create seats
-        FlightSeat.objects.bulk_create(seats_to_create)
-
-        # Update capacity
-        flight_service.total_capacity = len(seats_to_create)
+        # ---- Seats come from the shared layout; rows are written on booking ----
+        assign_layout(flight_service)
         flight_service.save()
 
         return flight_service
@@ -740,4 +533,67 @@ class BusServiceCardSerializer(serializers.ModelSerializer):
         valid_prices = [float(p) for p in prices if p is not None]
         if not valid_prices:
             return None
-        return f"₹{min(valid_prices):.0f} - ₹{max(valid_prices):.0f}"
\ No newline at end of file
+        return f"₹{min(valid_prices):.0f} - ₹{max(valid_prices):.0f}"
+
+# -----------------------
+# Service Schedule Serializer
+# -----------------------
+class ServiceScheduleSerializer(serializers.ModelSerializer):
+    route = RouteNestedSerializer()
+    vehicle = VehicleSerializer()
+    policy = PolicySerializer()
+
+    CREATE_SERIALIZERS = {
+        'bus': BusServiceCreateSerializer,
+        'train': TrainServiceCreateSerializer,
+        'flight': FlightServiceCreateSerializer,
+    }
+    # Set per departure by the generator, not by the template
+    RESERVED_FIELDS = {'route', 'vehicle', 'policy', 'departure_time', 'arrival_time', 'status', 'seat_layout'}
+
+    class Meta:
+        model = ServiceSchedule
+        exclude = ['provider_user_id']
+        read_only_fields = ['generated_until', 'created_at', 'updated_at']
+
+    def validate_days_of_week(self, value):
+        if not value or not all(isinstance(d, int) and 0 <= d <= 6 for d in value):
+            raise serializers.ValidationError("Use a non-empty list of weekdays, 0 = Monday ... 6 = Sunday.")
+        return sorted(set(value))
+
+    def validate(self, attrs):
+        service_type = attrs.get('service_type') or getattr(self.instance, 'service_type', None)
+        service_fields = attrs.get('service_fields')
+        if service_fields is None:
+            return attrs
+
+        create_serializer = self.CREATE_SERIALIZERS[service_type]
+        model_fields = {f.name for f in create_serializer.Meta.model._meta.concrete_fields}
+        unknown = set(service_fields) - (model_fields - self.RESERVED_FIELDS)
+        if unknown:
+            raise serializers.ValidationError({"service_fields": f"Unsupported fields: {sorted(unknown)}"})
+
+        check = create_serializer(data=service_fields, partial=True)
+        if not check.is_valid():
+            raise serializers.ValidationError({"service_fields": check.errors})
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        route = RouteNestedSerializer().create(validated_data.pop('route'))
+        vehicle = Vehicle.objects.create(**validated_data.pop('vehicle'))
+        policy = Policy.objects.create(**validated_data.pop('policy'))
+        return ServiceSchedule.objects.create(
+            provider_user_id=self.context['request'].user,
+            route=route,
+            vehicle=vehicle,
+            policy=policy,
+            **validated_data
+        )
+
+    def update(self, instance, validated_data):
+        # Route, vehicle and policy are fixed once a schedule exists;
+        # changes only affect departures generated after the update.
+        for nested in ('route', 'vehicle', 'policy'):
+            validated_data.pop(nested, None)
+        return super().update(instance, validated_data)
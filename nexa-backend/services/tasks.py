@@ -0,0 +1,23 @@
+from celery import shared_task
+from celery.signals import worker_process_shutdown
+from .fare_history import flush_fare_history
+from .schedules import materialize_schedules
+
+
+@shared_task
+def generate_scheduled_services():
+    """Materialize upcoming departures for every active service schedule."""
+    count = materialize_schedules()
+    return f"Generated {count} scheduled services."
+
+
+@shared_task
+def flush_fare_history_points():
+    """Write the fare points buffered in this worker process."""
+    count = flush_fare_history()
+    return f"Flushed {count} fare history points."
+
+
+@worker_process_shutdown.connect
+def flush_fare_history_on_shutdown(**kwargs):
+    flush_fare_history()
@@ -0,0 +1,187 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from rest_framework.test import APIClient
+from services import fare_history
+from services.fare_history import record_fare, flush_fare_history, get_fare_series
+from services.models import BusService, FareHistoryChunk
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(monkeypatch):
+    fare_history._buffer.clear()
+    # Start each test with a fresh flush clock so nothing is due on time alone
+    monkeypatch.setattr(fare_history, "_last_flush", fare_history.time.monotonic())
+    yield
+    fare_history._buffer.clear()
+
+
+@pytest.fixture
+def record(django_capture_on_commit_callbacks):
+    """``record_fare`` as it behaves once the caller's transaction commits."""
+    def record(*args, **kwargs):
+        with django_capture_on_commit_callbacks(execute=True):
+            record_fare(*args, **kwargs)
+    return record
+
+
+@pytest.fixture
+def bus_service(provider_user, base_route, vehicle, policy):
+    return BusService.objects.create(
+        provider_user_id=provider_user,
+        route=base_route,
+        vehicle=vehicle,
+        policy=policy,
+        departure_time=timezone.now() + timedelta(days=2),
+        arrival_time=timezone.now() + timedelta(days=2, hours=5),
+        base_price=500,
+        sleeper_price=600,
+        non_sleeper_price=400,
+        dynamic_pricing_enabled=True,
+        total_capacity=10,
+    )
+
+
+@pytest.mark.django_db
+def test_points_are_buffered_until_flush(bus_service, record):
+    record(bus_service, 'Sleeper', Decimal('600.00'))
+    assert fare_history.pending_fare_count() == 1
+    assert FareHistoryChunk.objects.count() == 0
+
+    assert flush_fare_history() == 1
+    assert fare_history.pending_fare_count() == 0
+    assert FareHistoryChunk.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_same_day_points_share_one_delta_encoded_chunk(bus_service, record):
+    t0 = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    record(bus_service, 'Sleeper', Decimal('600.00'), at=t0)
+    record(bus_service, 'Sleeper', Decimal('612.50'), at=t0 + timedelta(minutes=5))
+    flush_fare_history()
+    record(bus_service, 'Sleeper', Decimal('605.25'), at=t0 + timedelta(minutes=20))
+    flush_fare_history()
+
+    chunk = FareHistoryChunk.objects.get()
+    assert chunk.point_count == 3
+    assert chunk.points == [[300, 1250], [900, -725]]
+    assert chunk.last_price == Decimal('605.25')
+
+    series = get_fare_series(bus_service, 'Sleeper')
+    assert [p for _, p in series] == [Decimal('600.00'), Decimal('612.50'), Decimal('605.25')]
+    assert series[-1][0] == t0 + timedelta(minutes=20)
+
+
+@pytest.mark.django_db
+def test_range_query_trims_to_window(bus_service, record):
+    t0 = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=3)
+    for day in range(3):
+        record(bus_service, 'NonSleeper', 400 + day, at=t0 + timedelta(days=day))
+    flush_fare_history()
+
+    assert FareHistoryChunk.objects.count() == 3
+    series = get_fare_series(
+        bus_service, 'NonSleeper',
+        start=t0 + timedelta(hours=1), end=t0 + timedelta(days=2),
+    )
+    assert [p for _, p in series] == [Decimal('401.00'), Decimal('402.00')]
+
+
+@pytest.mark.django_db
+def test_repricing_records_both_bus_classes(bus_service, django_capture_on_commit_callbacks):
+    bus_service.booked_seats = 5
+    with django_capture_on_commit_callbacks(execute=True):
+        bus_service.apply_dynamic_pricing()
+    flush_fare_history()
+
+    assert set(FareHistoryChunk.objects.values_list('class_type', flat=True)) == {'Sleeper', 'NonSleeper'}
+    (_, sleeper_price), = get_fare_series(bus_service, 'Sleeper')
+    assert sleeper_price == Decimal(str(bus_service.current_sleeper_price))
+
+
+@pytest.mark.django_db
+def test_fare_history_endpoint(bus_service, record):
+    record(bus_service, 'Sleeper', Decimal('610.00'))
+
+    client = APIClient()
+    url = f"/services/fare-history/bus/{bus_service.service_id}/"
+    # Reads never write: unflushed points are not visible yet
+    assert client.get(url, {"class_type": "Sleeper"}).data["points"] == []
+    assert fare_history.pending_fare_count() == 1
+
+    flush_fare_history()
+    response = client.get(url, {"class_type": "Sleeper", "start": timezone.localdate().isoformat()})
+    assert response.status_code == 200
+    assert [p["price"] for p in response.data["points"]] == ["610.00"]
+
+    assert client.get(url).status_code == 400
+    assert client.get(f"/services/fare-history/boat/{bus_service.service_id}/", {"class_type": "Sleeper"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_rolled_back_points_are_never_buffered(bus_service, django_capture_on_commit_callbacks):
+    from django.db import transaction
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                record_fare(bus_service, 'Sleeper', Decimal('600.00'))
+                raise RuntimeError("booking failed")
+        record_fare(bus_service, 'Sleeper', Decimal('605.00'))
+    assert fare_history.pending_fare_count() == 1
+
+
+@pytest.mark.django_db
+def test_due_point_is_flushed_after_commit(bus_service, monkeypatch, record):
+    monkeypatch.setattr(fare_history, "_last_flush", 0.0)  # every point is due
+    record(bus_service, 'Sleeper', Decimal('600.00'))
+    assert fare_history.pending_fare_count() == 0
+    assert FareHistoryChunk.objects.get().point_count == 1
+
+
+@pytest.mark.django_db
+def test_failed_flush_keeps_points_and_does_not_raise(bus_service, monkeypatch, record):
+    record(bus_service, 'Sleeper', Decimal('600.00'))
+
+    def broken(points):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(fare_history, "_write_points", broken)
+    assert flush_fare_history() == 0
+    assert fare_history.pending_fare_count() == 1
+
+    monkeypatch.undo()
+    assert flush_fare_history() == 1
+    assert FareHistoryChunk.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_chunk_created_concurrently_is_appended_to(bus_service, monkeypatch, record):
+    t0 = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    record(bus_service, 'Sleeper', Decimal('600.00'), at=t0)
+    flush_fare_history()
+
+    # Another process creates the day's chunk between our lookup and insert
+    locked_chunks = fare_history._locked_chunks
+    lookups = []
+
+    def racing(keys):
+        lookups.append(list(keys))
+        return {} if len(lookups) == 1 else locked_chunks(keys)
+
+    monkeypatch.setattr(fare_history, "_locked_chunks", racing)
+    record(bus_service, 'Sleeper', Decimal('610.00'), at=t0 + timedelta(minutes=1))
+    assert flush_fare_history() == 1
+
+    chunk = FareHistoryChunk.objects.get()
+    assert len(lookups) == 2
+    assert chunk.point_count == 2 and chunk.points == [[60, 1000]]
+
+
+@pytest.mark.django_db
+def test_quiet_process_flushes_after_a_request(bus_service, monkeypatch, record):
+    record(bus_service, 'Sleeper', Decimal('600.00'))
+    monkeypatch.setattr(fare_history, "_last_flush", 0.0)
+    APIClient().get(f"/services/fare-history/bus/{bus_service.service_id}/")
+    assert fare_history.pending_fare_count() == 0
+    assert FareHistoryChunk.objects.count() == 1
@@ -0,0 +1,215 @@
+import json
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from services.ingest import ServiceIngestor
+from services.models import (
+    Station, Route, RouteStop, SeatLayout, BusService, BusSeat, TrainService, TrainServiceSegment,
+    FlightService,
+)
+
+VEHICLE = {"registration_no": "KA01", "model": "Volvo", "capacity": 40, "amenities": [], "status": "Active"}
+POLICY = {"cancellation_window": 12, "cancellation_fee": "50.00", "reschedule_allowed": True,
+          "reschedule_fee": "20.00", "no_show_penalty": "10.00", "terms_conditions": "T&C"}
+
+
+def station(code):
+    return {"name": f"Station {code}", "code": code, "city": code, "state": "KA", "BusStations": []}
+
+
+def bus_row(**overrides):
+    row = {
+        "service_type": "bus",
+        "route": {
+            "source": station("BLR"), "destination": station("MYS"),
+            "distance_km": 150, "estimated_duration": "03:00:00",
+            "stops": [{"stop_order": 1, "station": station("MDY"),
+                       "price_to_destination": "100.00", "duration_to_destination": "01:00:00"}],
+        },
+        "vehicle": VEHICLE, "policy": POLICY,
+        "departure_time": "2026-12-01T06:00:00Z", "arrival_time": "2026-12-01T09:00:00Z",
+        "num_rows_sleeper": 2, "num_columns_sleeper": 2,
+        "num_rows_non_sleeper": 3, "num_columns_non_sleeper": 4,
+        "base_price": "300.00", "sleeper_price": "500.00", "non_sleeper_price": "300.00",
+    }
+    row.update(overrides)
+    return row
+
+
+def train_row():
+    return {
+        "service_type": "train",
+        "route": {
+            "source": station("BLR"), "destination": station("MAS"), "distance_km": 350,
+            "stops": [
+                {"stop_order": 1, "station": station("KPD"), "price_to_destination": "200.00"},
+                {"stop_order": 2, "station": station("AJJ"), "price_to_destination": "100.00"},
+            ],
+        },
+        "vehicle": VEHICLE, "policy": POLICY,
+        "train_name": "Shatabdi", "train_number": "12008",
+        "bogies_config": {"sleeper": {"count": 2, "seats_per_bogie": 8}, "third_ac": {"count": 1, "seats_per_bogie": 6}},
+        "base_price": "400.00", "sleeper_price": "400.00", "third_ac_price": "900.00",
+        "departure_time": "2026-12-01T06:00:00Z", "arrival_time": "2026-12-01T11:00:00Z",
+    }
+
+
+def flight_row():
+    return {
+        "service_type": "flight",
+        "route": {"source": station("BLR"), "destination": station("DEL"), "distance_km": 1700},
+        "vehicle": VEHICLE, "policy": POLICY,
+        "flight_number": "AI501", "airline_name": "Air India",
+        "num_rows_business": 1, "num_columns_business": 2,
+        "num_rows_economy": 2, "num_columns_economy": 3,
+        "base_price": "4000.00", "business_price": "9000.00", "economy_price": "4000.00",
+        "departure_time": "2026-12-01T06:00:00Z", "arrival_time": "2026-12-01T08:45:00Z",
+    }
+
+
+@pytest.mark.django_db
+def test_ingest_creates_services_layouts_and_segments(provider_user):
+    Station.objects.create(name="Bengaluru City", code="BLR")
+    rows = [json.dumps(r) for r in (bus_row(), bus_row(bus_number=2), train_row(), flight_row())]
+    rows.insert(1, "")
+    rows.append('{"service_type": "boat"}')
+
+    result = ServiceIngestor(provider_user, batch_size=2).ingest(rows)
+
+    assert result.created == 4
+    assert result.errors[0][0] == 6
+    # BLR already existed and is reused; the other 6 codes are new
+    assert Station.objects.filter(code="BLR").count() == 1
+    assert Station.objects.count() == 7
+    # Both bus rows share one route
+    assert Route.objects.count() == 3
+    assert list(RouteStop.objects.filter(route__destination__code="MAS").values_list("station__code", flat=True)) == \
+        ["BLR", "KPD", "AJJ", "MAS"]
+
+    bus = BusService.objects.first()
+    assert bus.total_capacity == 16
+    # Both buses share one layout and get no seat rows
+    assert BusService.objects.filter(seat_layout=bus.seat_layout).count() == 2
+    assert BusSeat.objects.count() == 0
+    assert bus.current_sleeper_price is not None
+
+    train = TrainService.objects.get()
+    assert train.total_capacity == 22
+    assert train.seat_layout.class_counts == {"sleeper": 16, "third_ac": 6}
+    segments = TrainServiceSegment.objects.filter(train_service=train)
+    assert segments.count() == 3
+    assert {(s.available_count_sleeper, s.available_count_third_ac) for s in segments} == {(16, 6)}
+    assert train.route.estimated_duration.total_seconds() == 5 * 3600
+
+    flight = FlightService.objects.get()
+    assert flight.total_capacity == 8
+    assert flight.seat_layout.class_counts == {"Business": 2, "Economy": 6}
+    assert SeatLayout.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_ingest_reuses_existing_route_in_later_run(provider_user):
+    ServiceIngestor(provider_user).ingest([bus_row()])
+    ServiceIngestor(provider_user).ingest([bus_row()])
+    assert Route.objects.count() == 1
+    assert BusService.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_batch_query_count_does_not_grow_with_services(provider_user, django_assert_max_num_queries):
+    rows = [bus_row(bus_number=i) for i in range(25)]
+    with django_assert_max_num_queries(20):
+        ServiceIngestor(provider_user, batch_size=25).ingest(rows)
+    assert BusService.objects.count() == 25
+
+
+@pytest.mark.django_db
+def test_ingest_command(provider_user, tmp_path, capsys):
+    path = tmp_path / "services.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in (bus_row(), flight_row())))
+    call_command("ingest_services", str(path), "--provider", provider_user.username)
+    assert "Created 2 services" in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_bulk_ingest_endpoint(provider_user, customer_user):
+    client = APIClient()
+    upload = SimpleUploadedFile("s.jsonl", (json.dumps(train_row()) + "\n").encode())
+
+    client.force_authenticate(customer_user)
+    assert client.post("/services/bulk-ingest/", {"file": upload}, format="multipart").status_code == 403
+
+    client.force_authenticate(provider_user)
+    upload.seek(0)
+    response = client.post("/services/bulk-ingest/", {"file": upload}, format="multipart")
+    assert response.status_code == 201
+    assert response.data["created"] == 1
+    assert TrainService.objects.get().provider_user_id == provider_user
+
+
+@pytest.mark.django_db
+def test_failed_batch_is_reported_and_others_are_written(provider_user, monkeypatch):
+    write_batch = ServiceIngestor._write_batch
+    calls = []
+
+    def flaky(self, batch):
+        calls.append(len(batch))
+        if len(calls) == 2:
+            raise RuntimeError("database went away")
+        return write_batch(self, batch)
+
+    monkeypatch.setattr(ServiceIngestor, "_write_batch", flaky)
+    rows = [json.dumps(train_row()) for _ in range(5)]
+    result = ServiceIngestor(provider_user, batch_size=2).ingest(rows)
+
+    assert calls == [2, 2, 1]
+    assert result.created == 3 and result.failed == 2
+    assert [(b.batch, b.first_line, b.last_line, b.rows) for b in result.failed_batches] == [(2, 3, 4, 2)]
+    assert "database went away" in result.failed_batches[0].error
+    assert TrainService.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_bulk_ingest_endpoint_reports_failed_batches(provider_user, monkeypatch):
+    def broken(self, batch):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(ServiceIngestor, "_write_batch", broken)
+    client = APIClient()
+    client.force_authenticate(provider_user)
+    upload = SimpleUploadedFile("s.jsonl", (json.dumps(train_row()) + "\n").encode())
+    response = client.post("/services/bulk-ingest/", {"file": upload}, format="multipart")
+
+    assert response.status_code == 400  # nothing was created
+    assert response.data["created"] == 0
+    assert response.data["failed_batches"] == [{"batch": 1, "lines": [1, 1], "rows": 1, "error": "boom"}]
+
+
+@pytest.mark.django_db
+def test_route_serializer_resolves_in_constant_queries():
+    from services.serializers import RouteNestedSerializer
+
+    def save(num_stops):
+        serializer = RouteNestedSerializer(data={
+            "source": station("BLR"), "destination": station("MAS"), "distance_km": 350,
+            "stops": [{"stop_order": i, "station": station(f"S{i}"), "price_to_destination": "10.00"}
+                      for i in range(1, num_stops + 1)],
+        })
+        assert serializer.is_valid(), serializer.errors
+        with CaptureQueriesContext(connection) as ctx:
+            route = serializer.save()
+        return route, len(ctx.captured_queries)
+
+    short, short_queries = save(1)
+    long, long_queries = save(12)
+    assert short_queries == long_queries
+    assert long.stops.count() == 14
+
+    again, reuse_queries = save(12)
+    assert again == long
+    assert reuse_queries < long_queries
+    assert Route.objects.count() == 2
+    assert Station.objects.filter(code="BLR").count() == 1
@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.utils import timezone
+from bookings.models import Booking, BookingPassenger
+from services.models import BusService
+from services.pricing_backtest import _sold_before, load_booking_arrays, replay
+
+
+@pytest.fixture
+def bus_with_history(provider_user, customer_user, base_route, vehicle, policy):
+    service = BusService.objects.create(
+        provider_user_id=provider_user,
+        route=base_route,
+        vehicle=vehicle,
+        policy=policy,
+        departure_time=timezone.now() + timedelta(days=10),
+        arrival_time=timezone.now() + timedelta(days=10, hours=5),
+        base_price=500,
+        sleeper_price=500,
+        non_sleeper_price=400,
+        total_capacity=10,
+    )
+    ct = ContentType.objects.get_for_model(BusService)
+    for pax in (2, 3, 1):
+        booking = Booking.objects.create(
+            customer=customer_user, provider=provider_user, content_type=ct, object_id=service.service_id,
+            source_id=base_route.source, destination_id=base_route.destination,
+            total_amount=Decimal(500 * pax), status='Confirmed', payment_status='Paid',
+        )
+        BookingPassenger.objects.bulk_create(
+            BookingPassenger(booking=booking, name=f"P{i}") for i in range(pax)
+        )
+    # Pending bookings are not demand yet
+    Booking.objects.create(customer=customer_user, content_type=ct, object_id=service.service_id,
+                           total_amount=Decimal("500"), status='Pending')
+    return service
+
+
+def test_sold_before_resets_per_group():
+    group = np.array([0, 0, 0, 1, 1])
+    pax = np.array([2.0, 3.0, 1.0, 4.0, 1.0])
+    assert _sold_before(group, pax).tolist() == [0.0, 2.0, 5.0, 0.0, 4.0]
+
+
+@pytest.mark.django_db
+def test_load_booking_arrays_skips_unconfirmed(bus_with_history):
+    arrays = load_booking_arrays(['bus'])
+    assert arrays['pax'].tolist() == [2.0, 3.0, 1.0]
+    assert arrays['capacity'].tolist() == [10.0, 10.0, 10.0]
+
+
+@pytest.mark.django_db
+def test_replay_reproduces_history_and_scales_with_factor(bus_with_history):
+    arrays = load_booking_arrays(['bus'])
+    flat, steep = replay(arrays, [0.0, 1.0])
+
+    # Dynamic pricing was off, so factor 0 is exactly what customers paid
+    assert flat.revenue == pytest.approx(3000.0)
+    assert flat.load_factor == pytest.approx(0.6)
+    # Occupancy before each booking is 0, 0.2, 0.5 → multipliers 1, 1.1, 1.25
+    assert steep.revenue == pytest.approx(1000 + 1500 * 1.1 + 500 * 1.25)
+
+    elastic = replay(arrays, [1.0], elasticity=2.0)[0]
+    assert elastic.passengers < steep.passengers
+
+
+@pytest.mark.django_db
+def test_backtest_command_outputs_json(bus_with_history, capsys):
+    call_command('backtest_pricing', '--factors', '0,0.5', '--mode', 'bus', '--json')
+    out = capsys.readouterr().out
+    assert '"factor": 0.5' in out
@@ -0,0 +1,122 @@
+import pytest
+from datetime import date, time, timedelta
+from unittest.mock import patch
+from rest_framework.test import APIClient
+from services.models import ServiceSchedule, SeatLayout, BusService, BusSeat, TrainService, TrainServiceSegment
+from services.schedules import departure_dates, materialize_schedules
+from services.tests.test_ingest import VEHICLE, POLICY, station
+
+
+def train_schedule_payload(**overrides):
+    payload = {
+        "service_type": "train",
+        "route": {
+            "source": station("SBC"), "destination": station("MAS"), "distance_km": 350,
+            "stops": [{"stop_order": 1, "station": station("KPD"), "price_to_destination": "150.00"}],
+        },
+        "vehicle": VEHICLE,
+        "policy": POLICY,
+        "days_of_week": [0, 2, 4],
+        "departure_time": "06:00:00",
+        "duration": "05:00:00",
+        "start_date": date.today().isoformat(),
+        "service_fields": {
+            "train_name": "Shatabdi", "train_number": "12008",
+            "bogies_config": {"sleeper": {"count": 1, "seats_per_bogie": 4}},
+            "base_price": "400.00", "sleeper_price": "400.00",
+        },
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def provider_client(provider_user):
+    client = APIClient()
+    client.force_authenticate(provider_user)
+    return client
+
+
+def test_departure_dates_respects_weekdays_and_end_date():
+    schedule = ServiceSchedule(days_of_week=[0, 6], start_date=date(2026, 1, 1), end_date=date(2026, 1, 12))
+    # 2026-01-04 is a Sunday, 2026-01-05 a Monday
+    assert list(departure_dates(schedule, date(2025, 12, 1), date(2026, 1, 31))) == [
+        date(2026, 1, 4), date(2026, 1, 5), date(2026, 1, 11), date(2026, 1, 12),
+    ]
+
+
+@pytest.mark.django_db
+@patch("services.views.materialize_schedules")
+def test_create_schedule_validates_template(mock_generate, provider_client):
+    bad_days = provider_client.post("/services/schedules/", train_schedule_payload(days_of_week=[7]), format="json")
+    assert bad_days.status_code == 400
+    bad_field = train_schedule_payload()
+    bad_field["service_fields"]["departure_time"] = "2026-01-01T00:00:00Z"
+    assert provider_client.post("/services/schedules/", bad_field, format="json").status_code == 400
+
+    ok = provider_client.post("/services/schedules/", train_schedule_payload(), format="json")
+    assert ok.status_code == 201
+    assert mock_generate.called
+
+
+@pytest.mark.django_db
+def test_generator_materializes_incrementally(provider_client):
+    response = provider_client.post("/services/schedules/", train_schedule_payload(), format="json")
+    schedule = ServiceSchedule.objects.get(schedule_id=response.data["schedule_id"])
+
+    expected = [d for d in departure_dates(schedule, date.today(), date.today() + timedelta(days=30))]
+    services = TrainService.objects.all()
+    # Today's departure may already be in the past
+    assert len(expected) - 1 <= services.count() <= len(expected)
+    assert {s.route_id for s in services} == {schedule.route_id}
+    first = services.first()
+    assert first.seat_layout.class_counts == {"sleeper": 4}
+    assert first.total_capacity == 4
+    assert TrainServiceSegment.objects.filter(train_service=first).count() == 2
+    assert first.arrival_time - first.departure_time == timedelta(hours=5)
+
+    # Running again adds nothing; pushing the horizon only adds the new days
+    before = services.count()
+    assert materialize_schedules() == 0
+    added = provider_client.post(f"/services/schedules/{schedule.schedule_id}/generate/",
+                                 {"days_ahead": 44}, format="json").data["created"]
+    assert added == len(list(departure_dates(schedule, date.today() + timedelta(days=31),
+                                             date.today() + timedelta(days=44))))
+    assert TrainService.objects.count() == before + added
+
+
+@pytest.mark.django_db
+def test_generate_rejects_out_of_range_days_ahead(provider_client, settings):
+    settings.SCHEDULE_MAX_DAYS_AHEAD = 90
+    response = provider_client.post("/services/schedules/", train_schedule_payload(), format="json")
+    url = f"/services/schedules/{response.data['schedule_id']}/generate/"
+    before = TrainService.objects.count()
+
+    for days_ahead in (0, -5, 91, 100000):
+        assert provider_client.post(url, {"days_ahead": days_ahead}, format="json").status_code == 400
+    assert TrainService.objects.count() == before
+
+    # Direct callers are capped as well
+    materialize_schedules(100000)
+    last = TrainService.objects.order_by("-departure_time").first().departure_time
+    assert last.date() <= date.today() + timedelta(days=90)
+
+
+@pytest.mark.django_db
+def test_bus_schedule_shares_one_seat_layout(provider_client):
+    payload = train_schedule_payload(
+        service_type="bus",
+        days_of_week=list(range(7)),
+        departure_time="23:59:00",
+        service_fields={
+            "bus_travels_name": "VRL", "num_rows_sleeper": 2, "num_columns_sleeper": 2,
+            "base_price": "300.00", "sleeper_price": "500.00", "non_sleeper_price": "300.00",
+        },
+    )
+    response = provider_client.post("/services/schedules/", payload, format="json")
+    assert response.status_code == 201
+    assert BusService.objects.count() >= 30
+    assert SeatLayout.objects.count() == 1
+    assert BusSeat.objects.count() == 0
+    assert set(BusService.objects.values_list("total_capacity", flat=True)) == {4}
+    assert ServiceSchedule.objects.get().departure_time == time(23, 59)
@@ -0,0 +1,127 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from services.ingest import ServiceIngestor
+from services.models import SeatLayout, BusService, BusSeat, TrainService, TrainSeat
+from services.seating import assign_layout, class_capacity, composed_seats, untouched_seat_numbers
+from services.tests.test_ingest import train_row
+
+
+@pytest.fixture
+def layout_bus(provider_user, base_route, vehicle, policy):
+    bus = BusService(
+        provider_user_id=provider_user, route=base_route, vehicle=vehicle, policy=policy,
+        departure_time=timezone.now() + timedelta(days=2),
+        arrival_time=timezone.now() + timedelta(days=2, hours=5),
+        num_rows_sleeper=1, num_columns_sleeper=2, num_rows_non_sleeper=2, num_columns_non_sleeper=2,
+        base_price=300, sleeper_price=500, non_sleeper_price=300,
+    )
+    assign_layout(bus)
+    bus.save()
+    return bus
+
+
+@pytest.fixture
+def customer_client(customer_user):
+    client = APIClient()
+    client.force_authenticate(customer_user)
+    return client
+
+
+def book(client, service_model, service, passengers, **extra):
+    return client.post("/bookings/bookings/", {
+        "service_model": service_model, "service_id": str(service.service_id),
+        "passengers": passengers, **extra,
+    }, format="json")
+
+
+@pytest.mark.django_db
+def test_same_configuration_shares_layout(layout_bus):
+    twin = BusService(**{f.attname: getattr(layout_bus, f.attname) for f in BusService._meta.concrete_fields
+                         if not f.primary_key})
+    assert assign_layout(twin) == layout_bus.seat_layout
+    assert SeatLayout.objects.count() == 1
+    assert layout_bus.seat_layout.class_counts == {"Sleeper": 2, "NonSleeper": 4}
+
+
+@pytest.mark.django_db
+def test_bus_booking_writes_only_booked_seats(layout_bus, customer_client):
+    response = book(customer_client, "bus", layout_bus, [
+        {"name": "A", "gender": "F", "seat_no": "N2B"}, {"name": "B", "gender": "M"}, {"name": "C", "gender": "F"},
+    ], class_type="NonSleeper")
+    assert response.status_code == 201, response.data
+    assert sorted(response.data["assigned_seats"]) == ["N1A", "N1B", "N2B"]
+    assert BusSeat.objects.filter(bus_service=layout_bus, is_booked=True).count() == 3
+    assert BusSeat.objects.count() == 3
+
+    seats = {seat.seat_number: seat for seat in composed_seats(layout_bus)}
+    assert len(seats) == 6
+    assert seats["N2A"].seat_id is None and not seats["N2A"].is_booked
+    assert seats["S1A"].price == 500
+    assert untouched_seat_numbers(layout_bus, "NonSleeper", 5) == ["N2A"]
+
+    taken = book(customer_client, "bus", layout_bus, [{"name": "D", "gender": "M", "seat_no": "N2B"}], class_type="NonSleeper")
+    assert taken.status_code == 409
+
+    booking_id = response.data["booking"]["booking_id"]
+    cancel = customer_client.post(f"/bookings/bookings/{booking_id}/cancel/", {"reason": "x"}, format="json")
+    assert cancel.status_code == 200
+    assert not BusSeat.objects.filter(is_booked=True).exists()
+
+    # Released rows are picked up again alongside untouched seats
+    again = book(customer_client, "bus", layout_bus, [{"name": "E", "gender": "M"}] * 4, class_type="NonSleeper")
+    assert again.status_code == 201
+    assert BusSeat.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_train_booking_materializes_seats_per_segment(provider_user, customer_client):
+    ServiceIngestor(provider_user).ingest([train_row()])
+    train = TrainService.objects.get()
+    stops = [station for _, station in train.get_full_stop_list()]
+
+    first = book(customer_client, "train", train, [{"name": "A", "gender": "F"}, {"name": "B", "gender": "M"}], class_type="Sleeper",
+                 from_station_id=str(stops[0].station_id), to_station_id=str(stops[1].station_id))
+    assert first.status_code == 201, first.data
+    assert set(TrainSeat.objects.values_list("availability_mask", flat=True)) == {"100"}
+
+    # Later leg reuses the already written rows instead of touching new seats
+    second = book(customer_client, "train", train, [{"name": "C", "gender": "F"}], class_type="Sleeper",
+                  from_station_id=str(stops[2].station_id), to_station_id=str(stops[3].station_id))
+    assert second.status_code == 201, second.data
+    assert TrainSeat.objects.count() == 2
+    assert train.segments.get(segment_index=0).available_count_sleeper == 14
+
+
+@pytest.mark.django_db
+def test_train_pricing_sees_class_capacity(provider_user):
+    from decimal import Decimal
+    ServiceIngestor(provider_user).ingest([train_row()])
+    train = TrainService.objects.get()
+    assert class_capacity(train, "Sleeper") == class_capacity(train, "sleeper") == 16
+
+    train.dynamic_pricing_enabled, train.dynamic_factor = True, 1.0
+    train.segments.filter(segment_index=0).update(available_count_sleeper=8)
+    occupancy, _ = train._get_dynamic_multipliers("Sleeper", [0])
+    assert occupancy == Decimal("1.25")  # half the sleeper berths booked
+
+
+@pytest.mark.django_db
+def test_compact_seats_command(provider_user, base_route, vehicle, policy, capsys):
+    legacy = BusService.objects.create(
+        provider_user_id=provider_user, route=base_route, vehicle=vehicle, policy=policy,
+        departure_time=timezone.now(), arrival_time=timezone.now() + timedelta(hours=4),
+        num_rows_sleeper=1, num_columns_sleeper=3, base_price=400, sleeper_price=400, total_capacity=3,
+    )
+    for number, booked in (("S1A", True), ("S1B", False), ("S1C", False)):
+        BusSeat.objects.create(bus_service=legacy, seat_number=number, seat_type="Sleeper", price=400, is_booked=booked)
+
+    call_command("compact_seats", "--mode", "bus")
+
+    legacy.refresh_from_db()
+    assert legacy.seat_layout is not None
+    assert list(BusSeat.objects.values_list("seat_number", flat=True)) == ["S1A"]
+    assert [seat.is_booked for seat in composed_seats(legacy)] == [True, False, False]
+    assert "1 services moved to layouts, 2 seat rows removed" in capsys.readouterr().out
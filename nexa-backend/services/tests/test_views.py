@@ -9,6 +9,7 @@ from services.serializers import (
 from django.utils import timezone
 from datetime import timedelta
 from services.models import TrainSeat, FlightSeat, BusSeat
+from services.seating import composed_seats
 
 @pytest.fixture
 def route_data():
@@ -72,9 +73,10 @@ def test_busservice_serializer_valid(provider_user, route_data, vehicle_data, po
     assert instance is not None
     # route nested creation check
     assert instance.route.source.name == "Bangalore"
-    # seats created
-    seats = BusSeat.objects.filter(bus_service=instance).count()
-    assert seats == 2  # 1 row * 2 columns
+    # seats come from the shared layout; no rows until booked
+    assert len(composed_seats(instance)) == 2  # 1 row * 2 columns
+    assert instance.total_capacity == 2
+    assert BusSeat.objects.filter(bus_service=instance).count() == 0
 
 # ---------------------------
 # Train create + save + seats
@@ -106,9 +108,10 @@ def test_trainservice_serializer_valid(provider_user, route_data, vehicle_data,
     assert instance is not None
     # ensure route is created
     assert instance.route.source.code == "BLR"
-    # check seats created according to bogies_config
-    seat_count = TrainSeat.objects.filter(train_service=instance).count()
-    assert seat_count == 4
+    # check layout built according to bogies_config
+    assert instance.seat_layout.class_counts == {"Sleeper": 4}
+    assert instance.total_capacity == 4
+    assert TrainSeat.objects.filter(train_service=instance).count() == 0
 
 # ---------------------------
 # Flight create + save + assert
@@ -145,6 +148,6 @@ def test_flightservice_serializer_valid(provider_user, route_data, vehicle_data,
     instance = serializer.save()
     assert instance is not None
     assert instance.airline_name == "Air India"
-    # seats created for economy: 1 * 2
-    seat_count = FlightSeat.objects.filter(flight_service=instance).count()
-    assert seat_count == 2
+    # seats laid out for economy: 1 * 2
+    assert [seat.seat_number for seat in composed_seats(instance)] == ["E1A", "E1B"]
+    assert FlightSeat.objects.filter(flight_service=instance).count() == 0
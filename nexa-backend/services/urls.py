@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BusServiceViewSet,TrainServiceViewSet,FlightServiceViewSet,FlightCardViews,TrainCardViews,BusCardViews
+from .views import BusServiceViewSet,TrainServiceViewSet,FlightServiceViewSet,FlightCardViews,TrainCardViews,BusCardViews,FareHistoryView,BulkServiceIngestView,ServiceScheduleViewSet
 
 router = DefaultRouter()
 router.register(r'bus-services', BusServiceViewSet, basename='bus-service')
@@ -9,7 +9,10 @@ router.register(r'flight-services', FlightServiceViewSet, basename='flight-servi
 router.register(r'flight-card',FlightCardViews, basename =  'flight-card')
 router.register(r'train-card',TrainCardViews, basename = 'train-card')
 router.register(r'bus-card', BusCardViews, basename =  'bus-card')
+router.register(r'schedules', ServiceScheduleViewSet, basename='service-schedule')
 urlpatterns = [
     path('', include(router.urls)),
+    path('fare-history/<str:service_type>/<uuid:service_id>/', FareHistoryView.as_view(), name='fare-history'),
+    path('bulk-ingest/', BulkServiceIngestView.as_view(), name='bulk-ingest'),
 
 ]
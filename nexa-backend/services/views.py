@@ -14,6 +14,16 @@ from django.db.models import Min
 from decimal import Decimal
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from rest_framework.views import APIView
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
+from .fare_history import get_fare_series
+from .ingest import ServiceIngestor
+from .models import ServiceSchedule
+from .schedules import materialize_schedules, max_days_ahead
+from .serializers import ServiceScheduleSerializer
+from rest_framework.parsers import MultiPartParser
 
 from services.models import TrainService, Station
 from services.serializers import TrainServiceDetailSerializer
@@ -152,7 +162,7 @@ class BusServiceViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        base_queryset = BusService.objects.all().select_related('route', 'vehicle', 'policy')
+        base_queryset = BusService.objects.all().select_related('route', 'vehicle', 'policy', 'seat_layout')
         user = self.request.user
 
         # Authenticated user's own services
@@ -194,7 +204,7 @@ class FlightServiceViewSet(viewsets.ModelViewSet):
 
         if self.action == 'retrieve':
             # This is correct: prefetch 'flight_seats'
-            return base_queryset.select_related('route', 'vehicle', 'policy').prefetch_related('flight_seats')
+            return base_queryset.select_related('route', 'vehicle', 'policy', 'seat_layout').prefetch_related('flight_seats')
 
 
         
@@ -287,6 +297,146 @@ class BusCardViews(viewsets.ReadOnlyModelViewSet):
 
         serializer = self.get_serializer(trains, many=True)
         return Response(serializer.data)
+
+
+class ServiceScheduleViewSet(viewsets.ModelViewSet):
+    """
+    Recurring departures for a provider. Creating a schedule immediately
+    generates the upcoming services; Celery beat keeps extending it.
+    """
+    permission_classes = [IsServiceProvider]
+    serializer_class = ServiceScheduleSerializer
+    lookup_field = 'schedule_id'
+    http_method_names = ['get', 'post', 'patch', 'delete']
+
+    def get_queryset(self):
+        return ServiceSchedule.objects.filter(provider_user_id=self.request.user).select_related(
+            'route__source', 'route__destination', 'vehicle', 'policy'
+        )
+
+    def perform_create(self, serializer):
+        schedule = serializer.save()
+        materialize_schedules(schedules=ServiceSchedule.objects.filter(pk=schedule.pk))
+
+    @action(detail=True, methods=['post'])
+    def generate(self, request, schedule_id=None):
+        """
+        POST /services/schedules/{schedule_id}/generate/  {"days_ahead": 60}
+        """
+        schedule = self.get_object()
+        try:
+            days_ahead = int(request.data.get('days_ahead', 30))
+        except (TypeError, ValueError):
+            return Response({"error": "days_ahead must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days_ahead <= max_days_ahead():
+            return Response({"error": f"days_ahead must be between 1 and {max_days_ahead()}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        created = materialize_schedules(days_ahead, ServiceSchedule.objects.filter(pk=schedule.pk))
+        return Response({"created": created})
+
+
+class FareHistoryView(APIView):
+    """
+    Fare history for one service and class, for trend charts and repricing
+    backtests.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    SERVICE_MODELS = {
+        'bus': BusService,
+        'train': TrainService,
+        'flight': FlightService,
+    }
+
+    @swagger_auto_schema(
+        operation_summary="Fare history for a service",
+        manual_parameters=[
+            openapi.Parameter('class_type', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description="e.g. Sleeper, SecondAC, Economy"),
+            openapi.Parameter('start', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                              description="ISO date or datetime (inclusive)"),
+            openapi.Parameter('end', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                              description="ISO date or datetime (inclusive)"),
+        ],
+    )
+    def get(self, request, service_type, service_id):
+        """
+        GET /services/fare-history/{bus|train|flight}/{service_id}/?class_type=...&start=...&end=...
+        """
+        model = self.SERVICE_MODELS.get(service_type)
+        if model is None:
+            return Response({"error": "service_type must be bus, train or flight."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        service = get_object_or_404(model, service_id=service_id)
+
+        class_type = request.query_params.get('class_type')
+        if not class_type:
+            return Response({"error": "class_type is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start = _parse_range_bound(request.query_params.get('start'), end_of_day=False)
+            end = _parse_range_bound(request.query_params.get('end'), end_of_day=True)
+        except ValueError:
+            return Response({"error": "start/end must be ISO dates or datetimes."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Reads what has been flushed: points can lag by up to FARE_HISTORY_FLUSH_SECONDS
+        series = get_fare_series(service, class_type, start, end)
+        return Response({
+            "service_id": str(service.service_id),
+            "class_type": class_type,
+            "points": [{"time": at, "price": str(price)} for at, price in series],
+        })
+
+
+def _parse_range_bound(value, end_of_day):
+    """Accepts YYYY-MM-DD or a full ISO datetime; returns an aware datetime or None."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+class BulkServiceIngestView(APIView):
+    """
+    Upload a JSONL file of service payloads (same shape as the create
+    endpoints, plus ``service_type``) and create them all in batches.
+    """
+    permission_classes = [IsServiceProvider]
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_summary="Bulk create services from JSONL",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
+        ],
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Upload a JSONL file as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = (line.decode('utf-8') for line in upload)
+        result = ServiceIngestor(request.user).ingest(lines)
+        return Response({
+            "created": result.created,
+            "failed": result.failed,
+            "errors": [{"line": n, "error": msg} for n, msg in result.errors[:50]],
+            "failed_batches": [
+                {"batch": b.batch, "lines": [b.first_line, b.last_line], "rows": b.rows, "error": b.error}
+                for b in result.failed_batches
+            ],
+            "elapsed_seconds": round(result.elapsed, 3),
+            "services_per_second": round(result.created / result.elapsed, 1) if result.elapsed else None,
+        }, status=status.HTTP_201_CREATED if result.created else status.HTTP_400_BAD_REQUEST)
+
+
 # services/views/train_service_views.py
 
 